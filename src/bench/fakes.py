@@ -0,0 +1,157 @@
+"""
+Offline stand-ins for the LLM and SerpAPI backends
+A scripted chat model that drives the LangChain SQL agents through a fixed
+sequence of tool calls, and a fake GoogleSearch returning canned results.
+Both are deterministic and can add artificial latency to mimic network time,
+and both can enforce a FakeQuota, answering 429 like the real providers
+when called too often.
+"""
+
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import openai
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict
+
+from src.bench.questions import sql_for_question
+
+
+_call_ids = itertools.count()
+
+
+class FakeQuota:
+    """
+    Provider-side quota: at most `limit` calls in any `window` seconds.
+
+    Attributes:
+        allowed (int): Calls admitted
+        rejected (int): Calls answered with 429
+    """
+
+    def __init__(self, limit: int, window: float = 1.0):
+        self.limit = limit
+        self.window = window
+        self.allowed = 0
+        self.rejected = 0
+        self._calls: List[float] = []
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        """Record a call; return False if it exceeds the quota."""
+        now = time.monotonic()
+        with self._lock:
+            self._calls = [t for t in self._calls if t > now - self.window]
+            if len(self._calls) >= self.limit:
+                self.rejected += 1
+                return False
+            self._calls.append(now)
+            self.allowed += 1
+            return True
+
+    def retry_after(self) -> float:
+        """Seconds until the oldest call in the window expires."""
+        with self._lock:
+            return max(0.0, self._calls[0] + self.window - time.monotonic()) if self._calls else 0.0
+
+
+class ScriptedSQLChatModel(BaseChatModel):
+    """
+    Chat model replaying the tool calls a SQL agent would make for a question.
+
+    Each agent step is decided from the number of tool results already in the
+    conversation: list tables, read the schema, run the question's SQL from
+    the benchmark question sets, then answer with the query result.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    latency: float = 0.0
+    model_name: str = "scripted-sql"
+    quota: Optional[FakeQuota] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-sql"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.quota is not None and not self.quota.admit():
+            request = httpx.Request("POST", "https://offline.invalid/chat/completions")
+            response = httpx.Response(429, request=request,
+                                      headers={"retry-after": f"{self.quota.retry_after():.3f}"})
+            raise openai.RateLimitError("Rate limit reached", response=response, body=None)
+        if self.latency:
+            time.sleep(self.latency)
+
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        tool_results = [m.content for m in messages if isinstance(m, ToolMessage)]
+        step = len(tool_results)
+
+        if step == 0:
+            message = self._tool_call("sql_db_list_tables", {"tool_input": ""})
+        elif step == 1:
+            table = tool_results[0].split(",")[0].strip()
+            message = self._tool_call("sql_db_schema", {"table_names": table})
+        elif step == 2:
+            table = tool_results[0].split(",")[0].strip()
+            message = self._tool_call("sql_db_query", {"query": sql_for_question(question, table)})
+        else:
+            message = AIMessage(content=f"Based on the query results: {tool_results[-1]}")
+
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = max(1, len(str(message.content)) // 4 + 10 * len(message.tool_calls))
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={
+                "model_name": self.model_name,
+                "token_usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+    @staticmethod
+    def _tool_call(name: str, args: Dict[str, Any]) -> AIMessage:
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{next(_call_ids)}"}])
+
+
+class FakeGoogleSearch:
+    """
+    Drop-in replacement for `serpapi.GoogleSearch` returning canned organic results.
+
+    Attributes:
+        latency (float): Seconds to sleep per call, shared by all instances
+        quota (FakeQuota): Throughput limit shared by all instances, if any
+    """
+
+    latency: float = 0.0
+    quota: Optional[FakeQuota] = None
+
+    def __init__(self, params: Dict[str, Any]):
+        self.params = params
+
+    def get_dict(self) -> Dict[str, Any]:
+        if self.quota is not None and not self.quota.admit():
+            return {"error": "Your account has exceeded the hourly throughput limit (429)."}
+        if self.latency:
+            time.sleep(self.latency)
+        query = self.params.get("q", "")
+        return {
+            "organic_results": [
+                {
+                    "title": f"Result {idx} for {query}",
+                    "link": f"https://example.org/{idx}",
+                    "snippet": f"Deterministic snippet {idx} about {query}.",
+                }
+                for idx in range(1, 6)
+            ]
+        }
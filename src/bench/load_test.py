@@ -0,0 +1,311 @@
+"""
+MediAide load-testing harness
+Simulates N concurrent Streamlit users against the MediAide API with the
+offline stub backends. Like the Streamlit app, each virtual user gets its own
+session, builds and initializes its own MediAide (unless --shared-app is
+given) and writes every answer to the conversation history store. Reports
+throughput, latency distribution, memory growth and SQLite lock contention
+as the number of users scales.
+
+Run from the project root:
+    python src/bench/load_test.py --users 1,2,4,8 --duration 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.bench.run_benchmarks import configure_offline, percentile
+
+# Relative frequency of each query type in a simulated session
+QUERY_MIX = {
+    "🌐 Web Search": 0.35,
+    "📈 Diabetes DB": 0.2,
+    "🩺 Cancer DB": 0.15,
+    "❤️ Heart Disease DB": 0.15,
+    "🔄 All Sources": 0.05,
+    "🎯 Risk Score": 0.1,
+}
+
+QUERY_DATASET = {
+    "🌐 Web Search": "web",
+    "📈 Diabetes DB": "diabetes",
+    "🩺 Cancer DB": "cancer",
+    "❤️ Heart Disease DB": "heart_disease",
+}
+
+RISK_PROFILES = [
+    ("diabetes", {"Glucose": 150, "BMI": 31, "Age": 55}),
+    ("cancer", {"Age": 60, "Smoking": 1, "GeneticRisk": 2}),
+    ("heart_disease", {"age": 58, "chol": 260, "cp": 2}),
+]
+
+
+def rss_mb() -> float:
+    """Return the current resident set size in MB (Linux), or 0 if unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+class LoadStats:
+    """Thread-safe collector for one load level."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors = 0
+        self.locked_errors = 0
+        self.history_waits: List[float] = []
+        self.initialize_times: List[float] = []
+
+    def record(self, query_type: str, seconds: float, success: bool, answer: str):
+        with self._lock:
+            self.latencies.setdefault(query_type, []).append(seconds)
+            if not success:
+                self.errors += 1
+                if "database is locked" in answer:
+                    self.locked_errors += 1
+
+    def record_history_write(self, seconds: float, locked: bool):
+        with self._lock:
+            self.history_waits.append(seconds)
+            if locked:
+                self.locked_errors += 1
+
+    def record_initialize(self, seconds: float):
+        with self._lock:
+            self.initialize_times.append(seconds)
+
+
+class ContentionLogHandler(logging.Handler):
+    """
+    Counts SQLite contention reported through MediAide's warning/error logs,
+    e.g. concurrent initialize() calls rebuilding tables under active readers.
+    """
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.locked = 0
+        self.rebuild_races = 0
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if "database is locked" in message:
+            self.locked += 1
+        elif "no such table" in message or "already exists" in message:
+            self.rebuild_races += 1
+
+
+def run_query(app, query_type: str, rng: random.Random) -> Dict[str, Any]:
+    """Issue one query of the given type the way the Streamlit UI would."""
+    from src.bench.questions import QUESTIONS
+
+    if query_type == "🎯 Risk Score":
+        dataset, features = rng.choice(RISK_PROFILES)
+        return app.score_risk(dataset, features)
+    if query_type == "🔄 All Sources":
+        question = rng.choice(QUESTIONS["web"])["question"]
+        return app.get_comprehensive_answer(question)
+
+    dataset = QUERY_DATASET[query_type]
+    question = rng.choice(QUESTIONS[dataset])["question"]
+    if dataset == "web":
+        return app.search_web(question)
+    return app.query_dataset(dataset, question)
+
+
+def virtual_user(user_id: int, deadline: float, think_time: float, shared_app, history,
+                 stats: LoadStats, start_barrier: threading.Barrier):
+    """
+    Simulate one user session until `deadline`.
+
+    Args:
+        user_id (int): Seed for the user's query sequence
+        deadline (float): perf_counter time at which to stop
+        think_time (float): Mean seconds between queries (exponential)
+        shared_app: A warm MediAide to share, or None to build one per session
+        history: The conversation history store
+        stats (LoadStats): Collector for results
+        start_barrier (threading.Barrier): Releases all users together
+    """
+    from src.main.app import MediAide
+    from src.main.history import compact_entry
+
+    rng = random.Random(user_id)
+    session_id = uuid.uuid4().hex
+    start_barrier.wait()
+
+    app = shared_app
+    if app is None:
+        start = time.perf_counter()
+        app = MediAide()
+        app.initialize()
+        stats.record_initialize(time.perf_counter() - start)
+
+    kinds, weights = zip(*QUERY_MIX.items())
+    while time.perf_counter() < deadline:
+        query_type = rng.choices(kinds, weights)[0]
+        start = time.perf_counter()
+        response = run_query(app, query_type, rng)
+        seconds = time.perf_counter() - start
+        success = response.get("success", True)
+        stats.record(query_type, seconds, success, str(response.get("answer", "")))
+
+        write_start = time.perf_counter()
+        locked = False
+        try:
+            history.append(session_id, compact_entry("load test", query_type, response, seconds))
+        except sqlite3.OperationalError as e:
+            locked = "locked" in str(e)
+        stats.record_history_write(time.perf_counter() - write_start, locked)
+
+        if think_time:
+            time.sleep(rng.expovariate(1 / think_time))
+
+
+def run_level(users: int, duration: float, think_time: float, shared_app, history) -> Dict[str, Any]:
+    """
+    Run one load level and summarize it.
+
+    Returns:
+        Dict[str, Any]: Throughput, latency percentiles, memory and contention figures
+    """
+    stats = LoadStats()
+    barrier = threading.Barrier(users)
+    contention = ContentionLogHandler()
+    logging.getLogger("src.main.app").addHandler(contention)
+    rss_before = rss_mb()
+    # Sessions that initialize spend part of the window building; start the clock anyway
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=virtual_user,
+                         args=(i, deadline, think_time, shared_app, history, stats, barrier))
+        for i in range(users)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    logging.getLogger("src.main.app").removeHandler(contention)
+
+    all_latencies = [v for values in stats.latencies.values() for v in values]
+    completed = len(all_latencies)
+    summary = {
+        "users": users,
+        "completed": completed,
+        "throughput": completed / elapsed,
+        "errors": stats.errors,
+        "latency": {
+            "p50": percentile(all_latencies, 50) if all_latencies else None,
+            "p95": percentile(all_latencies, 95) if all_latencies else None,
+            "p99": percentile(all_latencies, 99) if all_latencies else None,
+        },
+        "by_query_type": {
+            query_type: {"count": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95)}
+            for query_type, values in stats.latencies.items()
+        },
+        "memory": {"rss_before_mb": rss_before, "rss_after_mb": rss_mb(),
+                   "rss_growth_mb": rss_mb() - rss_before},
+        "sqlite": {
+            "locked_errors": stats.locked_errors + contention.locked,
+            "rebuild_races": contention.rebuild_races,
+            "history_write_p50": percentile(stats.history_waits, 50) if stats.history_waits else None,
+            "history_write_p99": percentile(stats.history_waits, 99) if stats.history_waits else None,
+        },
+    }
+    if stats.initialize_times:
+        summary["initialize"] = {
+            "p50": percentile(stats.initialize_times, 50),
+            "max": max(stats.initialize_times),
+        }
+    return summary
+
+
+def print_level(summary: Dict[str, Any]):
+    """Print one load level's summary line block."""
+    latency = summary["latency"]
+    print(f"\n👥 {summary['users']} users: {summary['completed']} queries, "
+          f"{summary['throughput']:.1f} queries/s, {summary['errors']} errors")
+    if latency["p50"] is not None:
+        print(f"   latency p50 {latency['p50'] * 1000:.0f}ms, p95 {latency['p95'] * 1000:.0f}ms, "
+              f"p99 {latency['p99'] * 1000:.0f}ms")
+    if "initialize" in summary:
+        print(f"   initialize() p50 {summary['initialize']['p50']:.2f}s, max {summary['initialize']['max']:.2f}s")
+    print(f"   RSS {summary['memory']['rss_before_mb']:.0f} -> {summary['memory']['rss_after_mb']:.0f} MB "
+          f"({summary['memory']['rss_growth_mb']:+.1f} MB)")
+    sqlite_stats = summary["sqlite"]
+    if sqlite_stats["history_write_p50"] is not None:
+        print(f"   SQLite: {sqlite_stats['locked_errors']} lock errors, "
+              f"{sqlite_stats['rebuild_races']} table rebuild races, history write "
+              f"p50 {sqlite_stats['history_write_p50'] * 1000:.1f}ms, p99 {sqlite_stats['history_write_p99'] * 1000:.1f}ms")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the load test at each requested user count."""
+    parser = argparse.ArgumentParser(description="Simulate concurrent MediAide users")
+    parser.add_argument("--users", default="1,2,4,8", help="Comma separated virtual user counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per load level")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean seconds between a user's queries")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Simulated seconds per LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Simulated seconds per web search")
+    parser.add_argument("--shared-app", action="store_true",
+                        help="Share one warm MediAide instead of initializing one per session")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    os.chdir(project_root)
+    configure_offline(args.llm_latency, args.search_latency)
+    from src.main.app import MediAide
+    from src.main.history import SQLiteHistoryStore
+
+    history_path = os.path.join(tempfile.mkdtemp(prefix="mediaide-load-"), "history.db")
+    history = SQLiteHistoryStore(history_path)
+
+    results = []
+    # Agents print their reasoning when verbose; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        shared_app = None
+        if args.shared_app:
+            shared_app = MediAide()
+            shared_app.initialize()
+        for users in [int(n) for n in args.users.split(",")]:
+            results.append(run_level(users, args.duration, args.think_time, shared_app, history))
+
+    print("\n📈 MediAide Load Test")
+    print("=" * 60)
+    print(f"Mode: {'shared warm instance' if args.shared_app else 'one MediAide per session'}, "
+          f"think time {args.think_time}s, LLM latency {args.llm_latency}s, search latency {args.search_latency}s")
+    for summary in results:
+        print_level(summary)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+MediAide profiling run
+Profiles initialize() and every benchmark question (database queries and
+web searches) once with the offline stub backends, and prints where each
+call spent its time per layer (MediAide, LangChain, SQLAlchemy, pandas,
+network) together with the profile files written for offline analysis.
+
+Run from the project root:
+    python src/bench/profile_queries.py --mode sample --llm-latency 0.05
+    python src/bench/profile_queries.py --mode cprofile --memory --output-dir /tmp/profiles
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.bench.run_benchmarks import configure_offline
+
+
+def read_summary(files: Dict[str, str]) -> Dict[str, Any]:
+    with open(files["summary"]) as f:
+        return json.load(f)
+
+
+def latest_summary(directory: str, name: str) -> Optional[Dict[str, Any]]:
+    """Return the newest profile summary written for `name` in a directory."""
+    paths = sorted(Path(directory).glob(f"*-{name}-*.json"), key=os.path.getmtime)
+    if not paths:
+        return None
+    with open(paths[-1]) as f:
+        return json.load(f)
+
+
+def print_profile(label: str, summary: Optional[Dict[str, Any]]):
+    if summary is None:
+        print(f"\n❌ {label}: no profile written")
+        return
+    print(f"\n🔬 {label}: {summary['seconds'] * 1000:.0f} ms")
+    layers = summary.get("layers")
+    if layers:
+        print("   " + ", ".join(f"{layer} {share:.0%}" for layer, share in layers.items()))
+    if "function_calls" in summary:
+        print(f"   {summary['function_calls']} function calls")
+    for allocation in summary.get("top_allocations", [])[:3]:
+        print(f"   {allocation['bytes'] / 1024:.0f} KiB at {allocation['site']}")
+    print(f"   {summary['files'].get('svg') or summary['files'].get('prof')}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Profile initialize() and the benchmark questions, and print the per-layer breakdown."""
+    parser = argparse.ArgumentParser(description="Profile MediAide's hot paths offline")
+    parser.add_argument("--mode", default="sample", choices=["sample", "cprofile"], help="Profiler to use")
+    parser.add_argument("--output-dir", help="Profile directory (default MEDIAIDE_PROFILE_DIR)")
+    parser.add_argument("--memory", action="store_true", help="Also write allocation snapshots")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Simulated seconds per web search")
+    args = parser.parse_args(argv)
+
+    os.chdir(project_root)
+    if args.output_dir:
+        os.environ["MEDIAIDE_PROFILE_DIR"] = args.output_dir
+    if args.memory:
+        os.environ["MEDIAIDE_PROFILE_MEMORY"] = "1"
+    configure_offline(args.llm_latency, args.search_latency)
+    from src.bench.questions import QUESTIONS
+    from src.main.app import MediAide
+    from src.main.profiling import profile_dir, profiling
+
+    reports = []
+    # Agents print their reasoning when verbose; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = MediAide()
+        with profiling(args.mode):
+            if not app.initialize():
+                raise RuntimeError("MediAide failed to initialize")
+        reports.append(("initialize()", latest_summary(profile_dir(), "initialize")))
+
+        for dataset, items in QUESTIONS.items():
+            for item in items:
+                with profiling(args.mode):
+                    if dataset == "web":
+                        response = app.search_web(item["question"])
+                    else:
+                        response = app.query_dataset(dataset, item["question"])
+                files = response.get("metadata", {}).get("profile")
+                reports.append((f"{dataset}: {item['question']}", read_summary(files) if files else None))
+
+    print(f"\n🔬 MediAide Profile ({args.mode})")
+    print("=" * 60)
+    for label, summary in reports:
+        print_profile(label, summary)
+    print(f"\nProfiles written to {profile_dir()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Fixed benchmark question sets
+Representative questions per dataset, each paired with the SQL the scripted
+chat model issues for it so every run executes the same queries.
+"""
+
+from typing import Dict, List
+
+
+QUESTIONS: Dict[str, List[Dict[str, str]]] = {
+    'diabetes': [
+        {"question": "How many records are in the diabetes dataset?",
+         "sql": "SELECT COUNT(*) FROM diabetes"},
+        {"question": "What is the average glucose level for patients with diabetes?",
+         "sql": "SELECT AVG(Glucose) FROM diabetes WHERE Outcome = 1"},
+        {"question": "What is the average BMI by outcome?",
+         "sql": "SELECT Outcome, AVG(BMI) FROM diabetes GROUP BY Outcome"},
+        {"question": "How many patients over 50 have diabetes?",
+         "sql": "SELECT COUNT(*) FROM diabetes WHERE Age > 50 AND Outcome = 1"},
+    ],
+    'cancer': [
+        {"question": "How many records are in the cancer dataset?",
+         "sql": "SELECT COUNT(*) FROM cancer"},
+        {"question": "What fraction of smokers have a cancer diagnosis?",
+         "sql": "SELECT AVG(Diagnosis) FROM cancer WHERE Smoking = 1"},
+        {"question": "What is the diagnosis rate by genetic risk?",
+         "sql": "SELECT GeneticRisk, AVG(Diagnosis) FROM cancer GROUP BY GeneticRisk"},
+        {"question": "What is the average age of diagnosed patients by gender?",
+         "sql": "SELECT Gender, AVG(Age) FROM cancer WHERE Diagnosis = 1 GROUP BY Gender"},
+    ],
+    'heart_disease': [
+        {"question": "How many records are in the heart disease dataset?",
+         "sql": "SELECT COUNT(*) FROM heart_disease"},
+        {"question": "What is the heart disease rate by chest pain type?",
+         "sql": "SELECT cp, AVG(target) FROM heart_disease GROUP BY cp"},
+        {"question": "What is the average cholesterol for patients with heart disease?",
+         "sql": "SELECT AVG(chol) FROM heart_disease WHERE target = 1"},
+        {"question": "How many patients have exercise induced angina by sex?",
+         "sql": "SELECT sex, COUNT(*) FROM heart_disease WHERE exang = 1 GROUP BY sex"},
+    ],
+    'web': [
+        {"question": "What are the symptoms of type 2 diabetes?"},
+        {"question": "What are the risk factors for lung cancer?"},
+        {"question": "How is coronary artery disease treated?"},
+    ],
+}
+
+_SQL_BY_QUESTION = {
+    item["question"]: item["sql"]
+    for items in QUESTIONS.values()
+    for item in items
+    if "sql" in item
+}
+
+
+def sql_for_question(question: str, table: str) -> str:
+    """
+    Return the scripted SQL for a benchmark question.
+
+    Unknown questions fall back to a row count of `table`.
+    """
+    return _SQL_BY_QUESTION.get(question, f"SELECT COUNT(*) FROM {table}")
@@ -0,0 +1,155 @@
+"""
+MediAide rate limiter test
+Bursts interactive and batch requests at one MediAide instance whose fake
+LLM and SerpAPI backends enforce a provider quota (FakeQuota), once without
+and once with the provider rate limiters. Reports how many calls the fake
+providers answered with 429, how many requests failed, and the latency of
+each priority: with the limiters on, calls queue below the quota instead of
+failing, and interactive requests finish ahead of batch ones.
+
+Run from the project root:
+    python src/bench/rate_limit_test.py --users 8 --calls 4
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.bench.run_benchmarks import configure_offline, percentile
+
+
+def issue_calls(app, priority: str, user: int, calls: int, latencies: List[float], failures: List[str],
+                barrier: threading.Barrier):
+    """Issue one user's calls at the given priority, alternating database queries and searches."""
+    from src.bench.questions import QUESTIONS
+    from src.main.context import request_context
+
+    datasets = [dataset for dataset in QUESTIONS if dataset != "web"]
+    barrier.wait()
+    for i in range(calls):
+        start = time.perf_counter()
+        with request_context("rate_limit_test", priority=priority):
+            if (user + i) % 2:
+                question = QUESTIONS["web"][i % len(QUESTIONS["web"])]["question"]
+                response = app.search_web(question)
+                ok = response["success"] and "Search results for" in response["answer"]
+            else:
+                dataset = datasets[(user + i) % len(datasets)]
+                response = app.query_dataset(dataset, QUESTIONS[dataset][0]["question"])
+                ok = response["success"]
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            failures.append(str(response["answer"])[:120])
+
+
+def run_scenario(app, limited: bool, users: int, calls: int, llm_quota: int, search_quota: int) -> Dict[str, Any]:
+    """
+    Burst `users` interactive and `users` batch users at the fake providers.
+
+    Args:
+        app: Initialized MediAide
+        limited (bool): Put the rate limiters in front of the providers
+        users (int): Users per priority
+        calls (int): Calls per user
+        llm_quota (int): LLM calls per second the fake provider accepts
+        search_quota (int): Searches per second the fake provider accepts
+
+    Returns:
+        Dict[str, Any]: Provider rejections, failures and latency per priority
+    """
+    from src.main import settings
+    from src.main.context import BATCH, INTERACTIVE
+    from src.main.ratelimit import rate_limited_chat_model, reset_limiters
+    from src.bench.fakes import FakeGoogleSearch, FakeQuota, ScriptedSQLChatModel
+
+    # Limit slightly below the providers' quotas, as a deployment would
+    os.environ["MEDIAIDE_LLM_RATE"] = str(llm_quota * 0.9 if limited else 0)
+    os.environ["MEDIAIDE_LLM_BURST"] = str(max(1, llm_quota // 4))
+    os.environ["MEDIAIDE_SERPAPI_RATE"] = str(search_quota * 0.9 if limited else 0)
+    os.environ["MEDIAIDE_SERPAPI_BURST"] = str(max(1, search_quota // 4))
+    reset_limiters()
+
+    llm_usage, search_usage = FakeQuota(llm_quota), FakeQuota(search_quota)
+    settings.llm = rate_limited_chat_model(ScriptedSQLChatModel(quota=llm_usage))
+    FakeGoogleSearch.quota = search_usage
+
+    latencies: Dict[str, List[float]] = {INTERACTIVE: [], BATCH: []}
+    failures: Dict[str, List[str]] = {INTERACTIVE: [], BATCH: []}
+    barrier = threading.Barrier(2 * users)
+    threads = [
+        threading.Thread(target=issue_calls,
+                         args=(app, priority, user, calls, latencies[priority], failures[priority], barrier))
+        for user in range(users) for priority in (BATCH, INTERACTIVE)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    FakeGoogleSearch.quota = None
+
+    return {
+        "limited": limited,
+        "seconds": elapsed,
+        "provider_429s": {"llm": llm_usage.rejected, "serpapi": search_usage.rejected},
+        "by_priority": {
+            priority: {"failures": len(failures[priority]), "p50": percentile(values, 50),
+                       "p95": percentile(values, 95), "examples": failures[priority][:2]}
+            for priority, values in latencies.items()
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run both scenarios and print the comparison."""
+    parser = argparse.ArgumentParser(description="Compare MediAide under provider quotas with and without rate limiting")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent users per priority")
+    parser.add_argument("--calls", type=int, default=4, help="Calls per user")
+    parser.add_argument("--llm-quota", type=int, default=20, help="LLM calls per second the fake provider accepts")
+    parser.add_argument("--search-quota", type=int, default=4, help="Searches per second the fake provider accepts")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    os.chdir(project_root)
+    configure_offline()
+    from src.main.app import MediAide
+
+    # Agents print their reasoning when verbose; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = MediAide()
+        if not app.initialize():
+            raise RuntimeError("MediAide failed to initialize")
+        results = [run_scenario(app, limited, args.users, args.calls, args.llm_quota, args.search_quota)
+                   for limited in (False, True)]
+
+    print("\n🚦 MediAide Rate Limiter Test")
+    print("=" * 60)
+    print(f"{args.users} interactive + {args.users} batch users, {args.calls} calls each; provider quotas "
+          f"{args.llm_quota} LLM calls/s, {args.search_quota} searches/s")
+    for result in results:
+        print(f"\n{'🟢 With' if result['limited'] else '🔴 Without'} rate limiting: {result['seconds']:.1f}s, "
+              f"provider 429s: {result['provider_429s']['llm']} LLM, {result['provider_429s']['serpapi']} SerpAPI")
+        for priority, stats in result["by_priority"].items():
+            print(f"   {priority:<11} {stats['failures']} failed, p50 {stats['p50']:.2f}s, p95 {stats['p95']:.2f}s")
+            for example in stats["examples"]:
+                print(f"      • {example}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+MediAide query rewrite check
+Runs WHERE clauses that are easy to split wrongly (OR and AND next to
+parentheses, BETWEEN ... AND, disjunctions mixed with conjunctions, literals
+of another type than the column) through every path that answers a query
+without running it as written: partition routing, materialized view
+rewrites and prefetched follow-up views. Each answer is compared with the
+one SQLite gives for the original statement; a path may decline a query,
+but must never answer it differently.
+
+Run from the project root:
+    python src/bench/rewrite_check.py --dataset diabetes
+Exits with status 1 if any answer was wrong.
+"""
+
+import argparse
+import contextlib
+import io
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.bench.run_benchmarks import configure_offline
+
+# Filters over the diabetes columns; each is run through every query template
+WHERES = [
+    "Outcome = 1",
+    "Age > 60 AND Age < 70 OR(Age < 25)",
+    "Age > 60 AND Age < 70 OR (Age < 25)",
+    "(Age < 25)OR(Age > 60)",
+    "Outcome = 0 OR(Outcome = 1) AND Outcome = 1",
+    "Outcome = 0 OR Outcome = 1 AND Outcome = 1",
+    "Outcome = 1 AND(Age > 40)",
+    "(Outcome = 1)AND(Age > 40)",
+    "Outcome = 1 AND (Age < 25 OR Age > 60)",
+    "Age BETWEEN 20 AND 30",
+    "Age BETWEEN 20 AND(30)",
+    "Age BETWEEN 20 AND 30 AND Outcome = 1",
+    "Age > 30 AND Age > '40'",
+]
+
+TEMPLATES = [
+    "SELECT COUNT(*) AS n, AVG(Glucose) AS glucose FROM diabetes WHERE {where}",
+    "SELECT Outcome, COUNT(*) AS n, AVG(BMI) AS bmi FROM diabetes WHERE {where} GROUP BY Outcome",
+]
+
+# Answers that seed the prefetched views the follow-ups may be served from
+PREFETCH_SEEDS = [
+    "SELECT AVG(Glucose) FROM diabetes WHERE Outcome = 1",
+    "SELECT Outcome, COUNT(*) FROM diabetes WHERE Age BETWEEN 20 AND 30 GROUP BY Outcome",
+]
+
+
+def canonical(rows: List[Dict[str, Any]]) -> List[tuple]:
+    """Rows as comparable tuples; floats to 9 significant digits (summation order differs)."""
+    return sorted(tuple(float(f"{v:.9g}") if isinstance(v, float) else v for v in row.values()) for row in rows)
+
+
+def run_sql(conn: sqlite3.Connection, sql: str) -> List[Dict[str, Any]]:
+    cursor = conn.execute(sql)
+    columns = [d[0] for d in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def check(path: str, sql: str, expected: List[Dict[str, Any]],
+          answer: Callable[[], Optional[List[Dict[str, Any]]]], failures: List[str]) -> str:
+    """Run one path's answer and compare it; returns answered, declined or wrong."""
+    try:
+        rows = answer()
+    except Exception as e:
+        failures.append(f"{path}: {sql}\n      raised {type(e).__name__}: {e}")
+        return "wrong"
+    if rows is None:
+        return "declined"
+    if canonical(rows) != canonical(expected):
+        failures.append(f"{path}: {sql}\n      got {canonical(rows)}\n      expected {canonical(expected)}")
+        return "wrong"
+    return "answered"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Compare every rewrite path with SQLite; returns the exit status."""
+    parser = argparse.ArgumentParser(description="Check MediAide's query rewrites against SQLite")
+    parser.add_argument("--dataset", default="diabetes", choices=["diabetes"], help="Dataset the cases are written for")
+    args = parser.parse_args(argv)
+
+    configure_offline()
+    from src.main.partitions import route_query
+    from src.main.prefetch import prefetcher
+    from src.main.reload import database_path, ensure_dataset
+    from src.main.views import rewrite_query
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ensure_dataset(args.dataset)
+    path = database_path(args.dataset)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    queries = [template.format(where=where) for template in TEMPLATES for where in WHERES]
+    expected = {sql: run_sql(conn, sql) for sql in queries}
+
+    failures: List[str] = []
+    counts: Dict[str, Dict[str, int]] = {}
+
+    def tally(name: str, outcome: str):
+        counts.setdefault(name, {"answered": 0, "declined": 0, "wrong": 0})[outcome] += 1
+
+    def from_view(sql: str) -> Optional[List[Dict[str, Any]]]:
+        rewritten = rewrite_query(args.dataset, sql, path)
+        return run_sql(conn, rewritten) if rewritten else None
+
+    for sql in queries:
+        tally("partitions", check("partitions", sql, expected[sql], lambda: route_query(args.dataset, sql), failures))
+        tally("views", check("views", sql, expected[sql], lambda: from_view(sql), failures))
+
+    for seed in PREFETCH_SEEDS:
+        prefetcher.invalidate(args.dataset)
+        prefetcher.schedule(args.dataset, seed)
+        prefetcher.wait_idle(30)
+        for sql in queries:
+            tally("prefetch", check(f"prefetch after {seed!r}", sql, expected[sql],
+                                    lambda: prefetcher.answer(args.dataset, sql), failures))
+    conn.close()
+
+    print("\n🧪 MediAide Query Rewrite Check")
+    print("=" * 60)
+    for name, outcome in counts.items():
+        print(f"   {name:<11} {outcome['answered']} answered, {outcome['declined']} declined, {outcome['wrong']} wrong")
+    for failure in failures:
+        print(f"\n❌ {failure}")
+    if not failures:
+        print("\n✅ Every rewritten answer matched SQLite")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+MediAide offline benchmark suite
+Measures cold start, initialize(), per-query latency, throughput under
+concurrency and memory with the scripted LLM and fake SerpAPI backends, then
+compares the results against a stored baseline.
+
+Run from the project root:
+    python src/bench/run_benchmarks.py
+    python src/bench/run_benchmarks.py --update-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# Placeholder credentials so settings.py imports without real accounts
+OFFLINE_ENV = {
+    "OPENAI_API_KEY": "offline",
+    "OPENAI_API_BASE": "https://offline.invalid",
+    "AZURE_OPENAI_ENDPOINT": "https://offline.invalid",
+    "OPENAI_API_VERSION": "2024-02-01",
+    "gpt_deployment_name": "offline",
+    "BASE_URL": "https://offline.invalid",
+    "API_KEY": "offline",
+    "MODEL_NAME": "offline",
+    "SERPAPI_KEY": "offline",
+    # The stub backends have no quota; rate_limit_test.py sets its own limits
+    "MEDIAIDE_LLM_RATE": "0",
+    "MEDIAIDE_SERPAPI_RATE": "0",
+}
+
+# Metrics where larger values are better; everything else is a cost
+HIGHER_IS_BETTER = ("throughput",)
+
+
+def configure_offline(llm_latency: float = 0.0, search_latency: float = 0.0, llm_cache: bool = False):
+    """
+    Point MediAide at the scripted LLM and fake SerpAPI backends.
+
+    Args:
+        llm_latency (float): Seconds added to every chat completion
+        search_latency (float): Seconds added to every web search
+        llm_cache (bool): Put the LLM response cache in front of the scripted model
+    """
+    for key, value in OFFLINE_ENV.items():
+        os.environ.setdefault(key, value)
+
+    from src.main import settings
+    from src.tool import MedicalWebSearchTool
+    from src.bench.fakes import ScriptedSQLChatModel, FakeGoogleSearch
+    from src.main.llm_cache import cached_chat_model
+    from src.main.ratelimit import rate_limited_chat_model
+
+    settings.llm = rate_limited_chat_model(ScriptedSQLChatModel(latency=llm_latency))
+    if llm_cache:
+        settings.llm = cached_chat_model(settings.llm)
+    FakeGoogleSearch.latency = search_latency
+    MedicalWebSearchTool.GoogleSearch = FakeGoogleSearch
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Return the q-th percentile (0-100) using linear interpolation."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def measure_cold_start() -> float:
+    """Time importing the MediAide application in a fresh interpreter."""
+    code = (
+        "import time; start = time.perf_counter(); "
+        "import src.main.app; print(time.perf_counter() - start)"
+    )
+    env = {**OFFLINE_ENV, **os.environ}
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=project_root, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def run_query(app, dataset: str, question: str) -> Tuple[float, bool]:
+    """Run one question against a dataset and return (seconds, success)."""
+    start = time.perf_counter()
+    if dataset == 'web':
+        response = app.search_web(question)
+    else:
+        response = app.query_dataset(dataset, question)
+    return time.perf_counter() - start, bool(response.get('success'))
+
+
+def workload() -> List[Tuple[str, str]]:
+    """Return the fixed (dataset, question) pairs used by the benchmarks."""
+    from src.bench.questions import QUESTIONS
+    return [(dataset, item["question"]) for dataset, items in QUESTIONS.items() for item in items]
+
+
+def measure_query_latency(app, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Run every question `repeat` times sequentially.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Per-dataset mean/p50/p95 seconds and error count
+    """
+    timings: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for _ in range(repeat):
+        for dataset, question in workload():
+            seconds, success = run_query(app, dataset, question)
+            timings.setdefault(dataset, []).append(seconds)
+            errors[dataset] = errors.get(dataset, 0) + (0 if success else 1)
+
+    return {
+        dataset: {
+            "mean": statistics.mean(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "errors": errors[dataset],
+        }
+        for dataset, values in timings.items()
+    }
+
+
+def measure_throughput(app, concurrency: int, total: int) -> Dict[str, float]:
+    """
+    Run `total` queries from `concurrency` threads against one instance.
+
+    Returns:
+        Dict[str, float]: Queries per second and error count
+    """
+    queries = (workload() * (total // len(workload()) + 1))[:total]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda item: run_query(app, *item), queries))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput": total / elapsed,
+        "errors": sum(1 for _, success in results if not success),
+    }
+
+
+def measure_ingest(rows: int, dataset: str = "diabetes") -> Dict[str, float]:
+    """
+    Time parsing a dataset CSV resampled to `rows` rows and validating it.
+
+    The overhead is validation time relative to parse time.
+    """
+    import pandas as pd
+    from src.main.datasets import get_dataset
+    from src.main.validation import read_csv, validate
+
+    path = project_root / "src" / "database" / f"bench_{dataset}_{rows}.csv"
+    source = pd.read_csv(project_root / get_dataset(dataset)['csv'])
+    source.sample(rows, replace=True, random_state=0).to_csv(path, index=False)
+    try:
+        start = time.perf_counter()
+        df = read_csv(dataset, str(path))
+        parse = time.perf_counter() - start
+        start = time.perf_counter()
+        validate(dataset, df)
+        check = time.perf_counter() - start
+    finally:
+        os.remove(path)
+    return {"rows": rows, "parse_seconds": parse, "validate_seconds": check, "overhead": check / parse}
+
+
+def run_benchmarks(repeat: int, concurrency: List[int], total: int,
+                   llm_latency: float, search_latency: float, llm_cache: bool = False,
+                   ingest_rows: int = 0) -> Dict[str, Any]:
+    """
+    Run the full suite.
+
+    Returns:
+        Dict[str, Any]: Nested results keyed by benchmark name
+    """
+    results: Dict[str, Any] = {"cold_start_seconds": measure_cold_start()}
+
+    configure_offline(llm_latency, search_latency, llm_cache)
+    from src.main.app import MediAide
+
+    # Agents print their reasoning when verbose; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = MediAide()
+        start = time.perf_counter()
+        if not app.initialize():
+            raise RuntimeError("MediAide failed to initialize")
+        results["initialize_seconds"] = time.perf_counter() - start
+
+        tracemalloc.start()
+        results["query_latency"] = measure_query_latency(app, repeat)
+        results["concurrency"] = {
+            str(workers): measure_throughput(app, workers, total) for workers in concurrency
+        }
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    results["memory"] = {
+        "traced_peak_mb": peak / 2**20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    if ingest_rows:
+        results["ingest"] = measure_ingest(ingest_rows)
+    return results
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested results into dotted metric names."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare results against a baseline.
+
+    Args:
+        results: Current results
+        baseline: Stored baseline results
+        tolerance (float): Allowed relative slowdown, e.g. 0.5 for 50%
+
+    Returns:
+        List[str]: Human readable regressions (empty if none)
+    """
+    current, reference = flatten(results), flatten(baseline)
+    regressions = []
+    for name, base in reference.items():
+        value = current.get(name)
+        if value is None or not base:
+            continue
+        if name.endswith(".errors"):
+            if value > base:
+                regressions.append(f"{name}: {value} errors (baseline {base})")
+        elif name.endswith(HIGHER_IS_BETTER):
+            if value < base / (1 + tolerance):
+                regressions.append(f"{name}: {value:.3f} (baseline {base:.3f})")
+        elif value > base * (1 + tolerance):
+            regressions.append(f"{name}: {value:.4f} (baseline {base:.4f})")
+    return regressions
+
+
+def print_report(results: Dict[str, Any]):
+    """Print the benchmark results."""
+    print("\n📊 MediAide Benchmark Results")
+    print("=" * 60)
+    print(f"  • Cold start (import): {results['cold_start_seconds']:.3f}s")
+    print(f"  • initialize(): {results['initialize_seconds']:.3f}s")
+    print("\n⏱️ Per-query latency:")
+    for dataset, stats in results["query_latency"].items():
+        print(f"  • {dataset}: mean {stats['mean'] * 1000:.1f}ms, p50 {stats['p50'] * 1000:.1f}ms, "
+              f"p95 {stats['p95'] * 1000:.1f}ms, errors {stats['errors']}")
+    print("\n🚀 Throughput:")
+    for workers, stats in results["concurrency"].items():
+        print(f"  • {workers} threads: {stats['throughput']:.1f} queries/s, errors {stats['errors']}")
+    print("\n💾 Memory:")
+    print(f"  • Traced peak: {results['memory']['traced_peak_mb']:.1f} MB")
+    print(f"  • Max RSS: {results['memory']['max_rss_mb']:.1f} MB")
+    if "ingest" in results:
+        ingest = results["ingest"]
+        print(f"\n📥 Ingestion ({ingest['rows']:,} rows):")
+        print(f"  • Parse {ingest['parse_seconds']:.2f}s, validation {ingest['validate_seconds']:.2f}s "
+              f"({ingest['overhead']:.1%} overhead)")
+
+
+def main():
+    """Run the benchmark suite and compare against the baseline."""
+    parser = argparse.ArgumentParser(description="Offline MediAide benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Sequential passes over the question sets")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma separated thread counts")
+    parser.add_argument("--total", type=int, default=60, help="Queries per concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Simulated seconds per web search")
+    parser.add_argument("--llm-cache", action="store_true", help="Enable the LLM response cache")
+    parser.add_argument("--ingest-rows", type=int, default=0,
+                        help="Also time CSV validation on this many rows (e.g. 10000000)")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative regression")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    os.chdir(project_root)
+    results = run_benchmarks(
+        args.repeat,
+        [int(n) for n in args.concurrency.split(",")],
+        args.total,
+        args.llm_latency,
+        args.search_latency,
+        args.llm_cache,
+        args.ingest_rows,
+    )
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Baseline updated: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\n⚠️ No baseline found. Run with --update-baseline to create one.")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against baseline:")
+        for regression in regressions:
+            print(f"  • {regression}")
+        sys.exit(1)
+    print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+MediAide concurrency stress test
+Hammers one shared, warm MediAide instance from many threads (and from
+asyncio tasks through MediAide.run_async) with the offline stub backends,
+and checks every response against the answer the same call gives when run
+alone. A response that differs, leaks SQL captured by another request or
+reuses another request's id is a correctness failure.
+
+While the workers run, the chat model in settings.llm is swapped back and
+forth between two equivalent scripted models, so requests that read the
+model more than once would mix them.
+
+Run from the project root:
+    python src/bench/stress_test.py --threads 16 --calls 50
+Exits with status 1 if any response was wrong.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.bench.run_benchmarks import configure_offline, percentile
+
+RISK_PROFILES = [
+    ("diabetes", {"Glucose": 150, "BMI": 31, "Age": 55}),
+    ("cancer", {"Age": 60, "Smoking": 1, "GeneticRisk": 2}),
+    ("heart_disease", {"age": 58, "chol": 260, "cp": 2}),
+]
+
+PAGE_QUERIES = [
+    ("diabetes", "SELECT Glucose, BMI FROM diabetes WHERE Outcome = 1"),
+    ("heart_disease", "SELECT age, chol FROM heart_disease ORDER BY age"),
+]
+
+# Fields that vary between runs of the same call
+_VOLATILE = {"sql_ms", "total_ms", "request_id", "profile"}
+# Aggregates answered from views or prefetched follow-ups may differ in the
+# last digits (summation order), so floats are compared to 9 significant digits
+_FLOAT = re.compile(r"\d+\.\d{10,}")
+
+
+def operations() -> List[Tuple[str, tuple]]:
+    """Return every call the stress test issues, as (method name, arguments)."""
+    from src.bench.questions import QUESTIONS
+
+    calls = []
+    for dataset, items in QUESTIONS.items():
+        for item in items:
+            if dataset == "web":
+                calls.append(("search_web", (item["question"],)))
+            else:
+                calls.append(("query_dataset", (dataset, item["question"])))
+    for dataset, features in RISK_PROFILES:
+        calls.append(("score_risk", (dataset, features)))
+        calls.append(("find_similar_patients", (dataset, features, 10)))
+    for dataset, sql in PAGE_QUERIES:
+        calls.append(("page_query", (dataset, sql, None, 20)))
+    return calls
+
+
+def fingerprint(response: Dict[str, Any]) -> str:
+    """Return a response's deterministic content, without timings and request ids."""
+    def strip(value):
+        if isinstance(value, dict):
+            return {key: strip(item) for key, item in value.items() if key not in _VOLATILE}
+        if isinstance(value, list):
+            return [strip(item) for item in value]
+        if isinstance(value, float):
+            return float(f"{value:.9g}")
+        if isinstance(value, str):
+            return _FLOAT.sub(lambda match: f"{float(match.group()):.9g}", value)
+        return value
+    return json.dumps(strip(response), sort_keys=True, default=str)
+
+
+class StressStats:
+    """Thread-safe collector of latencies and failures."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.failures: List[str] = []
+        self.request_ids: List[str] = []
+
+    def record(self, name: str, args: tuple, response: Dict[str, Any], expected: str, seconds: float):
+        problems = []
+        if not response.get("success", True):
+            problems.append(f"failed: {response.get('answer')}")
+        elif fingerprint(response) != expected:
+            problems.append("answer differs from the sequential run")
+        request_id = response.get("metadata", {}).get("request_id")
+        with self._lock:
+            self.latencies.append(seconds)
+            if request_id:
+                self.request_ids.append(request_id)
+            self.failures += [f"{name}{args}: {problem}" for problem in problems]
+
+
+def worker(app, calls: List[Tuple[str, tuple, str]], count: int, seed: int, stats: StressStats,
+           barrier: threading.Barrier):
+    """Issue `count` random calls against the shared instance."""
+    rng = random.Random(seed)
+    barrier.wait()
+    for _ in range(count):
+        name, args, expected = rng.choice(calls)
+        start = time.perf_counter()
+        try:
+            response = getattr(app, name)(*args)
+        except Exception as e:
+            response = {"answer": f"raised {e!r}", "success": False}
+        stats.record(name, args, response, expected, time.perf_counter() - start)
+
+
+async def async_workers(app, calls: List[Tuple[str, tuple, str]], tasks: int, count: int,
+                        stats: StressStats):
+    """Issue the same random calls from concurrent asyncio tasks."""
+    async def task(seed: int):
+        rng = random.Random(seed)
+        for _ in range(count):
+            name, args, expected = rng.choice(calls)
+            start = time.perf_counter()
+            try:
+                response = await app.run_async(name, *args)
+            except Exception as e:
+                response = {"answer": f"raised {e!r}", "success": False}
+            stats.record(name, args, response, expected, time.perf_counter() - start)
+
+    await asyncio.gather(*(task(1000 + i) for i in range(tasks)))
+
+
+def swap_models(stop: threading.Event, interval: float) -> int:
+    """Alternate settings.llm between two equivalent scripted models until `stop` is set."""
+    from src.main import settings
+    from src.bench.fakes import ScriptedSQLChatModel
+
+    models = [settings.llm, ScriptedSQLChatModel(latency=getattr(settings.llm, "latency", 0.0),
+                                                 model_name="scripted-sql-b")]
+    swaps = 0
+    while not stop.wait(interval):
+        swaps += 1
+        settings.llm = models[swaps % 2]
+    settings.llm = models[0]
+    return swaps
+
+
+def run_stress(app, calls: List[Tuple[str, tuple, str]], threads: int, count: int,
+               swap_interval: float, use_asyncio: bool) -> Dict[str, Any]:
+    """
+    Run one stress round and summarize it.
+
+    Returns:
+        Dict[str, Any]: Throughput, latency percentiles and correctness figures
+    """
+    stats = StressStats()
+    stop = threading.Event()
+    swaps: List[int] = []
+    swapper = threading.Thread(target=lambda: swaps.append(swap_models(stop, swap_interval)), daemon=True)
+    swapper.start()
+
+    start = time.perf_counter()
+    if use_asyncio:
+        asyncio.run(async_workers(app, calls, threads, count, stats))
+    else:
+        barrier = threading.Barrier(threads)
+        workers = [threading.Thread(target=worker, args=(app, calls, count, i, stats, barrier))
+                   for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    swapper.join()
+
+    completed = len(stats.latencies)
+    return {
+        "mode": "asyncio" if use_asyncio else "threads",
+        "workers": threads,
+        "completed": completed,
+        "throughput": completed / elapsed,
+        "latency": {"p50": percentile(stats.latencies, 50), "p99": percentile(stats.latencies, 99)},
+        "model_swaps": swaps[0] if swaps else 0,
+        "failures": len(stats.failures),
+        "duplicate_request_ids": len(stats.request_ids) - len(set(stats.request_ids)),
+        "examples": stats.failures[:5],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the stress test and print its report."""
+    parser = argparse.ArgumentParser(description="Stress one shared MediAide instance")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent worker threads (and asyncio tasks)")
+    parser.add_argument("--calls", type=int, default=50, help="Calls issued per worker")
+    parser.add_argument("--llm-latency", type=float, default=0.01, help="Simulated seconds per LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="Simulated seconds per web search")
+    parser.add_argument("--swap-interval", type=float, default=0.01, help="Seconds between chat model swaps")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    os.chdir(project_root)
+    configure_offline(args.llm_latency, args.search_latency)
+    from src.main.app import MediAide
+
+    # Agents print their reasoning when verbose; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = MediAide()
+        initializers = [threading.Thread(target=app.initialize) for _ in range(4)]
+        for thread in initializers:
+            thread.start()
+        for thread in initializers:
+            thread.join()
+        if not app.initialized:
+            print("❌ MediAide failed to initialize")
+            return 1
+
+        # Expected answers come from running each call alone
+        start = time.perf_counter()
+        calls = [(name, call_args, fingerprint(getattr(app, name)(*call_args)))
+                 for name, call_args in operations()]
+        sequential = len(calls) / (time.perf_counter() - start)
+
+        results = [run_stress(app, calls, args.threads, args.calls, args.swap_interval, use_asyncio)
+                   for use_asyncio in (False, True)]
+
+    print("\n🧪 MediAide Concurrency Stress Test")
+    print("=" * 60)
+    print(f"{len(calls)} distinct calls, sequential baseline {sequential:.1f} calls/s")
+    failed = False
+    for summary in results:
+        ok = not summary["failures"] and not summary["duplicate_request_ids"]
+        failed |= not ok
+        print(f"\n{'✅' if ok else '❌'} {summary['workers']} {summary['mode']} workers: "
+              f"{summary['completed']} calls, {summary['throughput']:.1f} calls/s, "
+              f"p50 {summary['latency']['p50'] * 1000:.0f}ms, p99 {summary['latency']['p99'] * 1000:.0f}ms")
+        print(f"   {summary['failures']} wrong answers, {summary['duplicate_request_ids']} duplicate request ids, "
+              f"{summary['model_swaps']} chat model swaps")
+        for example in summary["examples"]:
+            print(f"   • {example}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"sequential_throughput": sequential, "rounds": results}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
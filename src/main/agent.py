@@ -1,37 +1,48 @@
-from agents import Agent, OpenAIChatCompletionsModel
-from src.tool.CancerDBTool import cancer_db_tool
-from src.tool.DiabetesDBTool import diabetes_db_tool
-from src.tool.HeartDiseaseDBTool import heart_disease_db_tool
+from agents import Agent, ModelSettings, OpenAIChatCompletionsModel
+from src.main.datasets import DATASETS
+from src.tool.DatasetDBTool import dataset_db_tools
 from src.tool.MedicalWebSearchTool import web_search as web_search_tool
+from src.tool.RiskScoringTool import risk_score_tool
+from src.tool.CohortTool import similar_patients_tool
 import settings
 
+# One database tool per registered dataset (src/data/datasets.yaml)
+DATABASE_TOOLS = "\n".join(
+    f"    {idx}. {name}_db_tool: For querying the {info['label'].lower()} database."
+    for idx, (name, info) in enumerate(DATASETS.items(), 1)
+)
+TOPICS = ", ".join(info['label'].lower() for info in DATASETS.values())
+
 agent = Agent(
     name = 'MedicalAgent',
-    description = 'An agent that can answer questions about cancer and diabetes using their respective databases and can conduct web searches.',
-    instructions="""
-    You are a medical agent capable for conducting web searches and querying databases related to cancer, diabetes and heart attack.
+    description = f'An agent that can answer questions about {TOPICS} using their respective databases and can conduct web searches.',
+    instructions=f"""
+    You are a medical agent capable for conducting web searches and querying databases related to {TOPICS}.
     
-    You are supplied with three database tools:
-    1. DiabetesDBTool: For querying the diabetes database.
-    2. CancerDBTool: For querying the cancer database.
-    3. HeartDiseaseDBTool: For querying the heart disease database.
+    You are supplied with {len(DATASETS)} database tools:
+{DATABASE_TOOLS}
     You also have a web search tool to find information online.
+    You also have a RiskScoringTool that estimates an individual patient's outcome probability
+    from the labeled datasets without writing SQL, and a CohortTool that finds the most similar
+    patients in a dataset and reports their outcome rate ("patients like me" questions).
     
     Your tasks include:
-    1. Use the web search tool to find information about cancer and diabetes.
+    1. Use the web search tool to find information about {TOPICS}.
     2. Query the respective databases for more detailed information.
     3. Provide concise and accurate answers to user queries.
     
-    Your main goal is to assist users by providing accurate and relevant information about cancer, diabetes, and heart disease.
+    Your main goal is to assist users by providing accurate and relevant information about {TOPICS}.
     Always give precise response based on the data available in the databases and the results from web searches.
     If you do not have enough information, you can conduct a web search to find the necessary information.
     Be sure to format your responses clearly and concisely.
     """,
     model=OpenAIChatCompletionsModel(model=settings.MODEL_NAME, openai_client=settings.openai_client),
+    # Deterministic like settings.llm, so repeated steps hit the LLM response cache
+    model_settings=ModelSettings(temperature=0.0),
     tools=[
-        diabetes_db_tool,
-        cancer_db_tool,
-        heart_disease_db_tool,
-        web_search_tool
+        *dataset_db_tools(),
+        web_search_tool,
+        risk_score_tool,
+        similar_patients_tool
     ]
 )
\ No newline at end of file
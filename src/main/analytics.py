@@ -0,0 +1,173 @@
+"""
+MediAide running analytics
+Constant-size aggregates updated as queries complete: counts per query
+type, streaming mean/min/max, a relative-error latency sketch for
+percentiles and a bounded per-minute time series. Rendering them costs the
+same whether a session has made ten queries or ten thousand.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class LatencySketch:
+    """
+    Mergeable quantile sketch with bounded relative error (DDSketch-style).
+
+    Values are counted in logarithmic buckets of width `gamma`, so any
+    reported quantile is within `relative_accuracy` of the true value and
+    the number of buckets grows only with the log of the value range.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        """Record a non-negative value."""
+        self.count += 1
+        if value < self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: "LatencySketch"):
+        """Fold another sketch with the same accuracy into this one."""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile (0 <= q <= 1).
+
+        Returns:
+            Optional[float]: The estimate, or None if the sketch is empty
+        """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key] in relative terms
+                return 2 * self.gamma ** key / (1 + self.gamma)
+        return 2 * self.gamma ** max(self.buckets) / (1 + self.gamma)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the sketch to plain JSON types."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencySketch":
+        """Rebuild a sketch written with `to_dict`."""
+        sketch = cls(data["relative_accuracy"], data["min_value"])
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.buckets = {int(k): v for k, v in data["buckets"].items()}
+        return sketch
+
+
+class RunningStats:
+    """Streaming count, mean (Welford), min and max."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """Record a value."""
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+
+class SessionAnalytics:
+    """
+    Running analytics for one UI session.
+
+    Args:
+        bucket_seconds (int): Width of each time-series bucket
+        max_buckets (int): Number of most recent buckets kept
+    """
+
+    def __init__(self, bucket_seconds: int = 60, max_buckets: int = 240):
+        self.bucket_seconds = bucket_seconds
+        self.query_types: Dict[str, int] = {}
+        self.response_times = RunningStats()
+        self.sketch = LatencySketch()
+        self.failures = 0
+        # Each bucket is [bucket_start, count, total_response_time]
+        self.buckets: deque = deque(maxlen=max_buckets)
+        self._lock = threading.Lock()
+
+    def record(self, query_type: str, response_time: float, timestamp: float, success: bool = True):
+        """
+        Fold a completed query into the aggregates.
+
+        Args:
+            query_type (str): The UI query type label
+            response_time (float): Wall-clock time in seconds
+            timestamp (float): Unix timestamp of completion
+            success (bool): Whether the query succeeded
+        """
+        start = int(timestamp // self.bucket_seconds) * self.bucket_seconds
+        with self._lock:
+            self.query_types[query_type] = self.query_types.get(query_type, 0) + 1
+            self.response_times.add(response_time)
+            self.sketch.add(response_time)
+            if not success:
+                self.failures += 1
+            if self.buckets and self.buckets[-1][0] == start:
+                self.buckets[-1][1] += 1
+                self.buckets[-1][2] += response_time
+            else:
+                self.buckets.append([start, 1, response_time])
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return a snapshot of the aggregates for rendering.
+
+        Returns:
+            Dict[str, Any]: Totals, latency statistics and the time series
+        """
+        with self._lock:
+            stats = self.response_times
+            return {
+                "total": stats.count,
+                "failures": self.failures,
+                "query_types": dict(self.query_types),
+                "mean": stats.mean if stats.count else None,
+                "min": stats.min if stats.count else None,
+                "max": stats.max if stats.count else None,
+                "p50": self.sketch.quantile(0.50),
+                "p95": self.sketch.quantile(0.95),
+                "p99": self.sketch.quantile(0.99),
+                "series": [
+                    {"bucket_start": start, "count": count, "mean_response_time": total / count}
+                    for start, count, total in self.buckets
+                ],
+            }
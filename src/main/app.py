@@ -3,16 +3,18 @@ MediAide - AI-Powered Medical Assistant
 Main application file that orchestrates all medical tools and agents.
 """
 
+import asyncio
 import os
 import sys
+import threading
 from pathlib import Path
+from types import MappingProxyType
 from dotenv import load_dotenv
 from typing import Dict, Any, List
 import logging
-from langchain_community.utilities import SQLDatabase
-from sqlalchemy import create_engine
-import pandas as pd
-from pyprojroot import here
+from langchain_community.callbacks.manager import get_openai_callback
+import json
+import time
 
 # Add project root to path
 project_root = Path(__file__).parent.parent.parent
@@ -23,13 +25,26 @@ load_dotenv()
 
 # Import tools
 try:
-    from src.tool.DiabetesDBTool import diabetes_db_tool
-    from src.tool.CancerDBTool import cancer_db_tool
-    from src.tool.HeartDiseaseDBTool import heart_disease_db_tool
-    from src.tool.MedicalWebSearchTool import web_search
+    from src.tool.DatasetDBTool import create_dataset_agent, get_dataset_db
+    from src.tool.MedicalWebSearchTool import search_medical_web
 except ImportError as e:
     print(f"⚠️ Warning: Could not import some tools: {e}")
 
+# Import analytics engines
+from src.main.datasets import DATASETS, get_dataset, resolve_dataset
+from src.main.risk import score_risk
+from src.main.cohort import find_similar
+from src.main.metrics import metrics, instrumented, record_token_usage
+from src.main.compaction import AgentTraceLogger
+from src.main.context import request_context
+from src.main.prefetch import prefetcher
+from src.main.profiling import profiled
+from src.main.approximate import APPROXIMATE_DEFAULT, wants_exact
+from src.main.results import QueryResult, capture_queries, result_payload
+from src.main.sql_guard import PAGE_SIZE, check_read_only, fetch_page, readonly_engine
+from src.main.reload import ensure_dataset, reload_dataset, start_dataset_watcher
+from src.main.validation import load_rejects, rejects_path
+
 # Import settings
 try:
     from src.main import settings
@@ -45,133 +60,111 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def get_diabetes_db():
-    """
-    Returns a SQLDatabase object connected to the diabetes database.
-    """
-    
-    df = pd.read_csv(here("src/data/diabetes.csv"))
-    #print(df.shape)
-    #print(df.columns.tolist())
-    #display(df.head(3))
-
-    db_path = str(here("src/database")) + "/diabetes.db"
-    db_path = f"sqlite:///{db_path}"
-
-    engine = create_engine(db_path)
-    df.to_sql("diabetes", engine, index=False, if_exists='replace')
-    print("Database created and data loaded into 'diabetes' table.")
-    db = SQLDatabase(engine=engine)
-    print(db.dialect)
-    print(db.get_usable_table_names())
-    db.run("SELECT * FROM diabetes WHERE Age < 2;")
-    print("Query executed successfully.")
-    return db
-
-
-def get_cancer_db():
-    """
-    Returns a SQLDatabase object connected to the cancer database.
+def preload_datasets() -> List[str]:
     """
-    
-    df = pd.read_csv(here("src/data/The_Cancer_data_1500_V2.csv"))
-    #print(df.shape)
-    #print(df.columns.tolist())
-    #display(df.head(3))
-    
-    db_path = str(here("src/database")) + "/cancer.db"
-    db_path = f"sqlite:///{db_path}"
+    Return the datasets to build at startup rather than on first use.
 
-    engine = create_engine(db_path)
-    df.to_sql("cancer", engine, index=False, if_exists='replace')
-    print("Database created and data loaded into 'cancer' table.")
-    db = SQLDatabase(engine=engine)
-    print(db.dialect)
-    print(db.get_usable_table_names())
-    db.run("SELECT * FROM cancer WHERE Age < 2;")
-    print("Query executed successfully.")
-    return db
-
-
-def get_heart_disease_db():
-    """
-    Returns a SQLDatabase object connected to the heart disease database.
+    MEDIAIDE_PRELOAD_DATASETS is a comma-separated list of dataset names, or
+    'all'. By default nothing is preloaded and each dataset is built the first
+    time it is queried.
     """
-    
-    df = pd.read_csv(here("src/data/heart.csv"))
-    #print(df.shape)
-    #print(df.columns.tolist())
-    #display(df.head(3))
-
-    db_path = str(here("src/database")) + "/heart_disease.db"
-    db_path = f"sqlite:///{db_path}"
-
-    engine = create_engine(db_path)
-    df.to_sql("heart_disease", engine, index=False, if_exists='replace')
-    print("Database created and data loaded into 'heart_disease' table.")
-    db = SQLDatabase(engine=engine)
-    print(db.dialect)
-    print(db.get_usable_table_names())
-    db.run("SELECT * FROM heart_disease WHERE Age < 2;")
-    print("Query executed successfully.")
-    return db
+    names = os.getenv("MEDIAIDE_PRELOAD_DATASETS", "").strip()
+    if names.lower() == "all":
+        return list(DATASETS)
+    return [name.strip() for name in names.split(",") if name.strip()]
 
 
 class MediAide:
     """
     Main MediAide application class that coordinates all medical tools and agents.
+    
+    One initialized instance can serve concurrent requests from threads and
+    asyncio tasks (see run_async). The tool table is read-only and replaced as
+    a whole by initialize(); per-request state lives in a RequestContext
+    (src/main/context.py), never on the instance.
     """
     
     def __init__(self):
         """Initialize the MediAide application."""
-        self.tools = {
-            'diabetes': None,
-            'cancer': None,
-            'heart_disease': None,
-            'web_search': None
-        }
+        self.tools = MappingProxyType({
+            'database': None,
+            'web_search': None,
+            'risk': None,
+            'cohort': None
+        })
         self.initialized = False
+        self._init_lock = threading.Lock()
         
-    def initialize(self) -> bool:
+    def initialize(self, build_databases: bool = True) -> bool:
         """
         Initialize all medical tools and agents.
         
+        Safe to call from several threads: the first call does the work and
+        later calls return once it has finished.
+        
+        Args:
+            build_databases (bool): Build the datasets listed in MEDIAIDE_PRELOAD_DATASETS now
+                instead of on first use. Pass False when they were already built, e.g. by a
+                pre-fork parent.
+        
         Returns:
             bool: True if initialization successful, False otherwise
         """
+        with self._init_lock:
+            if self.initialized:
+                return True
+            return self._initialize(build_databases)
+    
+    @profiled("initialize")
+    def _initialize(self, build_databases: bool) -> bool:
+        start_time = time.perf_counter()
+        tools = dict(self.tools)
         try:
             logger.info("Initializing MediAide application...")
             
-            # Initialize database creation functions
-            try:
-                get_diabetes_db()
-                get_cancer_db()
-                get_heart_disease_db()
-                logger.info("✅ Databases created/updated successfully")
-            except Exception as e:
-                logger.warning(f"⚠️ Database creation warning: {e}")
+            # Datasets are built lazily on first use; preload only those asked for
+            if build_databases:
+                for dataset in preload_datasets():
+                    try:
+                        ensure_dataset(dataset)
+                        logger.info(f"✅ Dataset '{dataset}' ready")
+                    except Exception as e:
+                        logger.warning(f"⚠️ Database creation warning for '{dataset}': {e}")
             
             # Initialize database tools
             try:
-                if 'diabetes_db_tool' in globals():
-                    self.tools['diabetes'] = diabetes_db_tool
-                if 'cancer_db_tool' in globals():
-                    self.tools['cancer'] = cancer_db_tool
-                if 'heart_disease_db_tool' in globals():
-                    self.tools['heart_disease'] = heart_disease_db_tool
-                logger.info("✅ Database tools initialized successfully")
+                if 'create_dataset_agent' in globals():
+                    tools['database'] = create_dataset_agent
+                logger.info(f"✅ Database tools initialized for {len(DATASETS)} datasets")
             except Exception as e:
                 logger.warning(f"⚠️ Database tools warning: {e}")
             
             # Initialize web search tool
             try:
-                if 'web_search' in globals():
-                    self.tools['web_search'] = web_search
+                if 'search_medical_web' in globals():
+                    tools['web_search'] = search_medical_web
                     logger.info("✅ Web search tool initialized successfully")
             except Exception as e:
                 logger.warning(f"⚠️ Web search tool warning: {e}")
             
+            # Initialize risk scoring engine
+            tools['risk'] = score_risk
+            logger.info("✅ Risk scoring engine initialized successfully")
+            
+            # Initialize cohort index
+            tools['cohort'] = find_similar
+            logger.info("✅ Cohort index initialized successfully")
+            
+            # Pick up CSV changes without re-initializing
+            try:
+                start_dataset_watcher()
+            except Exception as e:
+                logger.warning(f"⚠️ Dataset watcher warning: {e}")
+            
+            # Requests in flight keep reading the old table; new ones see the complete new one
+            self.tools = MappingProxyType(tools)
             self.initialized = True
+            metrics.observe("mediaide.initialize_seconds", time.perf_counter() - start_time)
             logger.info("🚀 MediAide application initialized successfully!")
             return True
             
@@ -179,185 +172,296 @@ class MediAide:
             logger.error(f"❌ Failed to initialize MediAide: {e}")
             return False
     
-    def query_diabetes(self, question: str) -> Dict[str, Any]:
+    async def run_async(self, method: str, *args, **kwargs) -> Dict[str, Any]:
+        """
+        Await a MediAide call from asyncio code without blocking the event loop.
+        
+        The call runs on a worker thread in a copy of the caller's context, so
+        concurrent tasks never see each other's request state.
+        
+        Args:
+            method (str): Name of the method to call, e.g. 'query_dataset'
+            *args: Positional arguments for the method
+            **kwargs: Keyword arguments for the method
+            
+        Returns:
+            Dict[str, Any]: The method's response
+        """
+        return await asyncio.to_thread(getattr(self, method), *args, **kwargs)
+    
+    @instrumented(lambda self, dataset, *args, **kwargs: f"{dataset}_database" if dataset in DATASETS else "unknown_database")
+    @profiled(lambda self, dataset, *args, **kwargs: f"query_{dataset}")
+    def query_dataset(self, dataset: str, question: str, approximate: bool = None) -> Dict[str, Any]:
         """
-        Query the diabetes database agent.
+        Query a dataset's database agent.
+        
+        In approximate mode COUNT, SUM and AVG queries are estimated from the
+        dataset's stratified sample with 95% confidence intervals, unless the
+        question asks for an exact answer.
+        
+        Once answered, likely drill-downs of the answer's SQL are prefetched
+        in the background (see src/main/prefetch.py).
         
         Args:
-            question (str): The question about diabetes
+            dataset (str): Dataset name from the registry, e.g. 'diabetes'
+            question (str): The question about the dataset
+            approximate (bool): Answer from the samples where possible; defaults to MEDIAIDE_APPROXIMATE
             
         Returns:
             Dict[str, Any]: Response with answer and metadata
         """
         try:
-            if not self.tools['diabetes']:
+            label = get_dataset(dataset)['label'].lower()
+            if not self.tools['database']:
                 return {
-                    "answer": "Diabetes database tool not available. Please check your configuration.",
+                    "answer": f"{label.capitalize()} database tool not available. Please check your configuration.",
                     "source": "error",
                     "success": False
                 }
             
-            agent = self.tools['diabetes']()
-            response = agent.invoke({"input": question})
+            ensure_dataset(dataset)
+            approximate = (APPROXIMATE_DEFAULT if approximate is None else approximate) and not wants_exact(question)
+            with request_context(f"{dataset}_database", approximate) as request, prefetcher.foreground():
+                agent = self.tools['database'](dataset, request.llm)
+                with get_openai_callback() as usage, capture_queries() as queries:
+                    response = agent.invoke({"input": question},
+                                            config={"callbacks": [AgentTraceLogger(f"{dataset}_database")]})
+            record_token_usage(f"{dataset}_database", usage)
+            data = result_payload(queries, request.started)
+            if data and not data["approximate"]:
+                prefetcher.schedule(dataset, data["sql"])
             
             return {
                 "answer": response.get('output', response),
-                "source": "diabetes_database",
+                "source": f"{dataset}_database",
                 "success": True,
+                "data": data,
                 "metadata": {
-                    "tool_used": "diabetes_db_agent",
-                    "question": question
+                    "tool_used": f"{dataset}_db_agent",
+                    "question": question,
+                    "approximate": approximate,
+                    "request_id": request.request_id
                 }
             }
             
         except Exception as e:
-            logger.error(f"Error querying diabetes database: {e}")
+            logger.error(f"Error querying {dataset} database: {e}")
             return {
-                "answer": f"Error occurred while querying diabetes database: {str(e)}",
+                "answer": f"Error occurred while querying {dataset} database: {str(e)}",
                 "source": "error",
                 "success": False
             }
     
+    def query_diabetes(self, question: str) -> Dict[str, Any]:
+        """Query the diabetes database agent."""
+        return self.query_dataset('diabetes', question)
+    
     def query_cancer(self, question: str) -> Dict[str, Any]:
+        """Query the cancer database agent."""
+        return self.query_dataset('cancer', question)
+    
+    def query_heart_disease(self, question: str) -> Dict[str, Any]:
+        """Query the heart disease database agent."""
+        return self.query_dataset('heart_disease', question)
+    
+    @instrumented("web_search")
+    @profiled("search_web")
+    def search_web(self, question: str) -> Dict[str, Any]:
         """
-        Query the cancer database agent.
+        Search the web for medical information.
         
         Args:
-            question (str): The question about cancer
+            question (str): The medical question to search for
             
         Returns:
-            Dict[str, Any]: Response with answer and metadata
+            Dict[str, Any]: Response with search results and metadata
         """
         try:
-            if not self.tools['cancer']:
+            if not self.tools['web_search']:
                 return {
-                    "answer": "Cancer database tool not available. Please check your configuration.",
+                    "answer": "Web search tool not available. Please check your configuration.",
                     "source": "error",
                     "success": False
                 }
             
-            agent = self.tools['cancer']()
-            response = agent.invoke({"input": question})
+            results = self.tools['web_search'](question)
             
             return {
-                "answer": response.get('output', response),
-                "source": "cancer_database",
+                "answer": results,
+                "source": "web_search",
                 "success": True,
                 "metadata": {
-                    "tool_used": "cancer_db_agent",
+                    "tool_used": "medical_web_search",
                     "question": question
                 }
             }
             
         except Exception as e:
-            logger.error(f"Error querying cancer database: {e}")
+            logger.error(f"Error performing web search: {e}")
             return {
-                "answer": f"Error occurred while querying cancer database: {str(e)}",
+                "answer": f"Error occurred while searching the web: {str(e)}",
                 "source": "error",
                 "success": False
             }
     
-    def query_heart_disease(self, question: str) -> Dict[str, Any]:
+    @instrumented("risk_model")
+    def score_risk(self, dataset: str, features) -> Dict[str, Any]:
         """
-        Query the heart disease database agent.
+        Score outcome risk for one patient or a batch of patients.
         
         Args:
-            question (str): The question about heart disease
+            dataset (str): The dataset model to use, e.g. 'diabetes'
+            features: A dict of feature values, a raw feature vector, or a list of either
             
         Returns:
-            Dict[str, Any]: Response with answer and metadata
+            Dict[str, Any]: Response with the estimated probabilities and metadata
         """
         try:
-            if not self.tools['heart_disease']:
+            if not self.tools['risk']:
                 return {
-                    "answer": "Heart disease database tool not available. Please check your configuration.",
+                    "answer": "Risk scoring engine not available. Please check your configuration.",
                     "source": "error",
                     "success": False
                 }
             
-            agent = self.tools['heart_disease']()
-            response = agent.invoke({"input": question})
+            ensure_dataset(dataset)
+            result = self.tools['risk'](dataset, features)
+            
+            if "probability" in result:
+                answer = f"Estimated probability of {result['target']}=1: {result['probability']:.1%}"
+            else:
+                answer = f"Scored {len(result['probabilities'])} patients against the {dataset} model"
             
             return {
-                "answer": response.get('output', response),
-                "source": "heart_disease_database",
+                "answer": answer,
+                "source": "risk_model",
                 "success": True,
                 "metadata": {
-                    "tool_used": "heart_disease_db_agent",
-                    "question": question
+                    "tool_used": "risk_scoring_engine",
+                    "dataset": dataset,
+                    **result
                 }
             }
             
         except Exception as e:
-            logger.error(f"Error querying heart disease database: {e}")
+            logger.error(f"Error scoring risk: {e}")
             return {
-                "answer": f"Error occurred while querying heart disease database: {str(e)}",
+                "answer": f"Error occurred while scoring risk: {str(e)}",
                 "source": "error",
                 "success": False
             }
     
-    def search_web(self, question: str) -> Dict[str, Any]:
+    @instrumented("query_page")
+    def page_query(self, dataset: str, sql: str, cursor: str = None, page_size: int = PAGE_SIZE) -> Dict[str, Any]:
         """
-        Search the web for medical information.
+        Fetch one page of a SELECT against a dataset's database.
+        
+        Used to read past the rows returned with a truncated database answer:
+        pass the answer's `data.sql` and `data.next_cursor`, then each page's
+        `next_cursor` until it is None. The database is opened read-only.
         
         Args:
-            question (str): The medical question to search for
+            dataset (str): The dataset to query, e.g. 'diabetes'
+            sql (str): A single SELECT statement
+            cursor (str): Cursor from the previous page, or None for the first page
+            page_size (int): Rows per page
             
         Returns:
-            Dict[str, Any]: Response with search results and metadata
+            Dict[str, Any]: Response with the page in the `data` field
         """
         try:
-            if not self.tools['web_search']:
+            ensure_dataset(dataset)
+            start = time.perf_counter()
+            with prefetcher.foreground(), readonly_engine(dataset).connect() as conn:
+                rows, next_cursor = fetch_page(conn, sql, cursor, page_size)
+            page = QueryResult(check_read_only(sql), rows, time.perf_counter() - start, next_cursor=next_cursor)
+            
+            return {
+                "answer": f"Returned {len(rows)} rows" + ("" if next_cursor else " (last page)"),
+                "source": f"{dataset}_database",
+                "success": True,
+                "data": page.to_dict(),
+                "metadata": {
+                    "tool_used": "paged_query",
+                    "dataset": dataset,
+                    "cursor": cursor
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error paging query: {e}")
+            return {
+                "answer": f"Error occurred while paging query: {str(e)}",
+                "source": "error",
+                "success": False
+            }
+    
+    @instrumented("cohort_index")
+    def find_similar_patients(self, dataset: str, features: Dict[str, float], k: int = 25) -> Dict[str, Any]:
+        """
+        Find the most similar patients in a dataset and their outcome rate.
+        
+        Args:
+            dataset (str): The dataset to search, e.g. 'diabetes'
+            features (Dict[str, float]): Feature values to match on
+            k (int): Number of similar patients to consider
+            
+        Returns:
+            Dict[str, Any]: Response with the cohort outcome rate and neighbors
+        """
+        try:
+            if not self.tools['cohort']:
                 return {
-                    "answer": "Web search tool not available. Please check your configuration.",
+                    "answer": "Cohort index not available. Please check your configuration.",
                     "source": "error",
                     "success": False
                 }
             
-            results = self.tools['web_search'](question)
+            ensure_dataset(dataset)
+            result = self.tools['cohort'](dataset, features, k)
             
             return {
-                "answer": results,
-                "source": "web_search",
+                "answer": (
+                    f"{result['outcome_rate']:.1%} of the {result['k']} most similar patients had "
+                    f"{result['target']}=1 (dataset-wide rate: {result['base_rate']:.1%})"
+                ),
+                "source": "cohort_index",
                 "success": True,
                 "metadata": {
-                    "tool_used": "medical_web_search",
-                    "question": question
+                    "tool_used": "cohort_index",
+                    **result
                 }
             }
             
         except Exception as e:
-            logger.error(f"Error performing web search: {e}")
+            logger.error(f"Error finding similar patients: {e}")
             return {
-                "answer": f"Error occurred while searching the web: {str(e)}",
+                "answer": f"Error occurred while finding similar patients: {str(e)}",
                 "source": "error",
                 "success": False
             }
     
+    @instrumented("comprehensive")
+    @profiled("comprehensive")
     def get_comprehensive_answer(self, question: str, topics: List[str] = None) -> Dict[str, Any]:
         """
         Get a comprehensive answer by querying multiple sources.
         
         Args:
             question (str): The medical question
-            topics (List[str]): List of topics to search ('diabetes', 'cancer', 'heart_disease', 'web')
+            topics (List[str]): Dataset names and/or 'web'; defaults to every dataset and the web
             
         Returns:
             Dict[str, Any]: Comprehensive response from multiple sources
         """
         if not topics:
-            topics = ['diabetes', 'cancer', 'heart_disease', 'web']
+            topics = [*DATASETS, 'web']
         
         responses = {}
         
-        if 'diabetes' in topics:
-            responses['diabetes'] = self.query_diabetes(question)
-        
-        if 'cancer' in topics:
-            responses['cancer'] = self.query_cancer(question)
-        
-        if 'heart_disease' in topics:
-            responses['heart_disease'] = self.query_heart_disease(question)
+        for dataset in DATASETS:
+            if dataset in topics:
+                responses[dataset] = self.query_dataset(dataset, question)
         
         if 'web' in topics:
             responses['web_search'] = self.search_web(question)
@@ -369,6 +473,15 @@ class MediAide:
             "sources": list(responses.keys())
         }
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get the process-wide operational metrics shared by all sessions.
+        
+        Returns:
+            Dict[str, Any]: Snapshot of counters, gauges and latency histograms
+        """
+        return metrics.snapshot()
+    
     def get_status(self) -> Dict[str, Any]:
         """
         Get the status of all tools and services.
@@ -379,10 +492,10 @@ class MediAide:
         status = {
             "initialized": self.initialized,
             "tools": {
-                "diabetes_db": self.tools['diabetes'] is not None,
-                "cancer_db": self.tools['cancer'] is not None,
-                "heart_disease_db": self.tools['heart_disease'] is not None,
-                "web_search": self.tools['web_search'] is not None
+                **{f"{dataset}_db": self.tools['database'] is not None for dataset in DATASETS},
+                "web_search": self.tools['web_search'] is not None,
+                "risk_model": self.tools['risk'] is not None,
+                "cohort_index": self.tools['cohort'] is not None
             },
             "environment": {
                 "settings_loaded": settings is not None,
@@ -395,28 +508,21 @@ class MediAide:
 
 def test_databases():
     """
-    Test function to create and verify databases.
+    Test function to rebuild and verify every dataset's database.
     """
-    print("Testing diabetes database...")
-    try:
-        get_diabetes_db()
-        print("Diabetes database test PASSED\n")
-    except Exception as e:
-        print(f"Diabetes database test FAILED: {str(e)}\n")
-
-    print("Testing cancer database...")
-    try:
-        get_cancer_db()
-        print("Cancer database test PASSED\n")
-    except Exception as e:
-        print(f"Cancer database test FAILED: {str(e)}\n")
-
-    print("Testing heart disease database...")
-    try:
-        get_heart_disease_db()
-        print("Heart disease database test PASSED\n")
-    except Exception as e:
-        print(f"Heart disease database test FAILED: {str(e)}\n")
+    for dataset, info in DATASETS.items():
+        print(f"Testing {info['label'].lower()} database...")
+        try:
+            reload_dataset(dataset, force=True)
+            db = get_dataset_db(dataset)
+            print(db.dialect)
+            print(db.get_usable_table_names())
+            db.run(f"SELECT COUNT(*) FROM {info['table']};")
+            rejects = load_rejects(dataset)
+            print(f"Rejected rows: {rejects['line'].nunique()} (see {rejects_path(dataset)})")
+            print(f"{info['label']} database test PASSED\n")
+        except Exception as e:
+            print(f"{info['label']} database test FAILED: {str(e)}\n")
 
     print("All database tests completed.")
 
@@ -436,19 +542,22 @@ def main():
     status = app.get_status()
     print("\n📊 System Status:")
     print(f"  • Initialized: {status['initialized']}")
-    print(f"  • Diabetes DB: {'✅' if status['tools']['diabetes_db'] else '❌'}")
-    print(f"  • Cancer DB: {'✅' if status['tools']['cancer_db'] else '❌'}")
-    print(f"  • Heart Disease DB: {'✅' if status['tools']['heart_disease_db'] else '❌'}")
+    for dataset, info in DATASETS.items():
+        print(f"  • {info['label']} DB: {'✅' if status['tools'][f'{dataset}_db'] else '❌'}")
     print(f"  • Web Search: {'✅' if status['tools']['web_search'] else '❌'}")
+    print(f"  • Risk Model: {'✅' if status['tools']['risk_model'] else '❌'}")
+    print(f"  • Cohort Index: {'✅' if status['tools']['cohort_index'] else '❌'}")
     
     # Interactive mode
     print("\n🤖 Interactive Mode - Ask medical questions or type 'quit' to exit")
     print("Available commands:")
-    print("  • 'diabetes: <question>' - Query diabetes database")
-    print("  • 'cancer: <question>' - Query cancer database")
-    print("  • 'heart: <question>' - Query heart disease database")
+    for dataset, info in DATASETS.items():
+        command = info['aliases'][0] if info['aliases'] else dataset
+        print(f"  • '{command}: <question>' - Query {info['label'].lower()} database")
     print("  • 'search: <question>' - Search web for medical info")
     print("  • 'all: <question>' - Query all sources")
+    print("  • 'risk: <dataset> <json features>' - Score patient risk")
+    print("  • 'similar: <dataset> <json features>' - Find similar patients")
     print("  • 'test' - Test database creation")
     print("-" * 60)
     
@@ -479,14 +588,16 @@ def main():
             print(f"\n🔍 Processing: {question}")
             
             # Route to appropriate handler
-            if command == 'diabetes':
-                response = app.query_diabetes(question)
-            elif command == 'cancer':
-                response = app.query_cancer(question)
-            elif command in ['heart', 'heart_disease']:
-                response = app.query_heart_disease(question)
+            if resolve_dataset(command):
+                response = app.query_dataset(resolve_dataset(command), question)
             elif command == 'search':
                 response = app.search_web(question)
+            elif command == 'risk':
+                dataset, _, features = question.partition(' ')
+                response = app.score_risk(dataset.strip(), json.loads(features or '{}'))
+            elif command == 'similar':
+                dataset, _, features = question.partition(' ')
+                response = app.find_similar_patients(dataset.strip(), json.loads(features or '{}'))
             elif command == 'all':
                 response = app.get_comprehensive_answer(question)
                 print("\n📋 Comprehensive Results:")
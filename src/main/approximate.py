@@ -0,0 +1,322 @@
+"""
+MediAide approximate query answering
+Every dataset build also keeps a stratified random sample of its table
+(src/database/<name>_sample.db). Rows are grouped into strata by the
+registry's strata columns (the target by default) and each stratum is sampled
+at `fraction`, with at least `min_rows` rows so rare strata stay represented.
+
+In approximate mode, COUNT, SUM and AVG queries (optionally grouped) are
+answered from the sample with stratified estimators and 95% confidence
+intervals. Other statements, and questions asking for an exact answer, run
+against the full table.
+
+Registry example:
+    sample:
+      strata: [Diagnosis, Smoking]
+      fraction: 0.05
+      min_rows: 50
+
+Environment:
+    MEDIAIDE_APPROXIMATE: set to 1 to answer database questions approximately by default
+    MEDIAIDE_SAMPLE_FRACTION: default fraction sampled per stratum (default 0.1)
+    MEDIAIDE_SAMPLE_MIN_ROWS: default minimum rows per stratum (default 30)
+"""
+
+import contextlib
+import contextvars
+import math
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from src.main.datasets import database_dir, get_dataset
+from src.main.metrics import metrics
+from src.main.partitions import aggregate_calls, normalize_expr, parse_select
+from src.main.sql_guard import quote, write_table
+
+APPROXIMATE_DEFAULT = os.getenv("MEDIAIDE_APPROXIMATE", "0").lower() in ("1", "true", "yes")
+SAMPLE_FRACTION = float(os.getenv("MEDIAIDE_SAMPLE_FRACTION", "0.1"))
+SAMPLE_MIN_ROWS = int(os.getenv("MEDIAIDE_SAMPLE_MIN_ROWS", "30"))
+
+Z_95 = 1.959964
+STRATUM_COLUMN = "__mediaide_stratum__"
+STRATA_TABLE = "mediaide_strata"
+
+_EXACT = re.compile(r"\b(exact|exactly|precise|precisely)\b", re.IGNORECASE)
+
+_approximate: contextvars.ContextVar[bool] = contextvars.ContextVar("mediaide_approximate", default=False)
+
+
+@contextlib.contextmanager
+def approximate_answers(enabled: bool = True) -> Iterator[None]:
+    """Answer the SQL run while the block is active from the samples where possible."""
+    token = _approximate.set(enabled)
+    try:
+        yield
+    finally:
+        _approximate.reset(token)
+
+
+def approximation_enabled() -> bool:
+    return _approximate.get()
+
+
+def wants_exact(question: str) -> bool:
+    """Return True if a question asks for an exact answer."""
+    return bool(_EXACT.search(question or ""))
+
+
+def sample_path(dataset: str) -> str:
+    """Return the path of a dataset's sample database."""
+    return os.path.join(database_dir(), f"{dataset}_sample.db")
+
+
+def build_sample(dataset: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Write a dataset's stratified sample to a side file and swap it in.
+
+    The sample keeps the table's name and indexes plus a stratum column, and
+    a strata table records each stratum's population and sample size.
+
+    Returns:
+        Dict[str, Any]: Sample and population row counts and the number of strata
+    """
+    info = get_dataset(dataset)
+    spec = info.get('sample') or {}
+    strata = spec.get('strata') or [info['target']]
+    fraction = float(spec.get('fraction', SAMPLE_FRACTION))
+    min_rows = int(spec.get('min_rows', SAMPLE_MIN_ROWS))
+
+    stratum = df.groupby(strata, dropna=False, sort=True).ngroup()
+    parts, counts = [], []
+    for h, rows in df.groupby(stratum):
+        n = min(len(rows), max(min_rows, math.ceil(fraction * len(rows))))
+        parts.append(rows.sample(n=n, random_state=int(h)).assign(**{STRATUM_COLUMN: int(h)}))
+        counts.append((int(h), len(rows), n))
+    sample = pd.concat(parts) if parts else df.head(0).assign(**{STRATUM_COLUMN: 0})
+
+    path = sample_path(dataset)
+    staging = f"{path}.building-{os.getpid()}-{threading.get_ident()}"
+    if os.path.exists(staging):
+        os.remove(staging)
+    with metrics.timer("sample.build_seconds", dataset=dataset):
+        write_table(staging, info['table'], sample, info['indexes'])
+        conn = sqlite3.connect(staging)
+        try:
+            with conn:
+                conn.execute(f"CREATE TABLE {STRATA_TABLE} "
+                             "(stratum INTEGER PRIMARY KEY, population INTEGER, sampled INTEGER)")
+                conn.executemany(f"INSERT INTO {STRATA_TABLE} VALUES (?, ?, ?)", counts)
+        finally:
+            conn.close()
+    os.replace(staging, path)
+
+    invalidate_sample(dataset)
+    return {"rows": len(sample), "population": len(df), "strata": len(counts)}
+
+
+_strata: Dict[str, Dict[int, Tuple[int, int]]] = {}
+_strata_lock = threading.Lock()
+
+
+def load_strata(dataset: str) -> Dict[int, Tuple[int, int]]:
+    """Return the cached stratum -> (population, sampled) table of a dataset's sample."""
+    strata = _strata.get(dataset)
+    if strata is None:
+        conn = sqlite3.connect(f"file:{sample_path(dataset)}?mode=ro", uri=True)
+        try:
+            strata = {h: (N, n) for h, N, n in conn.execute(f"SELECT * FROM {STRATA_TABLE}")}
+        finally:
+            conn.close()
+        with _strata_lock:
+            _strata[dataset] = strata
+    return strata
+
+
+def invalidate_sample(dataset: str):
+    """Drop the cached strata so the next query reads the sample on disk again."""
+    with _strata_lock:
+        _strata.pop(dataset, None)
+
+
+def _stratum_variance(population: int, sampled: int, total: float, squares: float) -> float:
+    """Variance contribution of one stratum to an estimated population total."""
+    if sampled < 2:
+        return 0.0
+    variance = max(0.0, (squares - total * total / sampled) / (sampled - 1))
+    return population * population * (1 - sampled / population) * variance / sampled
+
+
+class ApproximateResult:
+    """
+    Estimated result rows with their 95% confidence intervals.
+
+    Args:
+        rows (List[Dict[str, Any]]): Result rows with estimates in place of exact values
+        intervals (Dict[str, List[List[float]]]): Per estimated column, [low, high] per row
+        sampled (int): Rows in the sample
+        population (int): Rows in the full table
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], intervals: Dict[str, List[List[float]]],
+                 sampled: int, population: int):
+        self.rows = rows
+        self.intervals = intervals
+        self.sampled = sampled
+        self.population = population
+
+    def describe(self, max_rows: int) -> str:
+        """Text for the LLM: the estimates, their intervals and how to get an exact answer."""
+        shown = self.rows[:max_rows]
+        lines = [str([tuple(row.values()) for row in shown])]
+        lines.append(f"Approximate answer from a stratified sample of {self.sampled} of "
+                     f"{self.population} rows. 95% confidence intervals:")
+        for i in range(len(shown)):
+            bounds = ", ".join(f"{column} [{values[i][0]:g}, {values[i][1]:g}]"
+                               for column, values in self.intervals.items() if values[i] is not None)
+            lines.append(f"row {i + 1}: {bounds}" if len(shown) > 1 else bounds)
+        if len(self.rows) > len(shown):
+            lines.append(f"... truncated, showing {len(shown)} of {len(self.rows)} rows.")
+        lines.append("State that the figures are estimates; the user can ask for an exact answer.")
+        return "\n".join(lines)
+
+
+def _estimators(items, groups) -> Optional[List[Tuple[str, Any]]]:
+    """Map select items to ('group', index) or (function, argument); None if unsupported."""
+    keys = {normalize_expr(expr): i for i, expr in enumerate(groups)}
+    plan = []
+    for expr, _ in items:
+        if normalize_expr(expr) in keys:
+            plan.append(("group", keys[normalize_expr(expr)]))
+            continue
+        calls = aggregate_calls(expr)
+        if len(calls) != 1 or calls[0][0] != 0 or calls[0][1] != len(expr):
+            return None
+        _, _, function, argument = calls[0]
+        if function not in ("count", "sum", "avg") or not argument:
+            return None
+        plan.append((function, argument))
+    return plan
+
+
+def approximate_query(dataset: str, sql: str) -> Optional[ApproximateResult]:
+    """
+    Estimate a query's result from the dataset's stratified sample.
+
+    Args:
+        dataset (str): Dataset name
+        sql (str): SELECT statement against the dataset's table
+
+    Returns:
+        Optional[ApproximateResult]: The estimates, or None if the query is not
+            a COUNT/SUM/AVG aggregate or no sample is available
+    """
+    info = get_dataset(dataset)
+    query = parse_select(sql, info['table'])
+    if query is None or not query.has_aggregates:
+        return None
+    plan = _estimators(query.items, query.groups)
+    if plan is None or not os.path.exists(sample_path(dataset)):
+        return None
+
+    # Per stratum and group: sums and sums of squares of each estimator's per-row value
+    stats = []
+    for function, argument in plan:
+        if function == "group":
+            continue
+        value = "1" if argument == "*" else (f"(({argument}) IS NOT NULL)" if function == "count" else f"({argument})")
+        stats += [f"TOTAL({value})", f"TOTAL({value} * {value})"]
+        if function == "avg":
+            stats.append(f"TOTAL(({argument}) IS NOT NULL)")
+    group_columns = "".join(f", {expr}" for expr in query.groups)
+    where = f" WHERE {query.where}" if query.where else ""
+    statement = (f"SELECT {quote(STRATUM_COLUMN)}{group_columns}, {', '.join(stats)} FROM {query.table}{where} "
+                 f"GROUP BY {quote(STRATUM_COLUMN)}{group_columns}")
+
+    try:
+        with metrics.timer("sample.query_seconds", dataset=dataset):
+            strata = load_strata(dataset)
+            conn = sqlite3.connect(f"file:{sample_path(dataset)}?mode=ro", uri=True)
+            try:
+                fetched = conn.execute(statement).fetchall()
+            finally:
+                conn.close()
+    except sqlite3.Error:
+        metrics.inc("sample.fallbacks", dataset=dataset)
+        return None
+
+    width = len(query.groups)
+    by_group: Dict[tuple, Dict[int, tuple]] = {}
+    for row in fetched:
+        by_group.setdefault(tuple(row[1:1 + width]), {})[row[0]] = row[1 + width:]
+    if not query.groups:
+        by_group.setdefault((), {})
+
+    rows, intervals = [], {name: [] for (function, _), (_, name) in zip(plan, query.items) if function != "group"}
+    for key in sorted(by_group, key=lambda k: tuple((v is None, v) for v in k)):
+        sums = by_group[key]
+        row, position = {}, 0
+        for (function, argument), (_, name) in zip(plan, query.items):
+            if function == "group":
+                row[name] = key[argument]
+                continue
+            estimate, low, high = _estimate(function, strata, sums, position)
+            position += 3 if function == "avg" else 2
+            row[name] = estimate
+            intervals[name].append(None if low is None else [low, high])
+        rows.append(row)
+
+    for expr, direction in reversed(query.orders):
+        name = query.output_name(expr) or next(
+            (name for (e, name) in query.items if normalize_expr(e) == normalize_expr(expr)), None)
+        if name is None:
+            return None
+        order = sorted(range(len(rows)), key=lambda i: (rows[i][name] is None, rows[i][name]),
+                       reverse=bool(direction) and direction.strip().lower() == "desc")
+        rows = [rows[i] for i in order]
+        intervals = {column: [values[i] for i in order] for column, values in intervals.items()}
+    if query.limit:
+        rows = rows[:int(query.limit)]
+        intervals = {column: values[:int(query.limit)] for column, values in intervals.items()}
+
+    metrics.inc("sample.queries", dataset=dataset)
+    return ApproximateResult(rows, intervals, sum(n for _, n in strata.values()),
+                             sum(N for N, _ in strata.values()))
+
+
+def _estimate(function: str, strata: Dict[int, Tuple[int, int]], sums: Dict[int, tuple],
+              position: int) -> Tuple[Any, Optional[float], Optional[float]]:
+    """Return (estimate, low, high) of one COUNT/SUM/AVG from per-stratum sums."""
+    def total(offset: int) -> Tuple[float, float]:
+        estimate = variance = 0.0
+        for h, (population, sampled) in strata.items():
+            values = sums.get(h)
+            s1, s2 = (values[offset], values[offset + 1]) if values else (0.0, 0.0)
+            estimate += population * s1 / sampled
+            variance += _stratum_variance(population, sampled, s1, s2)
+        return estimate, variance
+
+    if function in ("count", "sum"):
+        estimate, variance = total(position)
+        margin = Z_95 * math.sqrt(variance)
+        if function == "count":
+            return round(estimate), max(0.0, round(estimate - margin, 1)), round(estimate + margin, 1)
+        return round(estimate, 4), round(estimate - margin, 4), round(estimate + margin, 4)
+
+    # AVG: ratio of the estimated sum to the estimated non-null count, linearized variance
+    numerator, _ = total(position)
+    counted = sum(population * (sums[h][position + 2] if h in sums else 0.0) / sampled
+                  for h, (population, sampled) in strata.items())
+    if counted == 0:
+        return None, None, None
+    ratio = numerator / counted
+    variance = 0.0
+    for h, (population, sampled) in strata.items():
+        s1, s2, c = sums[h][position:position + 3] if h in sums else (0.0, 0.0, 0.0)
+        variance += _stratum_variance(population, sampled, s1 - ratio * c, s2 - 2 * ratio * s1 + ratio * ratio * c)
+    margin = Z_95 * math.sqrt(variance) / counted
+    return round(ratio, 4), round(ratio - margin, 4), round(ratio + margin, 4)
@@ -0,0 +1,284 @@
+"""
+MediAide cohort index
+Precomputed, normalized feature matrices with a batched brute-force k-NN
+search for "patients like me" questions. Distances are computed chunk by
+chunk with NumPy so memory stays bounded on multi-million row tables.
+
+The matrix and its metadata (normalization, outcomes) are saved together in
+one version directory, published with an atomic symlink swap
+(src/main/versions.py), so a reader never pairs a new matrix with old
+metadata.
+"""
+
+import os
+import threading
+from typing import Dict, Any, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+from src.main.datasets import get_dataset, database_dir
+from src.main.store import open_store
+from src.main.metrics import cache_lookup
+from src.main.versions import publish_version, resolve_version, staging_dir
+
+
+# Rows scored per distance block; bounds the temporary (queries x chunk) matrix.
+CHUNK_ROWS = 262144
+
+METADATA_NAME = "index.npz"
+MATRIX_NAME = "matrix.npy"
+LOAD_ATTEMPTS = 5
+
+
+class CohortIndex:
+    """
+    k-nearest-neighbor index over a dataset's z-scored feature matrix.
+
+    Queries may specify any subset of the features; distances are computed
+    only over the provided ones, so a query like {"Age": 55, "BMI": 31}
+    matches on age and BMI and ignores everything else.
+    """
+
+    def __init__(self, dataset: str, features: List[str], target: str, mean: np.ndarray,
+                 scale: np.ndarray, matrix: np.ndarray, outcomes: np.ndarray):
+        self.dataset = dataset
+        self.features = list(features)
+        self.target = target
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        # Keep memory-mapped matrices as-is so processes share the pages
+        self.matrix = matrix if isinstance(matrix, np.memmap) else np.ascontiguousarray(matrix, dtype=np.float32)
+        self.outcomes = np.asarray(outcomes)
+        self.base_rate = float(self.outcomes.mean()) if len(self.outcomes) else 0.0
+        self._index = {name: i for i, name in enumerate(self.features)}
+
+    @classmethod
+    def from_frame(cls, dataset: str, df: pd.DataFrame, target: str) -> "CohortIndex":
+        """
+        Build an index from a DataFrame containing the features and the outcome.
+
+        Args:
+            dataset (str): Dataset name
+            df (pd.DataFrame): Source data
+            target (str): Outcome column
+
+        Returns:
+            CohortIndex: The built index
+        """
+        features = [c for c in df.columns if c != target]
+        X = df[features].to_numpy(dtype=np.float64, na_value=np.nan)
+        mean = np.nanmean(X, axis=0)
+        scale = np.nanstd(X, axis=0)
+        scale[~(scale > 0)] = 1.0
+        # Missing measurements sit at the mean so they don't pull neighbors either way
+        matrix = np.nan_to_num((X - mean) / scale).astype(np.float32)
+        outcomes = df[target].to_numpy().astype(np.int8)
+        return cls(dataset, features, target, mean, scale, matrix, outcomes)
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def _normalize_queries(self, queries: Union[Dict[str, float], List[Dict[str, float]]]):
+        """Return (normalized query matrix, feature column indices) for dict queries."""
+        if isinstance(queries, dict):
+            queries = [queries]
+        if not queries:
+            raise ValueError("At least one query is required")
+        names = list(queries[0].keys())
+        if not names:
+            raise ValueError(f"A query must give at least one feature of {self.dataset}: {', '.join(self.features)}")
+        if any(list(q.keys()) != names for q in queries):
+            raise ValueError("All queries in a batch must use the same features")
+
+        columns = []
+        for name in names:
+            col = self._index.get(name)
+            if col is None:
+                raise ValueError(f"Unknown feature '{name}' for {self.dataset}. Expected: {', '.join(self.features)}")
+            columns.append(col)
+        columns = np.asarray(columns, dtype=np.intp)
+
+        raw = np.asarray([[float(q[n]) for n in names] for q in queries], dtype=np.float64)
+        normalized = ((raw - self.mean[columns]) / self.scale[columns]).astype(np.float32)
+        return normalized, columns
+
+    def search(self, queries: Union[Dict[str, float], List[Dict[str, float]]], k: int = 25):
+        """
+        Find the k nearest records for each query.
+
+        Args:
+            queries: A feature dict or a list of feature dicts using the same keys
+            k (int): Number of neighbors to return per query
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (indices, distances), each of shape (m, k),
+            sorted nearest first
+        """
+        Q, columns = self._normalize_queries(queries)
+        k = max(1, min(int(k), len(self.matrix)))
+        m = len(Q)
+        q_sq = np.einsum('ij,ij->i', Q, Q)[:, None]
+
+        best_idx = np.empty((m, 0), dtype=np.int64)
+        best_dist = np.empty((m, 0), dtype=np.float32)
+        for start in range(0, len(self.matrix), CHUNK_ROWS):
+            block = self.matrix[start:start + CHUNK_ROWS, columns]
+            b_sq = np.einsum('ij,ij->i', block, block)[None, :]
+            dist = q_sq - 2.0 * (Q @ block.T) + b_sq
+
+            kk = min(k, dist.shape[1])
+            part = np.argpartition(dist, kk - 1, axis=1)[:, :kk]
+            cand_dist = np.take_along_axis(dist, part, axis=1)
+
+            merged_idx = np.hstack([best_idx, part + start])
+            merged_dist = np.hstack([best_dist, cand_dist])
+            if merged_idx.shape[1] > k:
+                keep = np.argpartition(merged_dist, k - 1, axis=1)[:, :k]
+                merged_idx = np.take_along_axis(merged_idx, keep, axis=1)
+                merged_dist = np.take_along_axis(merged_dist, keep, axis=1)
+            best_idx, best_dist = merged_idx, merged_dist
+
+        order = np.argsort(best_dist, axis=1)
+        best_idx = np.take_along_axis(best_idx, order, axis=1)
+        best_dist = np.sqrt(np.maximum(np.take_along_axis(best_dist, order, axis=1), 0.0))
+        return best_idx, best_dist
+
+    def records(self, indices: np.ndarray) -> pd.DataFrame:
+        """Return the de-normalized records (with outcome) for the given row indices."""
+        # Round away float32 normalization noise (e.g. 8.9999998 -> 9.0)
+        values = np.round(self.matrix[indices].astype(np.float64) * self.scale + self.mean, 6)
+        df = pd.DataFrame(values, columns=self.features)
+        df[self.target] = self.outcomes[indices]
+        return df
+
+    def save(self, path: str):
+        """
+        Persist the index as a directory with a small .npz of metadata and a raw .npy matrix.
+
+        The matrix is kept in its own uncompressed file so `load` can mmap it.
+        Both files are written to a new version of `path` and published
+        together; readers that mapped the old matrix keep valid pages.
+        """
+        staging = staging_dir(path)
+        np.save(os.path.join(staging, MATRIX_NAME), np.ascontiguousarray(self.matrix))
+        np.savez(
+            os.path.join(staging, METADATA_NAME),
+            dataset=self.dataset,
+            features=np.array(self.features),
+            target=self.target,
+            mean=self.mean,
+            scale=self.scale,
+            outcomes=self.outcomes,
+        )
+        publish_version(staging, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CohortIndex":
+        """Load an index previously written with `save`, memory-mapping the matrix."""
+        directory = resolve_version(path)
+        with np.load(os.path.join(directory, METADATA_NAME), allow_pickle=False) as data:
+            return cls(
+                dataset=str(data['dataset']),
+                features=[str(f) for f in data['features']],
+                target=str(data['target']),
+                mean=data['mean'],
+                scale=data['scale'],
+                matrix=np.load(os.path.join(directory, MATRIX_NAME), mmap_mode='r'),
+                outcomes=data['outcomes'],
+            )
+
+
+_indexes: Dict[str, CohortIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def cohort_index_path(dataset: str) -> str:
+    """Return the path of a dataset's cohort index (a symlink to its current version)."""
+    return os.path.join(database_dir(), f"{dataset}_cohort")
+
+
+def build_cohort_index(dataset: str, df: Optional[pd.DataFrame] = None) -> CohortIndex:
+    """
+    Build and persist the cohort index for a dataset.
+
+    Args:
+        dataset (str): Dataset name
+        df (pd.DataFrame): Source data; read from the column store when omitted
+
+    Returns:
+        CohortIndex: The built index
+    """
+    if df is None:
+        df = open_store(dataset).to_frame()
+    index = CohortIndex.from_frame(dataset, df, get_dataset(dataset)['target'])
+    index.save(cohort_index_path(dataset))
+    with _indexes_lock:
+        _indexes[dataset] = index
+    return index
+
+
+def get_cohort_index(dataset: str) -> CohortIndex:
+    """
+    Return the cohort index for a dataset, loading or building it on first use.
+
+    Args:
+        dataset (str): Dataset name
+
+    Returns:
+        CohortIndex: The cached index
+    """
+    index = _indexes.get(dataset)
+    cache_lookup("cohort_index", index is not None)
+    if index is not None:
+        return index
+
+    get_dataset(dataset)
+    path = cohort_index_path(dataset)
+    if os.path.exists(os.path.join(path, METADATA_NAME)):
+        for attempt in range(LOAD_ATTEMPTS):
+            try:
+                index = CohortIndex.load(path)
+                break
+            except FileNotFoundError:
+                # A rebuild deleted the version between resolving and loading it
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+        with _indexes_lock:
+            _indexes[dataset] = index
+        return index
+    return build_cohort_index(dataset)
+
+
+def invalidate_cohort_index(dataset: str):
+    """Drop the cached index so the next `get_cohort_index` loads it from disk again."""
+    with _indexes_lock:
+        _indexes.pop(dataset, None)
+
+
+def find_similar(dataset: str, features: Union[Dict[str, float], List[Dict[str, float]]],
+                 k: int = 25) -> Dict[str, Any]:
+    """
+    Find the k most similar records and their outcome rate.
+
+    Args:
+        dataset (str): Dataset name
+        features: A feature dict, or a list of dicts with the same keys
+        k (int): Cohort size
+
+    Returns:
+        Dict[str, Any]: Outcome rates per query plus the neighbors of the first query
+    """
+    index = get_cohort_index(dataset)
+    indices, distances = index.search(features, k)
+    rates = index.outcomes[indices].mean(axis=1)
+
+    return {
+        "dataset": dataset,
+        "target": index.target,
+        "k": int(indices.shape[1]),
+        "matched_on": list((features if isinstance(features, dict) else features[0]).keys()),
+        "outcome_rates": rates.tolist(),
+        "outcome_rate": float(rates[0]),
+        "base_rate": index.base_rate,
+        "neighbors": index.records(indices[0]).assign(distance=distances[0]).to_dict(orient='records'),
+    }
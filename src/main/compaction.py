@@ -0,0 +1,269 @@
+"""
+MediAide prompt compaction for the SQL agents
+Keeps the SQL agent loop within a token budget: query results are capped
+and summarized before they are returned to the LLM, older tool outputs in
+the scratchpad are elided once a budget is exceeded, and the agent's
+verbose stdout trace is replaced by structured, sampled log records.
+
+Environment:
+    MEDIAIDE_SQL_MAX_ROWS: rows of a query result shown to the LLM (default 50)
+    MEDIAIDE_SQL_MAX_RESULT_TOKENS: tokens per query result (default 1000)
+    MEDIAIDE_SCRATCHPAD_TOKENS: tokens of tool output kept in the scratchpad (default 3000)
+    MEDIAIDE_AGENT_TRACE_SAMPLE: fraction of agent runs traced step by step (default 0.1)
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_community.utilities import SQLDatabase
+from langchain_community.utilities.sql_database import truncate_word
+from langchain_core.agents import AgentAction
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.main.approximate import approximate_query, approximation_enabled
+from src.main.metrics import metrics
+from src.main.partitions import route_query
+from src.main.prefetch import prefetcher
+from src.main.views import rewrite_query
+from src.main.results import MAX_DATA_ROWS, QueryResult, record_result
+from src.main.sql_guard import count_rows, encode_cursor, execute_limited, summarize_columns, summarize_rows
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULT_ROWS = int(os.getenv("MEDIAIDE_SQL_MAX_ROWS", "50"))
+MAX_RESULT_TOKENS = int(os.getenv("MEDIAIDE_SQL_MAX_RESULT_TOKENS", "1000"))
+SCRATCHPAD_TOKENS = int(os.getenv("MEDIAIDE_SCRATCHPAD_TOKENS", "3000"))
+TRACE_SAMPLE_RATE = float(os.getenv("MEDIAIDE_AGENT_TRACE_SAMPLE", "0.1"))
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_encoding_failed = False
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; None if it cannot be loaded (e.g. offline)."""
+    global _encoding, _encoding_failed
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                _encoding_failed = True
+                logger.warning(f"⚠️ tiktoken encoding unavailable, estimating tokens from length: {e}")
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, falling back to ~4 characters per token."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut `text` to at most `max_tokens` tokens, noting how much was removed.
+    """
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is None:
+        kept = text[:max_tokens * 4]
+    else:
+        kept = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    return f"{kept}\n... [truncated {total - max_tokens} of {total} tokens]"
+
+
+class CompactSQLDatabase(SQLDatabase):
+    """
+    SQLDatabase whose query results are compacted before reaching the LLM.
+
+    Statements run through a streaming cursor and at most `fetch_limit` rows
+    are read. Results longer than `max_rows` show only the first rows
+    followed by a truncation marker with the total row count and a numeric
+    summary of the full result, both computed in the database, and the text
+    is capped at `max_tokens` tokens. Every statement is also recorded as a
+    structured QueryResult for the response's `data` field, with a cursor
+    for paging through the rest.
+
+    Aggregates covered by one of the dataset's materialized views are read
+    from the view. For a partitioned dataset, other statements the partition
+    router understands are answered from the pruned partitions instead of the
+    full table. In approximate mode, aggregates are estimated from the dataset's stratified
+    sample with confidence intervals.
+
+    Args:
+        engine: SQLAlchemy engine
+        max_rows (int): Rows shown verbatim
+        max_tokens (int): Token cap for the returned text
+        fetch_limit (int): Rows read from the database per statement
+        dataset (str): Registry dataset the engine belongs to, enabling view rewrites and partition routing
+        **kwargs: Passed to SQLDatabase
+    """
+
+    def __init__(self, engine, max_rows: int = MAX_RESULT_ROWS, max_tokens: int = MAX_RESULT_TOKENS,
+                 fetch_limit: int = MAX_DATA_ROWS, dataset: Optional[str] = None, **kwargs):
+        super().__init__(engine, **kwargs)
+        self.dataset = dataset
+        self.max_rows = max_rows
+        self.max_tokens = max_tokens
+        self.fetch_limit = max(fetch_limit, max_rows)
+
+    def run(self, command, fetch: str = "all", include_columns: bool = False, *,
+            parameters: Optional[Dict[str, Any]] = None, execution_options: Optional[Dict[str, Any]] = None):
+        if fetch == "cursor" or not isinstance(command, str):
+            return super().run(command, fetch, include_columns,
+                               parameters=parameters, execution_options=execution_options)
+
+        start = time.perf_counter()
+        if self.dataset and approximation_enabled() and not parameters:
+            approximate = approximate_query(self.dataset, command)
+            if approximate is not None:
+                record_result(QueryResult(command, approximate.rows, time.perf_counter() - start,
+                                          intervals=approximate.intervals))
+                return truncate_to_tokens(approximate.describe(self.max_rows), self.max_tokens)
+
+        limit = 1 if fetch == "one" else self.fetch_limit
+        statement, routed = command, None
+        if self.dataset and not parameters:
+            # Follow-ups prefetched after the last answer come from memory; aggregates a
+            # materialized view covers read the view; others may be routed to partitions
+            routed = prefetcher.answer(self.dataset, command)
+            if routed is None:
+                statement = rewrite_query(self.dataset, command, self._engine.url.database) or command
+                if statement is command:
+                    routed = route_query(self.dataset, command)
+        if routed is not None:
+            # Routed and prefetched rows get the same cap and truncation summary as direct ones
+            result, more, total = routed[:limit], len(routed) > limit, len(routed)
+            summary = summarize_rows(routed, _numeric_columns(result)) if total > self.max_rows else ""
+        else:
+            with self._engine.connect() as conn:
+                if execution_options:
+                    conn = conn.execution_options(**execution_options)
+                result, more = execute_limited(conn, statement, limit, parameters)
+                total = count_rows(conn, statement, parameters) if more else len(result)
+                summary = (summarize_columns(conn, statement, _numeric_columns(result), parameters)
+                           if total > self.max_rows else "")
+        if more:
+            metrics.inc("agent.truncated_results")
+        record_result(QueryResult(command, result, time.perf_counter() - start, total_rows=total,
+                                  next_cursor=encode_cursor({"offset": len(result)}) if more else None))
+        if not result:
+            return ""
+
+        shown = [
+            {column: truncate_word(value, length=self._max_string_length) for column, value in row.items()}
+            for row in result[:self.max_rows]
+        ]
+        text = str(shown if include_columns else [tuple(row.values()) for row in shown])
+        if total > len(shown):
+            metrics.inc("agent.compacted_results")
+            text += (f"\n... truncated, showing {len(shown)} of {total} total rows. "
+                     f"Columns: {', '.join(result[0])}.")
+            if summary:
+                text += f" Summary of all rows: {summary}."
+            text += " Use aggregates or LIMIT for the rest."
+        return truncate_to_tokens(text, self.max_tokens)
+
+
+def _numeric_columns(rows: List[Dict[str, Any]]) -> List[str]:
+    if not rows:
+        return []
+    return [c for c, v in rows[0].items() if isinstance(v, (int, float)) and not isinstance(v, bool)]
+
+
+def scratchpad_trimmer(max_tokens: int = SCRATCHPAD_TOKENS) -> Callable:
+    """
+    Build an AgentExecutor `trim_intermediate_steps` function.
+
+    The newest tool outputs are kept verbatim while they fit in `max_tokens`;
+    older ones are replaced by a short placeholder. Steps themselves are kept
+    so every tool call still has its result and the LLM knows what it ran.
+    """
+
+    def trim(steps: List[Tuple[AgentAction, str]]) -> List[Tuple[AgentAction, str]]:
+        budget = max_tokens
+        trimmed = []
+        for action, observation in reversed(steps):
+            tokens = count_tokens(str(observation))
+            if tokens <= budget:
+                budget -= tokens
+            else:
+                budget = 0
+                observation = f"[earlier {action.tool} output omitted: {tokens} tokens]"
+                metrics.inc("agent.elided_steps")
+            trimmed.append((action, observation))
+        trimmed.reverse()
+        return trimmed
+
+    return trim
+
+
+class AgentTraceLogger(BaseCallbackHandler):
+    """
+    Structured replacement for the agents' verbose stdout trace.
+
+    A sampled fraction of runs log each tool call and output size as JSON
+    records; every run records its step and token totals in the metrics
+    registry, and errors are always logged.
+
+    Args:
+        source (str): Label for the dataset/agent
+        sample_rate (float): Fraction of runs logged step by step
+    """
+
+    def __init__(self, source: str, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.source = source
+        self.sampled = random.random() < sample_rate
+        self.start = time.perf_counter()
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.prompt_tokens = 0
+        self.tool_output_tokens = 0
+
+    def _log(self, level: int, event: str, **fields: Any):
+        logger.log(level, json.dumps({"event": event, "source": self.source, **fields}, default=str))
+
+    def on_llm_end(self, response, **kwargs: Any):
+        self.llm_calls += 1
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+
+    def on_agent_action(self, action: AgentAction, **kwargs: Any):
+        self.tool_calls += 1
+        if self.sampled:
+            self._log(logging.INFO, "agent_action", step=self.tool_calls, tool=action.tool,
+                      input=truncate_to_tokens(str(action.tool_input), 100))
+
+    def on_tool_end(self, output: Any, **kwargs: Any):
+        tokens = count_tokens(str(output))
+        self.tool_output_tokens += tokens
+        metrics.observe("agent.tool_output_tokens", tokens, source=self.source)
+        if self.sampled:
+            self._log(logging.INFO, "tool_end", step=self.tool_calls, output_tokens=tokens)
+
+    def on_chain_end(self, outputs: Dict[str, Any], *, parent_run_id=None, **kwargs: Any):
+        if parent_run_id is not None:
+            return
+        metrics.observe("agent.steps", self.tool_calls, source=self.source)
+        metrics.observe("agent.prompt_tokens_per_run", self.prompt_tokens, source=self.source)
+        if self.sampled:
+            self._log(logging.INFO, "agent_run", llm_calls=self.llm_calls, tool_calls=self.tool_calls,
+                      prompt_tokens=self.prompt_tokens, tool_output_tokens=self.tool_output_tokens,
+                      seconds=round(time.perf_counter() - self.start, 3))
+
+    def on_chain_error(self, error: BaseException, *, parent_run_id=None, **kwargs: Any):
+        if parent_run_id is None:
+            self._log(logging.WARNING, "agent_error", error=str(error), tool_calls=self.tool_calls)
+
+    def on_tool_error(self, error: BaseException, **kwargs: Any):
+        self._log(logging.WARNING, "tool_error", step=self.tool_calls, error=str(error))
@@ -0,0 +1,118 @@
+"""
+MediAide request context
+One warm MediAide instance serves concurrent requests from worker threads
+and asyncio tasks. Everything it shares between requests is either
+read-only once initialize() has run (the tool table, the dataset registry)
+or guarded by its own lock (dataset rebuilds, agent, engine and model
+caches, metrics). What belongs to a single request lives in a
+RequestContext bound to a context variable for the request's duration:
+
+- a request id, returned in the response metadata
+- the chat model, read from settings.llm once when the request starts, so
+  a model swapped mid-request (e.g. by configure_offline) never mixes into it
+- whether SQL may be answered approximately from the samples
+- its priority at the provider rate limiters: interactive requests are
+  served before batch and report jobs (src/main/ratelimit.py)
+
+Context variables are per thread and per asyncio task, and asyncio.to_thread
+copies the caller's context into the worker thread, so nested calls (the
+comprehensive answer querying each dataset, the SQL agents' tools) see the
+request they belong to and nothing else.
+"""
+
+import contextlib
+import contextvars
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from src.main.approximate import approximate_answers
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+_current: contextvars.ContextVar[Optional["RequestContext"]] = contextvars.ContextVar(
+    "mediaide_request", default=None
+)
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """
+    Per-request state of a MediAide call.
+
+    Attributes:
+        request_id (str): Short random id for logs and response metadata
+        source (str): The tool or dataset the request was made against
+        llm: Chat model used for every LLM call of the request
+        approximate (bool): Whether SQL may be answered from the samples
+        started (float): perf_counter time the request started
+        priority (str): INTERACTIVE or BATCH, for the provider rate limiters
+    """
+
+    request_id: str
+    source: str
+    llm: Any
+    approximate: bool
+    started: float
+    priority: str = INTERACTIVE
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def current_request() -> Optional[RequestContext]:
+    """Return the context of the request running in this thread or task, if any."""
+    return _current.get()
+
+
+def current_llm():
+    """Return the current request's chat model, or settings.llm outside a request."""
+    request = _current.get()
+    if request is not None:
+        return request.llm
+    from src.main import settings
+    return settings.llm
+
+
+def current_priority() -> str:
+    """Return the current request's priority, INTERACTIVE outside a request."""
+    request = _current.get()
+    return request.priority if request is not None else INTERACTIVE
+
+
+@contextlib.contextmanager
+def request_context(source: str, approximate: bool = False, llm: Any = None,
+                    priority: Optional[str] = None) -> Iterator[RequestContext]:
+    """
+    Run the block as one request.
+
+    A request nested in another (e.g. each dataset of a comprehensive answer)
+    gets its own id and approximation setting but keeps the outer request's
+    chat model and priority.
+
+    Args:
+        source (str): The tool or dataset the request is made against
+        approximate (bool): Answer SQL from the samples where possible
+        llm: Chat model to use; defaults to the enclosing request's, then settings.llm
+        priority (str): INTERACTIVE or BATCH; defaults to the enclosing request's, then INTERACTIVE
+
+    Yields:
+        RequestContext: The request's context
+    """
+    request = RequestContext(
+        request_id=uuid.uuid4().hex[:12],
+        source=source,
+        llm=llm if llm is not None else current_llm(),
+        approximate=approximate,
+        started=time.perf_counter(),
+        priority=priority or current_priority(),
+    )
+    token = _current.set(request)
+    try:
+        with approximate_answers(approximate):
+            yield request
+    finally:
+        _current.reset(token)
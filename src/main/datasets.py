@@ -0,0 +1,158 @@
+"""
+MediAide dataset definitions
+Loads the dataset registry (src/data/datasets.yaml) shared by the database
+builders, the SQL agents and tools, the in-process analytics engines and the
+UI. Adding a dataset is a registry entry, not new code.
+
+Environment:
+    MEDIAIDE_DATASET_REGISTRY: path of the registry file (default src/data/datasets.yaml)
+"""
+
+import os
+from typing import Dict, Any, Optional
+import pandas as pd
+import yaml
+from pyprojroot import here
+
+
+REQUIRED_FIELDS = ('csv', 'table', 'target')
+
+
+def registry_path() -> str:
+    """Return the path of the dataset registry file."""
+    return os.getenv("MEDIAIDE_DATASET_REGISTRY") or str(here("src/data/datasets.yaml"))
+
+
+def load_registry(path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Read and validate the dataset registry, filling in defaults.
+
+    Args:
+        path (str): Registry file, defaults to registry_path()
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Dataset name -> definition, in file order
+    """
+    path = path or registry_path()
+    with open(path, encoding="utf-8") as f:
+        entries = (yaml.safe_load(f) or {}).get('datasets') or {}
+
+    registry = {}
+    for name, entry in entries.items():
+        missing = [field for field in REQUIRED_FIELDS if not (entry or {}).get(field)]
+        if missing:
+            raise ValueError(f"Dataset '{name}' in {path} is missing: {', '.join(missing)}")
+        registry[name] = {
+            **entry,
+            'db': entry.get('db') or f"{name}.db",
+            'label': entry.get('label') or name.replace('_', ' ').title(),
+            'icon': entry.get('icon', ''),
+            'aliases': list(entry.get('aliases') or []),
+            'description': ' '.join(str(entry.get('description', '')).split()),
+            'dtypes': dict(entry.get('dtypes') or {}),
+            'indexes': [[columns] if isinstance(columns, str) else list(columns)
+                        for columns in entry.get('indexes') or []],
+            'views': [_view(name, view) for view in entry.get('views') or []],
+            'schema': {str(column): _rules(rules) for column, rules in (entry.get('schema') or {}).items()},
+        }
+    return registry
+
+
+def _view(dataset: str, view: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a materialized view entry: dimensions become a name -> expression mapping."""
+    if not view.get('name') or not view.get('dimensions'):
+        raise ValueError(f"Views of dataset '{dataset}' need a name and dimensions")
+    dimensions = view['dimensions']
+    if not isinstance(dimensions, dict):
+        dimensions = {column: column for column in dimensions}
+    return {
+        'name': view['name'],
+        'dimensions': {str(name): str(expr) for name, expr in dimensions.items()},
+        'measures': list(view.get('measures') or []),
+    }
+
+
+def _rules(rules: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Normalize a column's validation rules; listing missing-value codes makes it nullable."""
+    rules = rules or {}
+    missing = list(rules.get('missing') or [])
+    return {
+        'min': rules.get('min'),
+        'max': rules.get('max'),
+        'missing': missing,
+        'nullable': bool(rules.get('nullable', bool(missing))),
+    }
+
+
+DATASETS: Dict[str, Dict[str, Any]] = load_registry()
+
+
+def get_dataset(name: str) -> Dict[str, Any]:
+    """
+    Look up a dataset definition by name.
+
+    Args:
+        name (str): Dataset name, e.g. 'diabetes'
+
+    Returns:
+        Dict[str, Any]: The dataset definition
+    """
+    if name not in DATASETS:
+        raise ValueError(f"Unknown dataset '{name}'. Available: {', '.join(DATASETS)}")
+    return DATASETS[name]
+
+
+def resolve_dataset(name: str) -> Optional[str]:
+    """Return the dataset a name or alias refers to, or None."""
+    name = name.strip().lower()
+    for dataset, info in DATASETS.items():
+        if name == dataset or name in info['aliases']:
+            return dataset
+    return None
+
+
+def display_name(name: str) -> str:
+    """Return the UI label of a dataset's database, e.g. '📈 Diabetes DB'."""
+    info = get_dataset(name)
+    return f"{info['icon']} {info['label']} DB".strip()
+
+
+def database_dir() -> str:
+    """Return the directory holding the built databases and model artifacts."""
+    return str(here("src/database"))
+
+
+def parse_dtypes(name: str) -> Dict[str, str]:
+    """
+    Return the dtypes a dataset's CSV is parsed with.
+
+    Declared integer columns are read as int64 and other numeric columns as
+    float64, so out-of-range values and missing-value codes survive until
+    validation; other declared dtypes apply as is.
+    """
+    parse = {}
+    for column, dtype in get_dataset(name)['dtypes'].items():
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if pd.api.types.is_integer_dtype(dtype):
+            parse[column] = 'int64'
+        elif pd.api.types.is_numeric_dtype(dtype):
+            parse[column] = 'float64'
+        else:
+            parse[column] = str(dtype)
+    return parse
+
+
+def load_dataset(name: str) -> pd.DataFrame:
+    """
+    Load the raw CSV for a dataset into a DataFrame, without validation.
+
+    Use src.main.validation.load_validated() to ingest a dataset.
+
+    Args:
+        name (str): Dataset name
+
+    Returns:
+        pd.DataFrame: The dataset contents, parsed with parse_dtypes()
+    """
+    info = get_dataset(name)
+    return pd.read_csv(here(info['csv']), dtype=parse_dtypes(name) or None)
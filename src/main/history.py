@@ -0,0 +1,264 @@
+"""
+MediAide conversation history
+Pluggable, bounded stores for the per-session query history shown in the
+Streamlit UI. The SQLite store keeps a compact append-only row per query,
+serves paginated reads and enforces retention limits, so a session's memory
+footprint stays constant no matter how long it runs.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from src.main.datasets import database_dir
+
+
+# Longest answer text kept per source; the full response is never persisted.
+MAX_ANSWER_CHARS = 2000
+
+
+def compact_entry(query: str, query_type: str, response: Dict[str, Any], response_time: float,
+                  timestamp: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Reduce a MediAide response to the compact row stored in the history.
+
+    Comprehensive responses keep one truncated answer per source; single
+    responses keep their truncated answer text.
+
+    Args:
+        query (str): The user's question
+        query_type (str): The UI query type label
+        response (Dict[str, Any]): The MediAide response dict
+        response_time (float): Wall-clock time in seconds
+        timestamp (float): Unix timestamp; defaults to now
+
+    Returns:
+        Dict[str, Any]: The compact history entry
+    """
+    if 'responses' in response:
+        answers = {
+            source: str(result.get('answer', ''))[:MAX_ANSWER_CHARS]
+            for source, result in response['responses'].items()
+        }
+        success = all(result.get('success', True) for result in response['responses'].values())
+        answer = None
+    else:
+        answers = None
+        success = response.get('success', True)
+        answer = str(response.get('answer', ''))[:MAX_ANSWER_CHARS]
+
+    return {
+        "timestamp": time.time() if timestamp is None else timestamp,
+        "query": query,
+        "query_type": query_type,
+        "success": bool(success),
+        "response_time": float(response_time),
+        "answer": answer,
+        "answers": answers,
+    }
+
+
+class HistoryStore(ABC):
+    """
+    Interface for conversation history backends.
+
+    Entries are dicts as produced by `compact_entry`; reads return them newest
+    first with `timestamp` converted to a datetime. A backend missing any of
+    the methods cannot be instantiated.
+    """
+
+    @abstractmethod
+    def append(self, session_id: str, entry: Dict[str, Any]):
+        """Append an entry to a session's history."""
+
+    @abstractmethod
+    def page(self, session_id: str, offset: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        """Return up to `limit` entries, newest first, skipping the `offset` newest."""
+
+    @abstractmethod
+    def count(self, session_id: str) -> int:
+        """Return the number of retained entries for a session."""
+
+    @abstractmethod
+    def clear(self, session_id: str):
+        """Delete a session's history."""
+
+
+class InMemoryHistoryStore(HistoryStore):
+    """
+    Process-local history store keeping at most `max_entries` per session.
+    """
+
+    def __init__(self, max_entries: int = 500):
+        self.max_entries = max_entries
+        self._sessions: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, entry: Dict[str, Any]):
+        with self._lock:
+            history = self._sessions.setdefault(session_id, deque(maxlen=self.max_entries))
+            history.append(dict(entry))
+
+    def page(self, session_id: str, offset: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            history = list(self._sessions.get(session_id, ()))
+        entries = history[::-1][offset:offset + limit]
+        return [{**entry, "timestamp": datetime.fromtimestamp(entry["timestamp"])} for entry in entries]
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._sessions.get(session_id, ()))
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """
+    Append-only SQLite history store with per-session and age-based retention.
+
+    A session is trimmed to `max_entries_per_session` in the transaction of
+    each append (an indexed delete); entries older than `max_age_days` are
+    removed every `prune_every` appends. Each thread gets its own connection;
+    the database runs in WAL mode so readers don't block the writer.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            ts REAL NOT NULL,
+            query TEXT NOT NULL,
+            query_type TEXT NOT NULL,
+            success INTEGER NOT NULL,
+            response_time REAL NOT NULL,
+            multi_source INTEGER NOT NULL,
+            answer TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS history_session ON history (session_id, id);
+        CREATE INDEX IF NOT EXISTS history_ts ON history (ts);
+    """
+
+    def __init__(self, path: str, max_entries_per_session: int = 500, max_age_days: float = 30.0,
+                 prune_every: int = 50):
+        self.path = path
+        self.max_entries_per_session = max_entries_per_session
+        self.max_age_seconds = max_age_days * 86400
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._appends = 0
+        self._appends_lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, session_id: str, entry: Dict[str, Any]):
+        multi_source = entry.get("answers") is not None
+        answer = json.dumps(entry["answers"]) if multi_source else entry["answer"]
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO history (session_id, ts, query, query_type, success, response_time, multi_source, answer) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, entry["timestamp"], entry["query"], entry["query_type"],
+                 int(entry["success"]), entry["response_time"], int(multi_source), answer or ""),
+            )
+            self._trim(conn, session_id)
+
+        # The age cutoff scans every session, so it is enforced periodically
+        with self._appends_lock:
+            self._appends += 1
+            due = self._appends % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def _trim(self, conn: sqlite3.Connection, session_id: str):
+        # Both lookups use the (session_id, id) index
+        conn.execute(
+            "DELETE FROM history WHERE session_id = ? AND id <= ("
+            "  SELECT id FROM history WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?"
+            ")",
+            (session_id, session_id, self.max_entries_per_session),
+        )
+
+    def prune(self, session_id: Optional[str] = None):
+        """
+        Apply the retention limits.
+
+        Args:
+            session_id (str): Also trim this session to `max_entries_per_session`
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM history WHERE ts < ?", (time.time() - self.max_age_seconds,))
+            if session_id is not None:
+                self._trim(conn, session_id)
+
+    def page(self, session_id: str, offset: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT ts, query, query_type, success, response_time, multi_source, answer FROM history "
+            "WHERE session_id = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+            (session_id, max(0, min(limit, self.max_entries_per_session - offset)), offset),
+        ).fetchall()
+
+        entries = []
+        for ts, query, query_type, success, response_time, multi_source, answer in rows:
+            entries.append({
+                "timestamp": datetime.fromtimestamp(ts),
+                "query": query,
+                "query_type": query_type,
+                "success": bool(success),
+                "response_time": response_time,
+                "answer": None if multi_source else answer,
+                "answers": json.loads(answer) if multi_source else None,
+            })
+        return entries
+
+    def count(self, session_id: str) -> int:
+        (count,) = self._connection().execute(
+            "SELECT COUNT(*) FROM history WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return min(count, self.max_entries_per_session)
+
+    def clear(self, session_id: str):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM history WHERE session_id = ?", (session_id,))
+
+
+def get_history_store() -> HistoryStore:
+    """
+    Create the history store configured by the environment.
+
+    MEDIAIDE_HISTORY_BACKEND selects 'sqlite' (default) or 'memory';
+    MEDIAIDE_HISTORY_DB overrides the SQLite file location and
+    MEDIAIDE_HISTORY_MAX_ENTRIES the per-session retention limit.
+
+    Returns:
+        HistoryStore: The configured store
+    """
+    backend = os.getenv("MEDIAIDE_HISTORY_BACKEND", "sqlite").lower()
+    max_entries = int(os.getenv("MEDIAIDE_HISTORY_MAX_ENTRIES", "500"))
+
+    if backend == "memory":
+        return InMemoryHistoryStore(max_entries=max_entries)
+    if backend == "sqlite":
+        path = os.getenv("MEDIAIDE_HISTORY_DB", os.path.join(database_dir(), "history.db"))
+        return SQLiteHistoryStore(path, max_entries_per_session=max_entries)
+    raise ValueError(f"Unknown history backend '{backend}'. Use 'sqlite' or 'memory'.")
@@ -0,0 +1,387 @@
+"""
+MediAide LLM response cache
+Caches chat completions from `settings.llm` (LangChain) and `settings.client`
+(AsyncOpenAI) in a persistent SharedCache. Keys cover the model, the messages
+and the tools offered, with provider-generated tool call ids normalized so
+that repeated SQL agent steps match across conversations. Identical requests
+already in flight are coalesced onto a single upstream call. Only
+deterministic (temperature 0) requests are cached.
+
+Environment:
+    MEDIAIDE_LLM_CACHE: set to 0 to disable caching
+    MEDIAIDE_LLM_CACHE_MAX_ENTRIES: entries kept in the LRU store (default 5000)
+    MEDIAIDE_LLM_CACHE_TTL: seconds an entry stays valid (default 7 days)
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from openai import NotGiven
+from openai.types.chat import ChatCompletion
+from pydantic import ConfigDict
+
+from src.main.metrics import metrics
+from src.main.shared_cache import SharedCache, shared_cache_path
+
+
+def normalize_tool_call_ids(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Replace tool call ids with their order of first appearance.
+
+    Providers generate a fresh id for every tool call, which would otherwise
+    make every step after the first a cache miss. The ids only link a call to
+    its result, so positional ids preserve the meaning of the conversation.
+    """
+    ids: Dict[str, str] = {}
+
+    def canonical(call_id: Optional[str]) -> Optional[str]:
+        if call_id is None:
+            return None
+        return ids.setdefault(call_id, f"call_{len(ids)}")
+
+    normalized = []
+    for message in messages:
+        message = dict(message)
+        if message.get("tool_calls"):
+            message["tool_calls"] = [
+                {**call, "id": canonical(call.get("id"))} for call in message["tool_calls"]
+            ]
+        if message.get("tool_call_id"):
+            message["tool_call_id"] = canonical(message["tool_call_id"])
+        normalized.append(message)
+    return normalized
+
+
+def langchain_message_key(message: BaseMessage) -> Dict[str, Any]:
+    """Reduce a LangChain message to the fields the provider actually sees."""
+    return {
+        "type": message.type,
+        "content": message.content,
+        "name": getattr(message, "name", None),
+        "tool_calls": [
+            {"name": call["name"], "args": call["args"], "id": call.get("id")}
+            for call in getattr(message, "tool_calls", None) or []
+        ],
+        "tool_call_id": getattr(message, "tool_call_id", None),
+    }
+
+
+def is_deterministic(temperature: Any) -> bool:
+    """Return True if a request with this temperature can be replayed from cache."""
+    return temperature is not None and not isinstance(temperature, NotGiven) and float(temperature) == 0.0
+
+
+class LLMResponseCache:
+    """
+    Persistent completion cache with in-flight request coalescing.
+
+    Args:
+        store (SharedCache): Backing LRU store shared by threads and processes
+        name (str): Label used for metrics
+    """
+
+    def __init__(self, store: SharedCache, name: str = "llm"):
+        self.store = store
+        self.name = name
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "tokens_saved": 0}
+
+    def _count(self, result: str, tokens_saved: int = 0):
+        with self._lock:
+            self._stats[{"hit": "hits", "miss": "misses", "coalesced": "coalesced"}[result]] += 1
+            self._stats["tokens_saved"] += tokens_saved
+        metrics.inc("llm_cache.requests", cache=self.name, result=result)
+        if tokens_saved:
+            metrics.inc("llm_cache.tokens_saved", tokens_saved, cache=self.name)
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight future for `key` and whether the caller owns it."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = self.store.get(key)
+        if cached is not None:
+            self._count("hit", cached.get("total_tokens", 0))
+        return cached
+
+    def _finish(self, key: str, future: Future, entry: Optional[Dict[str, Any]], error: Optional[BaseException]):
+        if entry is not None:
+            self.store.set(key, entry)
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(entry)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached entry for `key`, computing it at most once.
+
+        Args:
+            key (str): Request key, see `SharedCache.make_key`
+            compute: Calls the provider and returns a JSON-serializable entry
+                with a `total_tokens` field
+
+        Returns:
+            Dict[str, Any]: The cached or freshly computed entry
+        """
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        future, owner = self._claim(key)
+        if not owner:
+            entry = future.result()
+            self._count("coalesced", entry.get("total_tokens", 0))
+            return entry
+
+        self._count("miss")
+        entry, error = None, None
+        try:
+            entry = compute()
+            return entry
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finish(key, future, entry, error)
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Any]) -> Dict[str, Any]:
+        """Async variant of `get_or_compute`; `compute` returns an awaitable."""
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        future, owner = self._claim(key)
+        if not owner:
+            entry = await asyncio.wrap_future(future)
+            self._count("coalesced", entry.get("total_tokens", 0))
+            return entry
+
+        self._count("miss")
+        entry, error = None, None
+        try:
+            entry = await compute()
+            return entry
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finish(key, future, entry, error)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/coalesced counts, the hit rate and tokens saved."""
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / requests if requests else None
+        return stats
+
+
+class CachingChatModel(BaseChatModel):
+    """
+    LangChain chat model that serves repeated deterministic calls from cache.
+
+    Wraps another chat model; tools bound with `bind_tools`/`bind` reach
+    `_generate` as keyword arguments and are part of the cache key. Cached
+    replies report zero token usage so cost tracking reflects real calls.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: BaseChatModel
+    response_cache: LLMResponseCache
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.model._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.model._identifying_params
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Optional[str]:
+        if not is_deterministic(getattr(self.model, "temperature", 0.0)):
+            return None
+        return SharedCache.make_key(
+            self.model._llm_type,
+            self.model._identifying_params,
+            normalize_tool_call_ids([langchain_message_key(m) for m in messages]),
+            stop,
+            kwargs,
+        )
+
+    @staticmethod
+    def _to_entry(result: ChatResult) -> Dict[str, Any]:
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        return {
+            "generations": [message_to_dict(generation.message) for generation in result.generations],
+            "llm_output": result.llm_output,
+            "total_tokens": usage.get("total_tokens", 0),
+        }
+
+    @staticmethod
+    def _from_entry(entry: Dict[str, Any], cached: bool) -> ChatResult:
+        llm_output = dict(entry.get("llm_output") or {})
+        if cached:
+            llm_output["token_usage"] = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            llm_output["cached"] = True
+        return ChatResult(
+            generations=[ChatGeneration(message=message) for message in messages_from_dict(entry["generations"])],
+            llm_output=llm_output,
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        if key is None:
+            return self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        fresh: List[ChatResult] = []
+
+        def compute():
+            fresh.append(self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs))
+            return self._to_entry(fresh[0])
+
+        entry = self.response_cache.get_or_compute(key, compute)
+        return fresh[0] if fresh else self._from_entry(entry, cached=True)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        if key is None:
+            return await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        fresh: List[ChatResult] = []
+
+        async def compute():
+            fresh.append(await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs))
+            return self._to_entry(fresh[0])
+
+        entry = await self.response_cache.aget_or_compute(key, compute)
+        return fresh[0] if fresh else self._from_entry(entry, cached=True)
+
+
+class _CachedCompletions:
+    """`chat.completions` namespace whose `create` goes through the cache."""
+
+    def __init__(self, completions, cache: LLMResponseCache):
+        self._completions = completions
+        self._cache = cache
+
+    def __getattr__(self, name: str):
+        return getattr(self._completions, name)
+
+    async def create(self, **kwargs: Any):
+        if kwargs.get("stream") or not is_deterministic(kwargs.get("temperature")):
+            return await self._completions.create(**kwargs)
+
+        request = {
+            name: value for name, value in kwargs.items()
+            if not isinstance(value, NotGiven) and name not in ("extra_headers", "timeout")
+        }
+        request["messages"] = normalize_tool_call_ids(list(request.get("messages", [])))
+        key = SharedCache.make_key("openai.chat.completions", request)
+
+        fresh: List[ChatCompletion] = []
+
+        async def compute():
+            response = await self._completions.create(**kwargs)
+            fresh.append(response)
+            return {
+                "response": response.model_dump(mode="json"),
+                "total_tokens": response.usage.total_tokens if response.usage else 0,
+            }
+
+        entry = await self._cache.aget_or_compute(key, compute)
+        if fresh:
+            return fresh[0]
+        response = ChatCompletion.model_validate(entry["response"])
+        if response.usage is not None:
+            response.usage = response.usage.model_copy(
+                update={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            )
+        return response
+
+
+class _CachedChat:
+    def __init__(self, chat, cache: LLMResponseCache):
+        self._chat = chat
+        self.completions = _CachedCompletions(chat.completions, cache)
+
+    def __getattr__(self, name: str):
+        return getattr(self._chat, name)
+
+
+class CachedAsyncOpenAI:
+    """
+    Proxy for an `AsyncOpenAI` client whose chat completions are cached.
+
+    Every other attribute is forwarded to the wrapped client, so it can be
+    passed anywhere an `AsyncOpenAI` is expected.
+    """
+
+    def __init__(self, client, cache: LLMResponseCache):
+        self._client = client
+        self.cache = cache
+        self.chat = _CachedChat(client.chat, cache)
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def llm_cache_enabled() -> bool:
+    """Return False when caching is disabled with MEDIAIDE_LLM_CACHE=0."""
+    return os.getenv("MEDIAIDE_LLM_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Return the process-wide LLM response cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            store = SharedCache(
+                shared_cache_path("llm"),
+                name="llm_cache",
+                max_entries=int(os.getenv("MEDIAIDE_LLM_CACHE_MAX_ENTRIES", "5000")),
+                default_ttl=float(os.getenv("MEDIAIDE_LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+            _cache = LLMResponseCache(store)
+        return _cache
+
+
+def cached_chat_model(llm: BaseChatModel) -> BaseChatModel:
+    """Wrap a LangChain chat model with the shared response cache (unless disabled)."""
+    if not llm_cache_enabled() or isinstance(llm, CachingChatModel):
+        return llm
+    return CachingChatModel(model=llm, response_cache=get_llm_cache())
+
+
+def cached_openai_client(client):
+    """Wrap an AsyncOpenAI client with the shared response cache (unless disabled)."""
+    if not llm_cache_enabled() or isinstance(client, CachedAsyncOpenAI):
+        return client
+    return CachedAsyncOpenAI(client, get_llm_cache())
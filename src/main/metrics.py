@@ -0,0 +1,363 @@
+"""
+MediAide operational metrics
+Process-wide counters, gauges and latency histograms shared by every
+session, with a JSON export per process that can be merged across workers.
+Histograms reuse the mergeable latency sketch from the analytics module,
+so p50/p95/p99 stay accurate after merging. Merged counters and histograms
+add up across processes; gauges are point-in-time values and are kept per
+process under a `pid` label.
+
+Environment:
+    MEDIAIDE_METRICS_DIR: Export directory (default src/database/metrics)
+    MEDIAIDE_METRICS_TTL: Seconds after which an export that was not
+        refreshed is dropped when merging (default 900)
+"""
+
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.main.analytics import LatencySketch, RunningStats
+from src.main.datasets import database_dir
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    """Latency histogram: streaming stats plus a quantile sketch."""
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.sketch = LatencySketch()
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.stats.add(value)
+        self.sketch.add(value)
+        self.sum += value
+
+    def summary(self) -> Dict[str, Any]:
+        stats = self.stats
+        return {
+            "count": stats.count,
+            "sum": self.sum,
+            "mean": stats.mean if stats.count else None,
+            "min": stats.min if stats.count else None,
+            "max": stats.max if stats.count else None,
+            "p50": self.sketch.quantile(0.50),
+            "p95": self.sketch.quantile(0.95),
+            "p99": self.sketch.quantile(0.99),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.stats.count,
+            "sum": self.sum,
+            "min": self.stats.min if self.stats.count else None,
+            "max": self.stats.max if self.stats.count else None,
+            "sketch": self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        histogram = cls()
+        histogram.sketch = LatencySketch.from_dict(data["sketch"])
+        histogram.sum = data["sum"]
+        histogram.stats.count = data["count"]
+        if data["count"]:
+            histogram.stats.mean = data["sum"] / data["count"]
+            histogram.stats.min = data["min"]
+            histogram.stats.max = data["max"]
+        return histogram
+
+    def merge(self, other: "Histogram"):
+        total = self.stats.count + other.stats.count
+        if other.stats.count:
+            self.stats.min = min(self.stats.min, other.stats.min)
+            self.stats.max = max(self.stats.max, other.stats.max)
+        self.sum += other.sum
+        self.stats.count = total
+        self.stats.mean = self.sum / total if total else 0.0
+        self.sketch.merge(other.sketch)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of labeled counters, gauges and histograms.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to an absolute value."""
+        with self._lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def remove_gauge(self, name: str, **labels):
+        """Drop one series of a gauge, e.g. for a process that has exited."""
+        with self._lock:
+            self.gauges.get(name, {}).pop(_label_key(labels), None)
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value (typically seconds) in a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Context manager observing the elapsed wall-clock time of its block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+        """Return a counter's current value (0 if never incremented)."""
+        with self._lock:
+            return self.counters.get(name, {}).get(_label_key(labels), 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return a readable snapshot of every metric.
+
+        Returns:
+            Dict[str, Any]: {'counters'|'gauges'|'histograms': {name: [{'labels', ...}]}}
+        """
+        with self._lock:
+            return {
+                "started": self.started,
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self.counters.items()
+                },
+                "gauges": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self.gauges.items()
+                },
+                "histograms": {
+                    name: [{"labels": dict(key), **histogram.summary()} for key, histogram in series.items()]
+                    for name, series in self.histograms.items()
+                },
+            }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the registry, including full sketches, for export and merging."""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "started": self.started,
+                "exported": time.time(),
+                "counters": {
+                    name: [[dict(key), value] for key, value in series.items()]
+                    for name, series in self.counters.items()
+                },
+                "gauges": {
+                    name: [[dict(key), value] for key, value in series.items()]
+                    for name, series in self.gauges.items()
+                },
+                "histograms": {
+                    name: [[dict(key), histogram.to_dict()] for key, histogram in series.items()]
+                    for name, series in self.histograms.items()
+                },
+            }
+
+    def merge_dict(self, data: Dict[str, Any]):
+        """Fold a serialized registry (see `to_dict`) into this one."""
+        with self._lock:
+            self.started = min(self.started, data["started"])
+            for name, series in data["counters"].items():
+                target = self.counters.setdefault(name, {})
+                for labels, value in series:
+                    key = _label_key(labels)
+                    target[key] = target.get(key, 0) + value
+            for name, series in data["gauges"].items():
+                target = self.gauges.setdefault(name, {})
+                for labels, value in series:
+                    # Gauges of different processes do not add up; keep each one
+                    labels = {"pid": data["pid"], **labels}
+                    target[_label_key(labels)] = value
+            for name, series in data["histograms"].items():
+                target = self.histograms.setdefault(name, {})
+                for labels, histogram in series:
+                    key = _label_key(labels)
+                    incoming = Histogram.from_dict(histogram)
+                    if key in target:
+                        target[key].merge(incoming)
+                    else:
+                        target[key] = incoming
+
+    def reset(self):
+        """Drop every recorded metric."""
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+
+# Process-wide registry shared by all sessions
+metrics = MetricsRegistry()
+
+
+def metrics_dir() -> str:
+    """Return the export directory (MEDIAIDE_METRICS_DIR, default src/database/metrics)."""
+    return os.getenv("MEDIAIDE_METRICS_DIR", os.path.join(database_dir(), "metrics"))
+
+
+def export_metrics(directory: Optional[str] = None, registry: Optional[MetricsRegistry] = None) -> str:
+    """
+    Write this process's metrics to `<directory>/metrics-<pid>.json`.
+
+    Returns:
+        str: The written file path
+    """
+    directory = directory or metrics_dir()
+    registry = registry or metrics
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(registry.to_dict(), f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def metrics_ttl() -> float:
+    """Return the age in seconds after which an export is stale (MEDIAIDE_METRICS_TTL, default 900)."""
+    return float(os.getenv("MEDIAIDE_METRICS_TTL", "900"))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists but belongs to another user
+        return True
+    return True
+
+
+def load_exported_metrics(directory: Optional[str] = None, ttl: Optional[float] = None) -> MetricsRegistry:
+    """
+    Merge every live exported metrics file in a directory into one registry.
+
+    Files written by a process that has exited, or not refreshed within
+    `ttl` seconds, are deleted instead of merged.
+
+    Args:
+        directory (str): Export directory (default metrics_dir())
+        ttl (float): Maximum export age in seconds (default metrics_ttl())
+
+    Returns:
+        MetricsRegistry: The merged metrics across processes
+    """
+    ttl = metrics_ttl() if ttl is None else ttl
+    merged = MetricsRegistry()
+    for path in sorted(glob.glob(os.path.join(directory or metrics_dir(), "metrics-*.json"))):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+        if not _process_alive(data["pid"]) or time.time() - data["exported"] > ttl:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        merged.merge_dict(data)
+    return merged
+
+
+def instrumented(source):
+    """
+    Decorator recording request count, error count and latency for a
+    MediAide method returning a response dict with a `success` flag.
+
+    Args:
+        source: Label used for the `source` dimension, or a function of the
+            call's arguments returning it
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            label = source(*args, **kwargs) if callable(source) else source
+            start = time.perf_counter()
+            success = False
+            try:
+                result = func(*args, **kwargs)
+                success = isinstance(result, dict) and result.get("success", True)
+                return result
+            finally:
+                metrics.observe("mediaide.latency_seconds", time.perf_counter() - start, source=label)
+                metrics.inc("mediaide.requests", source=label)
+                if not success:
+                    metrics.inc("mediaide.errors", source=label)
+        return wrapper
+    return decorator
+
+
+def record_token_usage(source: str, callback):
+    """
+    Record LLM token usage from a LangChain OpenAI callback handler.
+
+    Args:
+        source (str): Label used for the `source` dimension
+        callback: Handler exposing prompt_tokens/completion_tokens/total_cost
+    """
+    metrics.inc("llm.prompt_tokens", callback.prompt_tokens, source=source)
+    metrics.inc("llm.completion_tokens", callback.completion_tokens, source=source)
+    metrics.inc("llm.requests", callback.successful_requests, source=source)
+    metrics.inc("llm.cost_usd", callback.total_cost, source=source)
+
+
+def cache_lookup(cache: str, hit: bool):
+    """Count a cache lookup for hit-rate reporting."""
+    metrics.inc("cache.lookups", cache=cache, result="hit" if hit else "miss")
+
+
+def cache_hit_rates(snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compute hit rates per cache from a registry snapshot.
+
+    Returns:
+        List[Dict[str, Any]]: One row per cache with hits, misses and hit_rate
+    """
+    caches: Dict[str, Dict[str, float]] = {}
+    for row in snapshot["counters"].get("cache.lookups", []):
+        counts = caches.setdefault(row["labels"]["cache"], {"hit": 0, "miss": 0})
+        counts[row["labels"]["result"]] += row["value"]
+    return [
+        {"cache": cache, "hits": c["hit"], "misses": c["miss"],
+         "hit_rate": c["hit"] / (c["hit"] + c["miss"]) if c["hit"] + c["miss"] else None}
+        for cache, c in sorted(caches.items())
+    ]
@@ -0,0 +1,568 @@
+"""
+MediAide partitioned tables
+Datasets with a `partition` entry in the registry are also written as one
+SQLite file per range of a key column (e.g. age band or ingestion date).
+Queries the router understands are pruned to the partitions their WHERE
+clause can match, scanned in parallel (sqlite3 releases the GIL while a
+statement runs, so partitions are read on separate cores) and merged:
+aggregates are split into partial aggregates per partition and combined in an
+in-memory SQLite database, which also applies GROUP BY, ORDER BY and LIMIT.
+
+Anything the router cannot prove it answers exactly (joins, subqueries,
+DISTINCT, HAVING, window functions, ...) runs against the unpartitioned table.
+
+Registry example:
+    partition:
+      column: Age
+      bounds: [30, 40, 50, 60]   # partitions (-inf, 30), [30, 40), ..., [60, inf)
+
+Environment:
+    MEDIAIDE_PARTITION_WORKERS: threads scanning partitions (default: CPU count)
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.main.datasets import database_dir, get_dataset
+from src.main.metrics import metrics
+from src.main.sql_guard import clean_statement, quote, write_table
+from src.main.versions import publish_version, resolve_version, staging_dir
+
+logger = logging.getLogger(__name__)
+
+PARTITION_WORKERS = int(os.getenv("MEDIAIDE_PARTITION_WORKERS", "0")) or os.cpu_count() or 4
+
+MANIFEST_NAME = "manifest.json"
+
+_QUERY = re.compile(
+    r"^\s*select\s+(?P<select>.+?)\s+from\s+(?P<table>\w+|\"[^\"]+\")"
+    r"(?:\s+where\s+(?P<where>.+?))?"
+    r"(?:\s+group\s+by\s+(?P<group>.+?))?"
+    r"(?:\s+order\s+by\s+(?P<order>.+?))?"
+    r"(?:\s+limit\s+(?P<limit>\d+))?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+_UNSUPPORTED = re.compile(
+    r"\b(join|union|intersect|except|having|distinct|offset|over|case|exists)\b|\(\s*select\b|\?|:\w",
+    re.IGNORECASE,
+)
+_AGGREGATE = re.compile(r"\b(count|sum|total|min|max|avg)\s*\(", re.IGNORECASE)
+_ALIAS = re.compile(r"^(?P<expr>.+?)\s+as\s+(?P<alias>\w+|\"[^\"]+\")$", re.IGNORECASE | re.DOTALL)
+_DIRECTION = re.compile(r"^(?P<expr>.+?)(?P<direction>\s+(?:asc|desc))?$", re.IGNORECASE | re.DOTALL)
+_LITERAL = r"(-?\d+(?:\.\d+)?|'[^']*')"
+_COMPARISON = re.compile(rf"^(?P<column>\"?\w+\"?)\s*(?P<op><=|>=|<>|!=|=|<|>)\s*{_LITERAL}$", re.DOTALL)
+_REVERSED = re.compile(rf"^{_LITERAL}\s*(?P<op><=|>=|<>|!=|=|<|>)\s*(?P<column>\"?\w+\"?)$", re.DOTALL)
+_BETWEEN = re.compile(rf"^(?P<column>\"?\w+\"?)\s+between\s+{_LITERAL}\s+and\s+{_LITERAL}$",
+                      re.IGNORECASE | re.DOTALL)
+_IN = re.compile(r"^(?P<column>\"?\w+\"?)\s+in\s*\((?P<values>[^()]*)\)$", re.IGNORECASE | re.DOTALL)
+
+_SCALAR_WORDS = {"cast", "as", "real", "integer", "numeric", "text", "round", "abs",
+                 "coalesce", "nullif", "ifnull"}
+_FLIP = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "=": "=", "<>": "<>", "!=": "!="}
+_MERGE = {"count": "COALESCE(SUM({0}), 0)", "sum": "SUM({0})", "total": "TOTAL({0})",
+          "min": "MIN({0})", "max": "MAX({0})"}
+
+
+def partitions_path(dataset: str) -> str:
+    """Return the path of a dataset's partition files (a symlink to their current version)."""
+    return os.path.join(database_dir(), f"{dataset}_parts")
+
+
+def build_partitions(dataset: str, df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Write a dataset as one SQLite file per partition range, if it is partitioned.
+
+    Partitions are written in parallel to a new version directory published
+    with an atomic symlink swap, like the column store. Rows whose key is
+    NULL go to the first partition.
+
+    Returns:
+        Optional[Dict[str, Any]]: The manifest, or None if the dataset is not partitioned
+    """
+    info = get_dataset(dataset)
+    spec = info.get('partition')
+    if not spec:
+        return None
+
+    column = spec['column']
+    bounds = sorted(spec['bounds'])
+    edges = [None, *bounds, None]
+    staging = staging_dir(partitions_path(dataset))
+
+    def write(position: int) -> Dict[str, Any]:
+        low, high = edges[position], edges[position + 1]
+        mask = pd.Series(True, index=df.index)
+        if low is not None:
+            mask &= df[column] >= low
+        if high is not None:
+            mask &= df[column] < high
+        if position == 0:
+            mask |= df[column].isna()
+        part = df[mask]
+        filename = f"p{position:03d}.db"
+        write_table(os.path.join(staging, filename), info['table'], part, info['indexes'])
+        return {"file": filename, "low": low, "high": high, "rows": len(part)}
+
+    with metrics.timer("partition.build_seconds", dataset=dataset):
+        with ThreadPoolExecutor(max_workers=min(PARTITION_WORKERS, len(edges) - 1)) as pool:
+            partitions = list(pool.map(write, range(len(edges) - 1)))
+
+    manifest = {"dataset": dataset, "table": info['table'], "column": column, "partitions": partitions}
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    publish_version(staging, partitions_path(dataset))
+    invalidate_partitions(dataset)
+    return manifest
+
+
+_manifests: Dict[str, Optional[Dict[str, Any]]] = {}
+_manifests_lock = threading.Lock()
+
+
+def load_manifest(dataset: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached partition manifest of a dataset, or None if it has no partitions.
+
+    The manifest's "path" is the version directory it was read from, so a
+    query never mixes partition files of two builds.
+    """
+    if dataset in _manifests:
+        return _manifests[dataset]
+    manifest = None
+    if get_dataset(dataset).get('partition'):
+        directory = resolve_version(partitions_path(dataset))
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+            manifest["path"] = directory
+        except (OSError, ValueError):
+            manifest = None
+    with _manifests_lock:
+        _manifests[dataset] = manifest
+    return manifest
+
+
+def invalidate_partitions(dataset: str):
+    """Drop the cached manifest so the next query reads the partitions on disk again."""
+    with _manifests_lock:
+        _manifests.pop(dataset, None)
+
+
+def split_top_level(text: str, separator: str = ",") -> List[str]:
+    """Split on a separator outside parentheses and quotes."""
+    parts, depth, quoted, current = [], 0, None, []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if quoted:
+            if char == quoted:
+                quoted = None
+        elif char in "'\"":
+            quoted = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and text[i:i + len(separator)].lower() == separator and (
+                separator == "," or _word_boundary(text, i, len(separator))):
+            parts.append("".join(current).strip())
+            current = []
+            i += len(separator)
+            continue
+        current.append(char)
+        i += 1
+    parts.append("".join(current).strip())
+    return parts
+
+
+def _word_boundary(text: str, start: int, length: int) -> bool:
+    # Keywords may touch parentheses or quotes, e.g. "Age > 60 OR(Age < 25)"
+    before = text[start - 1] if start > 0 else " "
+    after = text[start + length] if start + length < len(text) else " "
+    return not _is_identifier_char(before) and not _is_identifier_char(after)
+
+
+def _is_identifier_char(char: str) -> bool:
+    return char.isalnum() or char in "_$"
+
+
+def has_keyword(text: str, keyword: str) -> bool:
+    """Return True if `keyword` appears as a word anywhere outside quotes, at any depth."""
+    unquoted = re.sub(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"", "''", text)
+    return re.search(rf"(?<![\w$]){re.escape(keyword)}(?![\w$])", unquoted, re.IGNORECASE) is not None
+
+
+def normalize_expr(expr: str) -> str:
+    """Normalize an SQL expression for comparison: no whitespace or quotes, lower case."""
+    return re.sub(r"\s+", "", expr).replace('"', "").lower()
+
+
+def _literal(token: str) -> Any:
+    if token.startswith("'"):
+        return token[1:-1]
+    return float(token)
+
+
+def top_level_conjuncts(where: Optional[str]) -> Optional[List[str]]:
+    """
+    Split a WHERE condition into its top-level AND terms.
+
+    The AND of a BETWEEN stays inside its term.
+
+    Returns:
+        Optional[List[str]]: The terms (empty without a condition), or None
+            when the condition has a top-level OR and is not a conjunction
+    """
+    if not where:
+        return []
+    if split_top_level(where.lower(), "or")[1:]:
+        return None
+    conjuncts = []
+    for part in split_top_level(where, "and"):
+        # Rejoin the AND that belongs to a BETWEEN
+        if conjuncts and re.search(r"\bbetween\s+\S+$", conjuncts[-1], re.IGNORECASE):
+            conjuncts[-1] = f"{conjuncts[-1]} AND {part}"
+        else:
+            conjuncts.append(part)
+    return conjuncts
+
+
+def key_range(where: Optional[str], column: str) -> Tuple[Optional[Tuple[Any, bool]], Optional[Tuple[Any, bool]]]:
+    """
+    Derive the key column's range from a WHERE clause.
+
+    Only top-level AND-ed comparisons, BETWEEN and IN on the key column
+    narrow the range; anything else leaves it open, and a WHERE with an OR
+    anywhere or a literal of another type than the key is not narrowed at all.
+
+    Returns:
+        Tuple: (lower, upper) bounds as (value, inclusive) pairs, None when unbounded
+    """
+    lower = upper = None
+    conjuncts = top_level_conjuncts(where)
+    if not conjuncts or has_keyword(where, "or"):
+        return lower, upper
+
+    def tighten(bound, value, inclusive, is_lower):
+        if bound is None:
+            return value, inclusive
+        if value == bound[0]:
+            return value, inclusive and bound[1]
+        if (value > bound[0]) == is_lower:
+            return value, inclusive
+        return bound
+
+    column = normalize_expr(column)
+    for conjunct in conjuncts:
+        conjunct = conjunct.strip()
+        while conjunct.startswith("(") and conjunct.endswith(")") and len(split_top_level(conjunct[1:-1], "or")) == 1:
+            conjunct = conjunct[1:-1].strip()
+        try:
+            match = _COMPARISON.match(conjunct)
+            if match and normalize_expr(match["column"]) == column:
+                op, value = match["op"], _literal(match.group(3))
+            elif (match := _REVERSED.match(conjunct)) and normalize_expr(match["column"]) == column:
+                op, value = _FLIP[match["op"]], _literal(match.group(1))
+            elif (match := _BETWEEN.match(conjunct)) and normalize_expr(match["column"]) == column:
+                lower = tighten(lower, _literal(match.group(2)), True, True)
+                upper = tighten(upper, _literal(match.group(3)), True, False)
+                continue
+            elif (match := _IN.match(conjunct)) and normalize_expr(match["column"]) == column:
+                values = [_literal(v.strip()) for v in match["values"].split(",")]
+                lower = tighten(lower, min(values), True, True)
+                upper = tighten(upper, max(values), True, False)
+                continue
+            else:
+                continue
+            if op in ("=", ">", ">="):
+                lower = tighten(lower, value, op != ">", True)
+            if op in ("=", "<", "<="):
+                upper = tighten(upper, value, op != "<", False)
+        except ValueError:
+            continue  # not a literal, e.g. a column or expression
+        except TypeError:
+            # Literals of different types (SQLite may coerce them); do not prune
+            return None, None
+    return lower, upper
+
+
+def prune(partitions: List[Dict[str, Any]], lower, upper) -> List[Dict[str, Any]]:
+    """Keep the partitions whose [low, high) range can hold keys within (lower, upper)."""
+    kept = []
+    for part in partitions:
+        try:
+            if upper is not None and part["low"] is not None:
+                if part["low"] > upper[0] or (part["low"] == upper[0] and not upper[1]):
+                    continue
+            if lower is not None and part["high"] is not None and part["high"] <= lower[0]:
+                continue
+        except TypeError:
+            pass  # key and literal types differ; keep the partition
+        kept.append(part)
+    return kept
+
+
+def aggregate_calls(expr: str) -> List[Tuple[int, int, str, str]]:
+    """Return (start, end, function, argument) of each aggregate call in `expr`."""
+    calls = []
+    for match in _AGGREGATE.finditer(expr):
+        depth, i = 1, match.end()
+        while i < len(expr) and depth:
+            depth += {"(": 1, ")": -1}.get(expr[i], 0)
+            i += 1
+        if depth:
+            raise ValueError("Unbalanced parentheses")
+        argument = expr[match.end():i - 1].strip()
+        if _AGGREGATE.search(argument):
+            raise ValueError("Nested aggregates")
+        calls.append((match.start(), i, match.group(1).lower(), argument))
+    return calls
+
+
+def replace_aggregates(expr: str, replace: Callable[[str, str], str]) -> str:
+    """
+    Substitute every aggregate call in an expression.
+
+    Args:
+        expr (str): Select or ORDER BY expression
+        replace: Called with (function, argument), returns the SQL replacing the call
+
+    Raises:
+        ValueError: If `expr` has no aggregates, or anything outside them other
+            than literals, operators and scalar functions
+    """
+    calls = aggregate_calls(expr)
+    if not calls:
+        raise ValueError(f"'{expr}' is not an aggregate")
+    out, position = [], 0
+    for start, end, function, argument in calls:
+        out.append(expr[position:start])
+        out.append(replace(function, argument))
+        position = end
+    out.append(expr[position:])
+    starts = [start for start, _, _, _ in calls]
+    ends = [end for _, end, _, _ in calls]
+    leftover = "".join(expr[a:b] for a, b in zip([0, *ends], [*starts, len(expr)]))
+    if set(re.findall(r"[a-z_]\w*", re.sub(r"'[^']*'", "", leftover.lower()))) - _SCALAR_WORDS:
+        raise ValueError(f"Unsupported expression '{expr}'")
+    return "".join(out)
+
+
+class SelectQuery:
+    """
+    A single-table SELECT split into its clauses.
+
+    Attributes:
+        table (str): Table as written
+        items (List[Tuple[str, str]]): (expression, output name) per select item
+        where (str): WHERE condition, or None
+        groups (List[str]): GROUP BY expressions, with select aliases resolved
+        orders (List[Tuple[str, str]]): (expression, direction or None) per ORDER BY term
+        limit (str): LIMIT count, or None
+    """
+
+    def __init__(self, match: re.Match):
+        self.table = match["table"]
+        self.items = []
+        for item in split_top_level(match["select"]):
+            aliased = _ALIAS.match(item)
+            expr, alias = (aliased["expr"], aliased["alias"].strip('"')) if aliased else (item, None)
+            self.items.append((expr.strip(), alias or expr.strip()))
+        # GROUP BY may name a select alias; the expression itself is needed
+        aliases = {normalize_expr(name): expr for expr, name in self.items if name != expr}
+        self.groups = [aliases.get(normalize_expr(g), g) for g in split_top_level(match["group"])] if match["group"] else []
+        self.orders = [_DIRECTION.match(term).groups() for term in split_top_level(match["order"])] if match["order"] else []
+        self.where = match["where"]
+        self.limit = match["limit"]
+
+    @property
+    def has_aggregates(self) -> bool:
+        return any(_AGGREGATE.search(expr) for expr, _ in self.items)
+
+    def output_name(self, expr: str) -> Optional[str]:
+        """Return the output column an ORDER BY expression names, or None."""
+        for _, name in self.items:
+            if normalize_expr(name) == normalize_expr(expr):
+                return name
+        return None
+
+
+def parse_select(sql: str, table: str) -> Optional[SelectQuery]:
+    """
+    Parse a single-table SELECT on `table` without joins, subqueries,
+    DISTINCT, HAVING, window functions or bound parameters.
+
+    Returns:
+        Optional[SelectQuery]: The parsed query, or None if it has another form
+    """
+    statement = clean_statement(sql)
+    match = _QUERY.match(statement)
+    if not match or ";" in statement or _UNSUPPORTED.search(statement):
+        return None
+    if normalize_expr(match["table"]) != normalize_expr(table):
+        return None
+    return SelectQuery(match)
+
+
+class PartitionPlan:
+    """
+    Scatter/gather plan for one query: the statement run on every kept
+    partition and the statement merging their rows in memory.
+    """
+
+    def __init__(self, partition_sql: str, merge_sql: str, where: Optional[str]):
+        self.partition_sql = partition_sql
+        self.merge_sql = merge_sql
+        self.where = where
+
+
+def plan_query(sql: str, table: str) -> Optional[PartitionPlan]:
+    """
+    Plan a query against a partitioned table, or return None if it is not
+    a form the router can answer exactly.
+    """
+    query = parse_select(sql, table)
+    if query is None:
+        return None
+    items, groups, orders = query.items, query.groups, query.orders
+    if query.has_aggregates and any(expr == "*" or expr.endswith(".*") for expr, _ in items):
+        return None
+    where = f" WHERE {query.where}" if query.where else ""
+    limit = f" LIMIT {query.limit}" if query.limit else ""
+
+    if not query.has_aggregates:
+        # Plain rows: push ORDER BY/LIMIT down, then merge-sort the partitions' rows
+        if groups or not limit:
+            return None
+        order = ""
+        if orders:
+            if not all(query.output_name(expr) for expr, _ in orders):
+                return None
+            order = " ORDER BY " + ", ".join(f"{quote(query.output_name(expr))}{d or ''}" for expr, d in orders)
+        return PartitionPlan(clean_statement(sql), f"SELECT * FROM partials{order}{limit}", query.where)
+
+    # Aggregates: partial aggregates per partition, merged per group
+    group_keys = {normalize_expr(expr): f"g{i}" for i, expr in enumerate(groups)}
+    partial_columns = [f"{expr} AS g{i}" for i, expr in enumerate(groups)]
+    merged: Dict[Tuple[str, str], str] = {}
+
+    def rewrite(expr: str) -> str:
+        key = group_keys.get(normalize_expr(expr))
+        if key:
+            return key
+        return replace_aggregates(expr, partial)
+
+    def partial(function: str, argument: str) -> str:
+        if (function, argument) in merged:
+            return merged[(function, argument)]
+        index = len(partial_columns)
+        if function == "avg":
+            partial_columns.append(f"SUM({argument}) AS p{index}")
+            partial_columns.append(f"COUNT({argument}) AS p{index + 1}")
+            expr = f"(CAST(SUM(p{index}) AS REAL) / NULLIF(SUM(p{index + 1}), 0))"
+        else:
+            partial_columns.append(f"{function.upper()}({argument}) AS p{index}")
+            expr = _MERGE[function].format(f"p{index}")
+        merged[(function, argument)] = expr
+        return expr
+
+    try:
+        select = [f"{rewrite(expr)} AS {quote(name)}" for expr, name in items]
+        order_terms = []
+        for expr, direction in orders:
+            name = query.output_name(expr)
+            order_terms.append(f"{quote(name) if name else rewrite(expr)}{direction or ''}")
+    except ValueError:
+        return None
+
+    group_by = f" GROUP BY {', '.join(expr for expr in groups)}" if groups else ""
+    partition_sql = f"SELECT {', '.join(partial_columns)} FROM {query.table}{where}{group_by}"
+    merge_group = f" GROUP BY {', '.join(group_keys.values())}" if groups else ""
+    merge_order = f" ORDER BY {', '.join(order_terms)}" if order_terms else ""
+    merge_sql = f"SELECT {', '.join(select)} FROM partials{merge_group}{merge_order}{limit}"
+    return PartitionPlan(partition_sql, merge_sql, query.where)
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _scan_pool() -> ThreadPoolExecutor:
+    """Return the partition scan pool, recreating it after a fork."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=PARTITION_WORKERS, thread_name_prefix="mediaide-partition")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _scan(path: str, sql: str) -> Tuple[List[str], List[tuple]]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    try:
+        cursor = conn.execute(sql)
+        return [d[0] for d in cursor.description], cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def route_query(dataset: str, sql: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Answer a query from the dataset's partitions.
+
+    Args:
+        dataset (str): Dataset name
+        sql (str): SELECT statement against the dataset's table
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: Result rows, or None when the dataset is
+            not partitioned or the query must run against the full table
+    """
+    manifest = load_manifest(dataset)
+    if manifest is None:
+        return None
+    plan = plan_query(sql, manifest["table"])
+    if plan is None:
+        metrics.inc("partition.fallbacks", dataset=dataset)
+        return None
+
+    # A fully pruned query still scans one partition so the result has its columns
+    kept = prune(manifest["partitions"], *key_range(plan.where, manifest["column"])) or manifest["partitions"][:1]
+    metrics.inc("partition.queries", dataset=dataset)
+    metrics.inc("partition.scanned", len(kept), dataset=dataset)
+    metrics.inc("partition.pruned", len(manifest["partitions"]) - len(kept), dataset=dataset)
+
+    # A version deleted by a rebuild fails to open and falls back to the full table
+    directory = manifest["path"]
+    try:
+        with metrics.timer("partition.query_seconds", dataset=dataset):
+            results = list(_scan_pool().map(
+                lambda part: _scan(os.path.join(directory, part["file"]), plan.partition_sql), kept
+            ))
+            merge = sqlite3.connect(":memory:")
+            try:
+                columns = results[0][0]
+                merge.execute(f"CREATE TABLE partials ({', '.join(quote(c) for c in columns)})")
+                placeholders = ", ".join("?" for _ in columns)
+                for _, rows in results:
+                    merge.executemany(f"INSERT INTO partials VALUES ({placeholders})", rows)
+                cursor = merge.execute(plan.merge_sql)
+                names = [d[0] for d in cursor.description]
+                return [dict(zip(names, row)) for row in cursor.fetchall()]
+            finally:
+                merge.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Partition routing failed for '{dataset}', using the full table: {e}")
+        metrics.inc("partition.fallbacks", dataset=dataset)
+        return None
+
@@ -0,0 +1,352 @@
+"""
+MediAide speculative prefetch
+Users drill down after a first answer: "average glucose" is followed by
+"by age group", then "for those with Outcome = 1". After each database
+answer, the aggregates of its SQL are precomputed in the background for the
+likely follow-ups and kept as small speculative views in an in-memory SQLite
+database, so the next query is often answered without touching the dataset.
+
+The follow-ups of an aggregate query keep its filter and cross its groups
+with the dataset's target and, one at a time, with the dimensions of the
+registry's views. Each is stored like a materialized view of the filtered
+rows (row count and SUM, COUNT, MIN, MAX per measure). A later query whose
+WHERE repeats the filter's conditions, plus any conditions on the view's
+dimensions, is rewritten against the smallest covering view, as in
+src/main/views.py. Conditions are top-level AND terms; a WHERE with a
+top-level OR is neither prefetched nor answered.
+
+Prefetching only uses idle capacity, on one background thread:
+- it starts when no foreground database request is running, and a request
+  starting cancels it mid-statement (SQLite progress handler)
+- each aggregate may use MEDIAIDE_PREFETCH_QUERY_MS of CPU time and each
+  answer's follow-ups MEDIAIDE_PREFETCH_BUDGET_MS in total; a statement
+  over budget is interrupted
+- only the newest answer's follow-ups are pending; older ones are dropped
+- views with more than MEDIAIDE_PREFETCH_MAX_ROWS rows are not kept, and
+  the least recently used views beyond MEDIAIDE_PREFETCH_MAX_VIEWS are evicted
+A dataset's views are dropped when it is reloaded.
+
+Environment:
+    MEDIAIDE_PREFETCH: set to 0 to disable speculative prefetch
+    MEDIAIDE_PREFETCH_FOLLOW_UPS: follow-up views computed per answer (default 4)
+    MEDIAIDE_PREFETCH_QUERY_MS: CPU milliseconds per follow-up aggregate (default 200)
+    MEDIAIDE_PREFETCH_BUDGET_MS: CPU milliseconds per answer (default 500)
+    MEDIAIDE_PREFETCH_MAX_ROWS: rows a speculative view may have (default 5000)
+    MEDIAIDE_PREFETCH_MAX_VIEWS: speculative views kept per process (default 32)
+"""
+
+import contextlib
+import copy
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.main.datasets import database_dir, get_dataset
+from src.main.metrics import metrics
+from src.main.partitions import aggregate_calls, normalize_expr, parse_select, top_level_conjuncts
+from src.main.sql_guard import quote
+from src.main.views import aggregate_select, filter_words, rewrite_for_view, view_table
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("MEDIAIDE_PREFETCH", "1").lower() not in ("0", "false", "no")
+PREFETCH_FOLLOW_UPS = int(os.getenv("MEDIAIDE_PREFETCH_FOLLOW_UPS", "4"))
+PREFETCH_QUERY_MS = float(os.getenv("MEDIAIDE_PREFETCH_QUERY_MS", "200"))
+PREFETCH_BUDGET_MS = float(os.getenv("MEDIAIDE_PREFETCH_BUDGET_MS", "500"))
+PREFETCH_MAX_ROWS = int(os.getenv("MEDIAIDE_PREFETCH_MAX_ROWS", "5000"))
+PREFETCH_MAX_VIEWS = int(os.getenv("MEDIAIDE_PREFETCH_MAX_VIEWS", "32"))
+
+# SQLite VM instructions between budget and cancellation checks
+_CHECK_EVERY = 10000
+_IDENTIFIER = re.compile(r'^"?\w+"?$')
+
+
+def conditions(where: Optional[str]) -> Optional[List[str]]:
+    """Split a WHERE condition into its normalized top-level AND terms; None if it has a top-level OR."""
+    terms = top_level_conjuncts(where)
+    return None if terms is None else [normalize_expr(term) for term in terms]
+
+
+class PrefetchCancelled(Exception):
+    """Raised when a speculative aggregate is interrupted for a foreground request or its budget."""
+
+
+def plan_follow_ups(dataset: str, sql: str) -> List[Dict[str, Any]]:
+    """
+    Return the speculative views covering likely follow-ups of a query.
+
+    Args:
+        dataset (str): Dataset name
+        sql (str): The SQL an answer was computed with
+
+    Returns:
+        List[Dict[str, Any]]: Views ({'name', 'dimensions', 'measures',
+            'where'}) in the order to compute them; empty unless `sql` is an
+            aggregate query on plain columns
+    """
+    info = get_dataset(dataset)
+    query = parse_select(sql, info['table'])
+    columns = {column.lower(): column for column in info['dtypes']}
+    if query is None or not query.has_aggregates or not columns:
+        return []
+
+    measures = []
+    try:
+        for expr, _ in query.items:
+            for _, _, _, argument in aggregate_calls(expr):
+                key = normalize_expr(argument)
+                if key == "*":
+                    continue
+                if key not in columns:
+                    return []
+                if columns[key] not in measures:
+                    measures.append(columns[key])
+    except ValueError:
+        return []
+
+    # Every follow-up keeps the answer's groups and its filter
+    base: Dict[str, str] = {}
+    for position, expr in enumerate(query.groups):
+        key = normalize_expr(expr)
+        if key in columns:
+            base[columns[key]] = quote(columns[key])
+        elif _IDENTIFIER.match(expr) or not expr.strip():
+            return []
+        else:
+            base[f"g{position}"] = expr
+    if query.where and (filter_words(query.where) - set(columns) or conditions(query.where) is None):
+        return []
+
+    present = {normalize_expr(expr) for expr in base.values()}
+    candidates: Dict[str, str] = {}
+    for view in info['views']:
+        for name, expr in view['dimensions'].items():
+            key = normalize_expr(expr)
+            if key not in present and key not in {normalize_expr(e) for e in candidates.values()}:
+                candidates[name] = expr
+
+    target = info['target']
+    outcome = {} if normalize_expr(target) in present else {target: quote(target)}
+    candidates.pop(target, None)
+    plans = [{**base, **outcome}]
+    for name, expr in list(candidates.items())[:max(0, PREFETCH_FOLLOW_UPS - 1)]:
+        plans.append({**base, **outcome, name: expr})
+
+    views = []
+    for dimensions in plans:
+        signature = repr((dataset, sorted((n, normalize_expr(e)) for n, e in dimensions.items()),
+                          measures, sorted(conditions(query.where))))
+        name = f"pf_{hashlib.sha1(signature.encode()).hexdigest()[:16]}"
+        views.append({"name": name, "dimensions": dimensions, "measures": list(measures), "where": query.where})
+    return views
+
+
+class Prefetcher:
+    """
+    Background computation and in-memory store of speculative views.
+
+    All methods are thread-safe; one daemon thread does the computing.
+    """
+
+    def __init__(self):
+        self._store = sqlite3.connect(":memory:", check_same_thread=False)
+        self._lock = threading.Lock()
+        self._views: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._epochs: Dict[str, int] = {}
+        self._condition = threading.Condition()
+        self._pending: Optional[Tuple[str, str]] = None
+        self._foreground = 0
+        self._generation = 0
+        self._working = False
+        self._thread: Optional[threading.Thread] = None
+
+    # Foreground requests
+
+    @contextlib.contextmanager
+    def foreground(self) -> Iterator[None]:
+        """Mark a foreground database request; running prefetches are cancelled and new ones wait."""
+        with self._condition:
+            self._foreground += 1
+            self._generation += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._foreground -= 1
+                self._condition.notify_all()
+
+    def schedule(self, dataset: str, sql: str):
+        """Queue the follow-ups of an answer's SQL, replacing any not yet started."""
+        if not PREFETCH_ENABLED or not sql:
+            return
+        with self._condition:
+            if self._pending is not None:
+                metrics.inc("prefetch.superseded", dataset=self._pending[0])
+            self._pending = (dataset, sql)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mediaide-prefetch", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until nothing is pending or running; returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending is None and not self._working, timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None and not self._foreground)
+                (dataset, sql), self._pending = self._pending, None
+                generation = self._generation
+                self._working = True
+            try:
+                self._prefetch(dataset, sql, generation)
+            except Exception as e:
+                logger.warning(f"⚠️ Prefetch for '{dataset}' failed: {e}")
+            finally:
+                with self._condition:
+                    self._working = False
+                    self._condition.notify_all()
+
+    # Computing
+
+    def _prefetch(self, dataset: str, sql: str, generation: int):
+        budget_end = time.thread_time() + PREFETCH_BUDGET_MS / 1000
+        with self._lock:
+            epoch = self._epochs.get(dataset, 0)
+        for view in plan_follow_ups(dataset, sql):
+            with self._lock:
+                if view['name'] in self._views:
+                    self._views.move_to_end(view['name'])
+                    continue
+            if time.thread_time() >= budget_end:
+                metrics.inc("prefetch.budget_exhausted", dataset=dataset)
+                return
+            try:
+                with metrics.timer("prefetch.seconds", dataset=dataset):
+                    columns, rows = self._aggregate(dataset, view, generation, budget_end)
+            except PrefetchCancelled as e:
+                metrics.inc("prefetch.cancelled", dataset=dataset, reason=str(e))
+                if str(e) == "foreground":
+                    return
+                continue
+            if len(rows) > PREFETCH_MAX_ROWS:
+                metrics.inc("prefetch.too_large", dataset=dataset)
+                continue
+            self._put(dataset, view, columns, rows, epoch)
+
+    def _aggregate(self, dataset: str, view: Dict[str, Any], generation: int,
+                   budget_end: float) -> Tuple[List[str], List[tuple]]:
+        """Compute a view's rows from the dataset, interrupting it when cancelled or over budget."""
+        info = get_dataset(dataset)
+        deadline = min(budget_end, time.thread_time() + PREFETCH_QUERY_MS / 1000)
+        reason = []
+
+        def check() -> int:
+            if self._generation != generation:
+                reason.append("foreground")
+            elif time.thread_time() > deadline:
+                reason.append("budget")
+            return 1 if reason else 0
+
+        source = quote(info['table'])
+        if view['where']:
+            source = f"(SELECT * FROM {source} WHERE {view['where']})"
+        path = os.path.join(database_dir(), info['db'])
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            conn.set_progress_handler(check, _CHECK_EVERY)
+            cursor = conn.execute(aggregate_select(view, source))
+            rows = cursor.fetchmany(PREFETCH_MAX_ROWS + 1)
+            return [d[0] for d in cursor.description], rows
+        except sqlite3.OperationalError:
+            if reason:
+                raise PrefetchCancelled(reason[0])
+            raise
+        finally:
+            conn.close()
+
+    def _put(self, dataset: str, view: Dict[str, Any], columns: List[str], rows: List[tuple], epoch: int):
+        table = quote(view_table(view))
+        with self._lock:
+            # Computed from data that has since been reloaded
+            if self._epochs.get(dataset, 0) != epoch:
+                return
+            self._store.execute(f"DROP TABLE IF EXISTS {table}")
+            self._store.execute(f"CREATE TABLE {table} ({', '.join(quote(c) for c in columns)})")
+            self._store.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})", rows)
+            self._store.commit()
+            self._views[view['name']] = {"dataset": dataset, "view": view, "rows": len(rows)}
+            while len(self._views) > PREFETCH_MAX_VIEWS:
+                _, evicted = self._views.popitem(last=False)
+                self._store.execute(f"DROP TABLE IF EXISTS {quote(view_table(evicted['view']))}")
+        metrics.inc("prefetch.views", dataset=dataset)
+
+    # Serving
+
+    def answer(self, dataset: str, sql: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Answer an aggregate query from a speculative view.
+
+        Args:
+            dataset (str): Dataset name
+            sql (str): SELECT statement against the dataset's table
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The result rows, or None when no
+                prefetched view answers the query exactly
+        """
+        if not self._views:
+            return None
+        query = parse_select(sql, get_dataset(dataset)['table'])
+        if query is None or not query.has_aggregates or any(expr == "*" for expr, _ in query.items):
+            return None
+        # Only a conjunction can be split into a view's filter and the remaining terms
+        parts = top_level_conjuncts(query.where)
+        if parts is None:
+            metrics.inc("prefetch.misses", dataset=dataset)
+            return None
+        terms = [normalize_expr(part) for part in parts]
+        with self._lock:
+            stored = sorted((entry for entry in self._views.values() if entry['dataset'] == dataset),
+                            key=lambda entry: entry['rows'])
+            for entry in stored:
+                # The view holds only rows passing its filter: the query must repeat it
+                built_in = conditions(entry['view']['where'])
+                if built_in is None or any(term not in terms for term in built_in):
+                    continue
+                remaining = copy.copy(query)
+                extra = [part for part, key in zip(parts, terms) if key not in built_in]
+                remaining.where = " AND ".join(extra) or None
+                rewritten = rewrite_for_view(remaining, entry['view'])
+                if rewritten is None:
+                    continue
+                try:
+                    cursor = self._store.execute(rewritten)
+                except sqlite3.Error:
+                    continue
+                columns = [d[0] for d in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                self._views.move_to_end(entry['view']['name'])
+                metrics.inc("prefetch.hits", dataset=dataset)
+                return rows
+        metrics.inc("prefetch.misses", dataset=dataset)
+        return None
+
+    def invalidate(self, dataset: str):
+        """Drop a dataset's speculative views, including any being computed from the old data."""
+        with self._lock:
+            self._epochs[dataset] = self._epochs.get(dataset, 0) + 1
+            for name in [name for name, entry in self._views.items() if entry['dataset'] == dataset]:
+                entry = self._views.pop(name)
+                self._store.execute(f"DROP TABLE IF EXISTS {quote(view_table(entry['view']))}")
+
+
+prefetcher = Prefetcher()
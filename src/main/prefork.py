@@ -0,0 +1,278 @@
+"""
+MediAide pre-fork deployment
+The parent process builds the databases, column stores, risk models and
+cohort indexes once, imports the heavy libraries, opens the listening socket
+and then forks worker processes running the HTTP API. Workers inherit the
+parent's memory copy-on-write and memory-map the same on-disk stores, share
+a SQLite response cache, and are restarted by the supervisor when they die
+or their private memory grows past a limit.
+
+Run from the project root (POSIX only):
+    python src/main/prefork.py --processes 4 --port 8080 --max-worker-mb 1024
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from aiohttp import web
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.main.app import MediAide
+from src.main.cohort import get_cohort_index
+from src.main.datasets import DATASETS
+from src.main.metrics import metrics, export_metrics
+from src.main.reload import ensure_dataset
+from src.main.risk import get_risk_model
+from src.main.server import create_app
+from src.main.shared_cache import SharedCache, shared_cache_path
+from src.main.store import open_store
+
+logger = logging.getLogger(__name__)
+
+
+def build_shared_data():
+    """
+    Build every database and read-only structure once, before forking.
+
+    The column stores and cohort matrices are memory-mapped, so after the
+    fork all workers read the same page-cache pages.
+    """
+    logger.info("Building shared data in the parent process...")
+    for dataset in DATASETS:
+        ensure_dataset(dataset)
+        # Touch every column so its pages are in the page cache before the fork
+        store = open_store(dataset)
+        for column in store.columns:
+            store[column].sum()
+        get_risk_model(dataset)
+        get_cohort_index(dataset)
+    # Free garbage while its threads still exist: a multithreaded zstd compressor
+    # left from publishing a snapshot would otherwise be freed by the first GC in
+    # each worker and wait forever for its pool threads. Freezing what remains
+    # keeps the workers' collections from touching (and copying) the shared pages.
+    gc.collect()
+    gc.freeze()
+    logger.info("✅ Shared data ready")
+
+
+def private_memory_mb(pid: int) -> float:
+    """
+    Return a process's private (non-shared) resident memory in MB.
+
+    Copy-on-write pages still shared with the parent are not counted, so this
+    measures real per-worker growth. Falls back to RSS when smaps_rollup is
+    unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            private_kb = sum(
+                int(line.split()[1]) for line in f
+                if line.startswith(("Private_Clean:", "Private_Dirty:"))
+            )
+        return private_kb / 1024
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return 0.0
+
+
+def create_listener(host: str, port: int, backlog: int = 512) -> socket.socket:
+    """Open the listening socket shared by all workers."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def run_worker(sock: socket.socket, args: argparse.Namespace):
+    """
+    Serve the HTTP API on the inherited socket until SIGTERM.
+
+    Runs in the forked child and never returns.
+    """
+    # The supervisor's SIGTERM handler is inherited; until the event loop installs
+    # its own, SIGTERM (e.g. during initialize()) must end the worker
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    metrics.reset()
+
+    mediaide = MediAide()
+    mediaide.initialize(build_databases=False)
+    cache = SharedCache(shared_cache_path("responses"), name="response_cache",
+                        max_entries=args.cache_entries, default_ttl=args.cache_ttl)
+    app = create_app(mediaide, max_workers=args.threads, max_queue=args.max_queue,
+                     request_timeout=args.timeout, cache=cache)
+
+    async def serve():
+        runner = web.AppRunner(app, handle_signals=False)
+        await runner.setup()
+        await web.SockSite(runner, sock).start()
+
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        logger.info(f"👷 Worker {os.getpid()} serving")
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), args.export_interval)
+            except asyncio.TimeoutError:
+                export_metrics()
+        await runner.cleanup()
+
+    code = 0
+    try:
+        asyncio.run(serve())
+    except Exception as e:
+        logger.error(f"❌ Worker {os.getpid()} crashed: {e}")
+        code = 1
+    finally:
+        export_metrics()
+    os._exit(code)
+
+
+class Supervisor:
+    """
+    Forks and watches the worker processes.
+
+    Dead workers are replaced; workers whose private memory exceeds
+    `max_worker_mb` are asked to stop and replaced once they exit. The
+    supervisor's own metrics (spawns, crashes, restarts, worker memory) are
+    exported every `export_interval` seconds like a worker's.
+    """
+
+    def __init__(self, sock: socket.socket, args: argparse.Namespace):
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, float] = {}
+        self.retiring: Dict[int, float] = {}
+        self.stopping = False
+        self.exported = 0.0
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.sock, self.args)
+        self.workers[pid] = time.time()
+        metrics.inc("prefork.spawned")
+        logger.info(f"Started worker {pid}")
+
+    def reap(self):
+        """Collect exited workers and replace them."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            retired = self.retiring.pop(pid, None) is not None
+            self.workers.pop(pid, None)
+            metrics.remove_gauge("prefork.worker_private_mb", pid=pid)
+            if not retired and not self.stopping:
+                metrics.inc("prefork.crashed")
+                logger.warning(f"⚠️ Worker {pid} exited unexpectedly (status {status})")
+            if not self.stopping:
+                self.spawn()
+
+    def check_memory(self):
+        """Retire workers that grew past the memory limit."""
+        limit = self.args.max_worker_mb
+        if not limit:
+            return
+        for pid in list(self.workers):
+            if pid in self.retiring:
+                if time.time() - self.retiring[pid] > self.args.grace:
+                    os.kill(pid, signal.SIGKILL)
+                continue
+            usage = private_memory_mb(pid)
+            metrics.set_gauge("prefork.worker_private_mb", usage, pid=pid)
+            if usage > limit:
+                logger.warning(f"♻️ Worker {pid} uses {usage:.0f} MB (> {limit} MB); restarting")
+                metrics.inc("prefork.memory_restarts")
+                self.retiring[pid] = time.time()
+                os.kill(pid, signal.SIGTERM)
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def export(self, force: bool = False):
+        """Export the supervisor's metrics when `export_interval` has passed (or `force`)."""
+        if not force and time.time() - self.exported < self.args.export_interval:
+            return
+        try:
+            export_metrics()
+        except OSError as e:
+            logger.warning(f"⚠️ Could not export supervisor metrics: {e}")
+        self.exported = time.time()
+
+    def run(self):
+        """Spawn the workers and supervise them until SIGTERM/SIGINT."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.args.processes):
+            self.spawn()
+
+        while not self.stopping:
+            time.sleep(self.args.check_interval)
+            self.reap()
+            self.check_memory()
+            self.export()
+
+        logger.info("Stopping workers...")
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.time() + self.args.grace
+        while self.workers and time.time() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.workers:
+            os.kill(pid, signal.SIGKILL)
+        self.export(force=True)
+
+
+def main(argv: Optional[list] = None):
+    """Build shared data, fork the workers and supervise them."""
+    parser = argparse.ArgumentParser(description="MediAide pre-fork HTTP API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2, help="Worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Blocking calls per worker")
+    parser.add_argument("--max-queue", type=int, default=32, help="Queued requests per worker")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max-worker-mb", type=float, default=1024,
+                        help="Restart a worker when its private memory exceeds this (0 disables)")
+    parser.add_argument("--check-interval", type=float, default=5.0, help="Supervisor poll interval")
+    parser.add_argument("--grace", type=float, default=30.0, help="Seconds a stopping worker may drain")
+    parser.add_argument("--cache-entries", type=int, default=10000, help="Shared response cache size")
+    parser.add_argument("--cache-ttl", type=float, default=3600.0, help="Shared response cache TTL in seconds")
+    parser.add_argument("--export-interval", type=float, default=30.0, help="Seconds between metrics exports")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        raise SystemExit("Pre-fork mode requires a POSIX system")
+
+    os.chdir(project_root)
+    build_shared_data()
+    sock = create_listener(args.host, args.port)
+    logger.info(f"🚀 Listening on {args.host}:{args.port} with {args.processes} workers")
+    Supervisor(sock, args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""
+MediAide profiling hooks
+Wraps the hot paths (MediAide.query_dataset, search_web,
+get_comprehensive_answer and initialize, the dataset database and agent
+builders, dataset rebuilds) with a profiler when profiling is on, and writes
+the results to MEDIAIDE_PROFILE_DIR for offline analysis:
+
+- sample: a wall-clock sampling profiler reading the calling thread's stack
+  every MEDIAIDE_PROFILE_INTERVAL ms. Time spent waiting on the network or
+  on locks shows up as well as CPU time. Writes collapsed stacks
+  (`<name>.folded`, one "frame;frame;frame count" line per stack, for
+  flamegraph.pl, speedscope or inferno) and a self-contained flamegraph
+  (`<name>.svg`).
+- cprofile: the deterministic cProfile profiler. Writes `<name>.prof` (for
+  pstats, snakeviz or flameprof) and the top functions by cumulative time
+  (`<name>.txt`).
+
+With MEDIAIDE_PROFILE_MEMORY=1 both also take tracemalloc snapshots before
+and after the call and write the second one (`<name>.alloc`, load with
+tracemalloc.Snapshot.load). Diffing them costs about a second per call in a
+warm process, hence off by default. tracemalloc traces the whole process,
+so calls profiled concurrently see each other's allocations, and it keeps
+tracing once a profile started it: stopping it while other threads
+(prefetching, the dataset watcher) allocate can crash the interpreter
+before Python 3.12.9.
+
+Every profile gets a `<name>.json` summary with the time per layer
+(MediAide, LangChain, SQLAlchemy, pandas, network, ...) attributed from the
+samples' innermost frames and, with allocation snapshots, the sites that
+allocated the most during the call.
+
+Profiling is switched on for every call with MEDIAIDE_PROFILE or
+set_profile_mode(), or for one request with `with profiling("sample"):`
+(the HTTP API's `X-MediAide-Profile` header). Only the outermost profiled
+call of a request writes a profile; nested ones are part of its stacks.
+Profiled responses list their files in metadata["profile"].
+
+Environment:
+    MEDIAIDE_PROFILE: off (default), sample or cprofile
+    MEDIAIDE_PROFILE_DIR: output directory (default src/database/profiles)
+    MEDIAIDE_PROFILE_INTERVAL: sampling interval in milliseconds (default 5)
+    MEDIAIDE_PROFILE_MEMORY: set to 1 to also write allocation snapshots
+    MEDIAIDE_PROFILE_MIN_MS: only keep profiles of calls at least this slow (default 0)
+"""
+
+import collections
+import contextlib
+import contextvars
+import cProfile
+import functools
+import html
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.main.context import current_request
+from src.main.datasets import database_dir
+from src.main.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+SAMPLE = "sample"
+CPROFILE = "cprofile"
+MODES = (OFF, SAMPLE, CPROFILE)
+
+PROFILE_INTERVAL = float(os.getenv("MEDIAIDE_PROFILE_INTERVAL", "5")) / 1000
+PROFILE_MEMORY = os.getenv("MEDIAIDE_PROFILE_MEMORY", "0").lower() in ("1", "true", "yes")
+PROFILE_MIN_MS = float(os.getenv("MEDIAIDE_PROFILE_MIN_MS", "0"))
+TOP_ALLOCATIONS = 15
+TOP_FUNCTIONS = 30
+
+# First matching package of a sample's innermost frames names its layer
+_LAYERS = [
+    ("network", ("/openai/", "/httpx/", "/httpcore/", "/anyio/", "/requests/", "/urllib3/",
+                 "/serpapi/", "/ssl.py", "/socket.py", "/selectors.py")),
+    ("pandas", ("/pandas/", "/numpy/", "/pyarrow/")),
+    ("sqlalchemy", ("/sqlalchemy/", "/sqlite3/")),
+    ("langchain", ("/langchain", "/agents/", "/pydantic", "/tiktoken/")),
+    ("mediaide", ("/src/main/", "/src/tool/")),
+]
+
+_mode = os.getenv("MEDIAIDE_PROFILE", OFF).lower()
+_request_mode: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("mediaide_profile", default=None)
+_active: contextvars.ContextVar[bool] = contextvars.ContextVar("mediaide_profiling_active", default=False)
+
+_tracemalloc_lock = threading.Lock()
+
+
+def _check_mode(mode: str) -> str:
+    mode = (mode or OFF).lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'. Use one of: {', '.join(MODES)}")
+    return mode
+
+
+def set_profile_mode(mode: str):
+    """Set the process-wide profile mode: off, sample or cprofile."""
+    global _mode
+    _mode = _check_mode(mode)
+
+
+def profile_mode() -> str:
+    """Return the profile mode of the current request, else the process-wide one."""
+    return _request_mode.get() or _mode
+
+
+@contextlib.contextmanager
+def profiling(mode: Optional[str] = SAMPLE) -> Iterator[None]:
+    """
+    Profile the hot-path calls made while the block is active.
+
+    Args:
+        mode (str): sample, cprofile or off; None keeps the enclosing mode
+    """
+    if mode is None:
+        yield
+        return
+    token = _request_mode.set(_check_mode(mode))
+    try:
+        yield
+    finally:
+        _request_mode.reset(token)
+
+
+def profile_dir() -> str:
+    """Return the profile directory (MEDIAIDE_PROFILE_DIR, default src/database/profiles)."""
+    return os.getenv("MEDIAIDE_PROFILE_DIR", os.path.join(database_dir(), "profiles"))
+
+
+def frame_label(code) -> str:
+    """Return a frame's name in the collapsed stacks: function (file:line)."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def frame_layer(filenames: List[str]) -> str:
+    """Return the layer of a stack (file names innermost first) from its first frame in a known package."""
+    for filename in filenames:
+        filename = filename.replace("\\", "/")
+        for layer, markers in _LAYERS:
+            if any(marker in filename for marker in markers):
+                return layer
+    return "other"
+
+
+class StackSampler:
+    """
+    Sample one thread's Python stack at a fixed interval from a helper thread.
+
+    Args:
+        thread_id (int): Thread to sample, e.g. threading.get_ident()
+        interval (float): Seconds between samples
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: collections.Counter = collections.Counter()
+        self.layers: collections.Counter = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mediaide-profiler", daemon=True)
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels, filenames = [], []
+            while frame is not None:
+                labels.append(frame_label(frame.f_code))
+                filenames.append(frame.f_code.co_filename)
+                frame = frame.f_back
+            if not labels:
+                continue
+            # Collapsed stacks list the root first
+            self.stacks[";".join(reversed(labels))] += 1
+            self.layers[frame_layer(filenames)] += 1
+
+    def collapsed(self) -> str:
+        """Return the samples as collapsed stacks, one "root;...;leaf count" line each."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def flamegraph_svg(stacks: Dict[str, int], title: str, width: int = 1200, row: int = 16) -> str:
+    """
+    Render collapsed stacks as a standalone SVG flamegraph (root at the bottom).
+
+    Args:
+        stacks (Dict[str, int]): Sample counts per "root;...;leaf" stack
+        title (str): Heading of the graph
+        width (int): Image width in pixels
+        row (int): Height of one frame in pixels
+
+    Returns:
+        str: The SVG document
+    """
+    root: Dict[str, Any] = {"count": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = root
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"count": 0, "children": {}})
+            node["count"] += count
+
+    def depth(node) -> int:
+        return 1 + max((depth(child) for child in node["children"].values()), default=0)
+
+    total = max(root["count"], 1)
+    height = (depth(root) + 2) * row
+    scale = (width - 20) / total
+    rects: List[str] = []
+
+    def draw(node, name: str, x: float, level: int):
+        w = node["count"] * scale
+        if w < 0.5:
+            return
+        y = height - (level + 1) * row
+        hue = zlib.crc32(name.encode()) % 50
+        label = html.escape(name)
+        share = f"{node['count']} samples, {100 * node['count'] / total:.1f}%"
+        text = html.escape(name[:int(w / 7)]) if w > 30 else ""
+        rects.append(
+            f'<g><title>{label} ({share})</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue},90%,60%)"/>'
+            f'<text x="{x + 3:.1f}" y="{y + row - 4}">{text}</text></g>'
+        )
+        for child_name, child in sorted(node["children"].items()):
+            draw(child, child_name, x, level + 1)
+            x += child["count"] * scale
+
+    x = 10.0
+    for name, child in sorted(root["children"].items()):
+        draw(child, name, x, 0)
+        x += child["count"] * scale
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<rect width="100%" height="100%" fill="#fff"/>'
+        f'<text x="10" y="{row}" font-size="13">{html.escape(title)} ({root["count"]} samples)</text>'
+        + "".join(rects) + "</svg>\n"
+    )
+
+
+def _allocation_snapshot() -> tracemalloc.Snapshot:
+    """Return the current allocations, starting tracemalloc (for good) on first use."""
+    with _tracemalloc_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    return tracemalloc.take_snapshot()
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, baseline: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+    """Return the sites that allocated the most memory between two snapshots."""
+    # Filtering the stats is much cheaper than filtering the snapshots' traces
+    ignored = (tracemalloc.__file__, __file__)
+    stats = snapshot.compare_to(baseline, "lineno")
+    rows = sorted(((stat.traceback[0], stat.size_diff, stat.count_diff) for stat in stats
+                   if stat.traceback[0].filename not in ignored),
+                  key=lambda row: row[1], reverse=True)[:TOP_ALLOCATIONS]
+    return [{"site": f"{frame.filename}:{frame.lineno}", "bytes": size, "blocks": count}
+            for frame, size, count in rows if size > 0]
+
+
+class Profile:
+    """
+    One profiled call: starts the profilers and writes their output files.
+
+    Args:
+        name (str): What was called, e.g. 'query_dataset'
+        mode (str): sample or cprofile
+    """
+
+    def __init__(self, name: str, mode: str):
+        self.name = name
+        self.mode = mode
+        self.sampler: Optional[StackSampler] = None
+        self.profiler: Optional[cProfile.Profile] = None
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.allocations: Optional[tracemalloc.Snapshot] = None
+        self.seconds = 0.0
+
+    def start(self):
+        if PROFILE_MEMORY:
+            self.baseline = _allocation_snapshot()
+        if self.mode == SAMPLE:
+            self.sampler = StackSampler(threading.get_ident())
+            self.sampler.start()
+        else:
+            profiler = cProfile.Profile()
+            # Raises ValueError on Python 3.12+ while another profiler is active
+            profiler.enable()
+            self.profiler = profiler
+        self._started = time.perf_counter()
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._started
+        if self.sampler is not None:
+            self.sampler.stop()
+        if self.profiler is not None:
+            self.profiler.disable()
+        if PROFILE_MEMORY:
+            self.allocations = _allocation_snapshot()
+
+    def write(self, directory: Optional[str] = None) -> Dict[str, str]:
+        """
+        Write the profile's files to `directory` (default profile_dir()).
+
+        Returns:
+            Dict[str, str]: Path per output kind (folded, svg, prof, txt, alloc, summary)
+        """
+        directory = directory or profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        request = current_request()
+        request_id = request.request_id if request is not None else uuid.uuid4().hex[:12]
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", self.name)
+        base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{request_id}")
+        files: Dict[str, str] = {}
+        summary: Dict[str, Any] = {
+            "name": self.name,
+            "mode": self.mode,
+            "request_id": request_id,
+            "seconds": self.seconds,
+            "pid": os.getpid(),
+        }
+
+        if self.sampler is not None:
+            samples = self.sampler.samples
+            summary["samples"] = samples
+            summary["interval_ms"] = self.sampler.interval * 1000
+            summary["layers"] = {layer: count / samples for layer, count in self.sampler.layers.most_common()} if samples else {}
+            files["folded"] = f"{base}.folded"
+            with open(files["folded"], "w") as f:
+                f.write(self.sampler.collapsed())
+            files["svg"] = f"{base}.svg"
+            with open(files["svg"], "w") as f:
+                f.write(flamegraph_svg(self.sampler.stacks, f"{self.name} {request_id}, {self.seconds * 1000:.0f} ms"))
+
+        if self.profiler is not None:
+            files["prof"] = f"{base}.prof"
+            self.profiler.dump_stats(files["prof"])
+            report = io.StringIO()
+            stats = pstats.Stats(self.profiler, stream=report)
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            files["txt"] = f"{base}.txt"
+            with open(files["txt"], "w") as f:
+                f.write(report.getvalue())
+            summary["function_calls"] = stats.total_calls
+
+        if self.allocations is not None:
+            files["alloc"] = f"{base}.alloc"
+            self.allocations.dump(files["alloc"])
+            summary["top_allocations"] = _top_allocations(self.allocations, self.baseline)
+
+        files["summary"] = f"{base}.json"
+        summary["files"] = dict(files)
+        with open(files["summary"], "w") as f:
+            json.dump(summary, f, indent=2)
+        return files
+
+
+def profiled(name):
+    """
+    Decorator profiling a hot-path call when profiling is on.
+
+    Only the outermost profiled call of a request is profiled. When the call
+    returns a response dict, the written files are added to its
+    metadata["profile"]. A call whose profiler cannot start (e.g. another
+    profiling tool is active) runs unprofiled.
+
+    Args:
+        name: Profile name, or a function of the call's arguments returning it
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            mode = profile_mode()
+            if mode == OFF or _active.get():
+                return func(*args, **kwargs)
+
+            label = name(*args, **kwargs) if callable(name) else name
+            profile = Profile(label, mode)
+            token = _active.set(True)
+            try:
+                profile.start()
+            except Exception as e:
+                _active.reset(token)
+                metrics.inc("profiling.errors", call=label, mode=mode)
+                logger.warning(f"⚠️ Could not profile {label}, running it unprofiled: {e}")
+                return func(*args, **kwargs)
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profile.stop()
+                _active.reset(token)
+                metrics.inc("profiling.profiles", call=label, mode=mode)
+
+            if profile.seconds * 1000 < PROFILE_MIN_MS:
+                return result
+            try:
+                files = profile.write()
+                logger.info(f"🔬 Profiled {label} ({profile.seconds * 1000:.0f} ms): {files['summary']}")
+            except OSError as e:
+                logger.warning(f"⚠️ Could not write the profile of {label}: {e}")
+                return result
+            if isinstance(result, dict):
+                result.setdefault("metadata", {})["profile"] = {"mode": mode, **files}
+            return result
+        return wrapper
+    return decorator
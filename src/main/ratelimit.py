@@ -0,0 +1,362 @@
+"""
+MediAide provider rate limiting
+Every call to Azure OpenAI (settings.llm and the Agents SDK client) and to
+SerpAPI first takes a token from its provider's bucket, shared by all
+threads and tasks of the process. Buckets refill at a steady rate up to a
+burst size, so a burst of users is smoothed out below the provider's quota
+instead of being answered with 429s.
+
+Callers waiting for a token queue by priority: INTERACTIVE requests
+(Streamlit and API users) are served before BATCH ones (report jobs and API
+clients sending `X-MediAide-Priority: batch`), first come first served
+within a priority. The priority is taken from the current RequestContext.
+
+If a provider still answers 429, its bucket is paused for the Retry-After
+time and the call is retried, up to MEDIAIDE_RATE_LIMIT_RETRIES times.
+Response cache hits never take a token.
+
+Metrics: ratelimit.wait_seconds and ratelimit.queue_depth per provider and
+priority, plus ratelimit.throttled, ratelimit.backoffs and ratelimit.timeouts.
+
+Environment:
+    MEDIAIDE_LLM_RATE: Azure OpenAI requests per second (default 5, 0 disables)
+    MEDIAIDE_LLM_BURST: Azure OpenAI burst size (default 10)
+    MEDIAIDE_SERPAPI_RATE: SerpAPI searches per second (default 1, 0 disables)
+    MEDIAIDE_SERPAPI_BURST: SerpAPI burst size (default 5)
+    MEDIAIDE_RATE_LIMIT_TIMEOUT: seconds a call may wait for a token (default 60)
+    MEDIAIDE_RATE_LIMIT_RETRIES: retries after a 429 (default 2)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import openai
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict
+
+from src.main.context import BATCH, INTERACTIVE, current_priority
+from src.main.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower is served first
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+PROVIDERS = {
+    "llm": {"rate": 5.0, "burst": 10},
+    "serpapi": {"rate": 1.0, "burst": 5},
+}
+
+RATE_LIMIT_RETRIES = int(os.getenv("MEDIAIDE_RATE_LIMIT_RETRIES", "2"))
+DEFAULT_BACKOFF = 1.0
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited longer than the limiter's timeout for a token."""
+
+
+class PriorityRateLimiter:
+    """
+    Token bucket whose waiting callers are served in priority order.
+
+    Args:
+        name (str): Provider name, used for metrics
+        rate (float): Tokens added per second; 0 disables limiting
+        burst (int): Bucket capacity
+        timeout (float): Seconds a caller may wait before RateLimitTimeout
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, timeout: float = 60.0):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.timeout = timeout
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: List[tuple] = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _depth_gauges(self):
+        for priority, level in PRIORITIES.items():
+            depth = sum(1 for waiter in self._waiters if waiter[0] == level)
+            metrics.set_gauge("ratelimit.queue_depth", depth, provider=self.name, priority=priority)
+
+    def acquire(self, priority: Optional[str] = None, timeout: Optional[float] = None) -> float:
+        """
+        Take one token, waiting behind higher-priority and earlier callers.
+
+        Args:
+            priority (str): INTERACTIVE or BATCH; defaults to the current request's
+            timeout (float): Seconds to wait at most; defaults to the limiter's
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If no token became available in time
+        """
+        if not self.enabled:
+            return 0.0
+        priority = priority or current_priority()
+        start = time.monotonic()
+        deadline = start + (self.timeout if timeout is None else timeout)
+        waiter = (PRIORITIES.get(priority, PRIORITIES[BATCH]), next(self._order))
+
+        with self._condition:
+            heapq.heappush(self._waiters, waiter)
+            self._depth_gauges()
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    first = self._waiters[0] is waiter
+                    if first and self._tokens >= 1 and now >= self._paused_until:
+                        self._tokens -= 1
+                        break
+                    if now >= deadline:
+                        metrics.inc("ratelimit.timeouts", provider=self.name, priority=priority)
+                        raise RateLimitTimeout(f"No {self.name} capacity within {deadline - start:.0f}s")
+                    # Only the first waiter can be served next; the others wake when it is
+                    delay = deadline - now
+                    if first:
+                        delay = min(delay, max(self._paused_until - now, (1 - self._tokens) / self.rate))
+                    self._condition.wait(delay)
+            finally:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._depth_gauges()
+                self._condition.notify_all()
+
+        waited = time.monotonic() - start
+        metrics.observe("ratelimit.wait_seconds", waited, provider=self.name, priority=priority)
+        if waited > 0.001:
+            metrics.inc("ratelimit.throttled", provider=self.name, priority=priority)
+        return waited
+
+    async def aacquire(self, priority: Optional[str] = None, timeout: Optional[float] = None) -> float:
+        """Take one token without blocking the event loop. See acquire()."""
+        if not self.enabled:
+            return 0.0
+        return await asyncio.to_thread(self.acquire, priority or current_priority(), timeout)
+
+    def backoff(self, seconds: Optional[float] = None):
+        """
+        Pause the bucket after the provider answered 429.
+
+        Args:
+            seconds (float): The provider's Retry-After, or DEFAULT_BACKOFF
+        """
+        seconds = DEFAULT_BACKOFF if seconds is None else seconds
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._condition.notify_all()
+        metrics.inc("ratelimit.backoffs", provider=self.name)
+        logger.warning(f"⏳ {self.name} rate limited by the provider, pausing {seconds:.1f}s")
+
+
+_limiters: Dict[str, PriorityRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> PriorityRateLimiter:
+    """Return the process-wide limiter of a provider, configured from the environment on first use."""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                defaults = PROVIDERS[provider]
+                prefix = f"MEDIAIDE_{provider.upper()}"
+                limiter = PriorityRateLimiter(
+                    provider,
+                    rate=float(os.getenv(f"{prefix}_RATE", str(defaults["rate"]))),
+                    burst=int(os.getenv(f"{prefix}_BURST", str(defaults["burst"]))),
+                    timeout=float(os.getenv("MEDIAIDE_RATE_LIMIT_TIMEOUT", "60")),
+                )
+                _limiters[provider] = limiter
+    return limiter
+
+
+def reset_limiters():
+    """Forget the configured limiters so the next get_limiter() reads the environment again."""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Return the Retry-After seconds of a provider 429 error, if it has one."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """
+    LangChain chat model taking a token from a provider limiter for every call.
+
+    Wraps another chat model; a 429 pauses the limiter for the Retry-After
+    time and the call is retried through it. Put it under the response cache
+    (cached_chat_model) so cache hits do not use up the quota.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: BaseChatModel
+    limiter: PriorityRateLimiter
+
+    @property
+    def _llm_type(self) -> str:
+        return self.model._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.model._identifying_params
+
+    @property
+    def temperature(self):
+        return getattr(self.model, "temperature", None)
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            self.limiter.acquire()
+            try:
+                return self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except openai.RateLimitError as e:
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                self.limiter.backoff(retry_after(e))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await self.limiter.aacquire()
+            try:
+                return await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except openai.RateLimitError as e:
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                self.limiter.backoff(retry_after(e))
+
+
+async def _limited_call(limiter: PriorityRateLimiter, func, *args: Any, **kwargs: Any):
+    """Await a provider call after taking a token, retrying through the limiter after a 429."""
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        await limiter.aacquire()
+        try:
+            return await func(*args, **kwargs)
+        except openai.RateLimitError as e:
+            if attempt == RATE_LIMIT_RETRIES:
+                raise
+            limiter.backoff(retry_after(e))
+
+
+def _not_rate_limited(path: str) -> AttributeError:
+    return AttributeError(f"'{path}' is not available through the rate-limited client; "
+                          f"only chat.completions.create (and its with_raw_response) takes a token")
+
+
+class _RateLimitedCompletions:
+    """
+    `chat.completions` namespace whose `create` waits for the limiter.
+
+    `with_raw_response.create` is limited the same way; every other entry
+    point would reach the provider without a token and is refused.
+    """
+
+    def __init__(self, completions, limiter: PriorityRateLimiter, path: str = "chat.completions"):
+        self._completions = completions
+        self._limiter = limiter
+        self._path = path
+
+    def __getattr__(self, name: str):
+        raise _not_rate_limited(f"{self._path}.{name}")
+
+    @property
+    def with_raw_response(self) -> "_RateLimitedCompletions":
+        return _RateLimitedCompletions(self._completions.with_raw_response, self._limiter,
+                                       f"{self._path}.with_raw_response")
+
+    async def create(self, **kwargs: Any):
+        return await _limited_call(self._limiter, self._completions.create, **kwargs)
+
+
+class _RateLimitedChat:
+    def __init__(self, chat, limiter: PriorityRateLimiter):
+        self.completions = _RateLimitedCompletions(chat.completions, limiter)
+
+    def __getattr__(self, name: str):
+        raise _not_rate_limited(f"chat.{name}")
+
+
+class RateLimitedAsyncOpenAI:
+    """
+    Proxy for an `AsyncOpenAI` client whose chat completions wait for a limiter.
+
+    Client settings (base_url, timeout, ...) are forwarded to the wrapped
+    client. Other API entry points (responses, embeddings, raw post(), ...)
+    would bypass the limiter, so they raise AttributeError.
+    """
+
+    # Attributes that configure the client but do not send requests
+    FORWARDED = frozenset({
+        "api_key", "organization", "project", "base_url", "websocket_base_url", "timeout",
+        "max_retries", "default_headers", "default_query", "auth_headers", "custom_auth",
+        "platform_headers", "user_agent", "qs", "webhook_secret", "is_closed", "close",
+    })
+
+    def __init__(self, client, limiter: PriorityRateLimiter):
+        self._client = client
+        self.limiter = limiter
+        self.chat = _RateLimitedChat(client.chat, limiter)
+
+    def __getattr__(self, name: str):
+        if name in self.FORWARDED:
+            return getattr(self._client, name)
+        raise _not_rate_limited(name)
+
+
+def rate_limited_chat_model(llm: BaseChatModel, provider: str = "llm") -> BaseChatModel:
+    """Wrap a LangChain chat model with a provider's limiter (unless that limiter is disabled)."""
+    limiter = get_limiter(provider)
+    if not limiter.enabled or isinstance(llm, RateLimitedChatModel):
+        return llm
+    return RateLimitedChatModel(model=llm, limiter=limiter)
+
+
+def rate_limited_openai_client(client, provider: str = "llm"):
+    """Wrap an AsyncOpenAI client with a provider's limiter (unless that limiter is disabled)."""
+    limiter = get_limiter(provider)
+    if not limiter.enabled or isinstance(client, RateLimitedAsyncOpenAI):
+        return client
+    return RateLimitedAsyncOpenAI(client, limiter)
@@ -0,0 +1,490 @@
+"""
+MediAide dataset hot reload
+Watches the dataset CSVs and, when one changes, rebuilds that dataset's
+SQLite database in a side file, atomically swaps it in and rebuilds the
+derived column store, risk model and cohort index the same way. When rows
+were only appended to the CSV, they are inserted into the existing database
+and added to its materialized views instead of rebuilding it. In-flight
+queries keep reading the files they already opened; new queries see the new
+version. Dependent caches are then invalidated in every process.
+
+Datasets are built lazily: ensure_dataset() brings one up to date the first
+time a process uses it, so startup cost does not grow with the registry.
+
+Each build is published as a content-addressed snapshot, and a dataset
+whose CSV matches a published snapshot is restored from it instead of
+rebuilt (see src/main/snapshots.py).
+
+The database records which CSV content it holds (signature and size) in its
+mediaide_build table, written in the same transaction as the rows. Appends
+are computed against that record, so an append whose later build steps
+failed is never applied twice: the next reload finds the database already
+at the new CSV and rebuilds it in full instead.
+
+Only one process rebuilds a given change: rebuilds are serialized by a file
+lock and skipped when the recorded CSV signature is already current, so the
+remaining processes just invalidate their caches.
+
+Environment:
+    MEDIAIDE_HOT_RELOAD: set to 0 to disable the CSV watcher
+    MEDIAIDE_RELOAD_DEBOUNCE: seconds to wait for writes to settle (default 1.0)
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from pyprojroot import here
+
+from src.main.approximate import build_sample, invalidate_sample
+from src.main.cohort import build_cohort_index, invalidate_cohort_index
+from src.main.datasets import DATASETS, database_dir, get_dataset
+from src.main.metrics import metrics
+from src.main.partitions import build_partitions, invalidate_partitions
+from src.main.prefetch import prefetcher
+from src.main.profiling import profiled
+from src.main.risk import build_risk_model, invalidate_risk_model
+from src.main.snapshots import publish_snapshot, restore_snapshot
+from src.main.sql_guard import invalidate_engine, quote, write_table
+from src.main.store import invalidate_store, write_store
+from src.main.validation import load_validated, read_csv, validate
+from src.main.views import create_views, invalidate_views, refresh_views
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds are only serialized within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+RELOAD_DEBOUNCE = float(os.getenv("MEDIAIDE_RELOAD_DEBOUNCE", "1.0"))
+
+# Table inside each dataset database recording the CSV content it was built from
+BUILD_TABLE = "mediaide_build"
+
+_listeners: List[Callable[[str], None]] = []
+_local_locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in DATASETS}
+_current = set()  # datasets this process has checked against their CSV
+
+
+def on_dataset_reload(callback: Callable[[str], None]) -> Callable[[str], None]:
+    """
+    Register a callback run with the dataset name after it is reloaded.
+
+    Use it to drop caches that hold answers derived from the old data.
+    """
+    _listeners.append(callback)
+    return callback
+
+
+def database_path(dataset: str) -> str:
+    return os.path.join(database_dir(), get_dataset(dataset)['db'])
+
+
+def version_path(dataset: str) -> str:
+    return os.path.join(database_dir(), f"{dataset}.version.json")
+
+
+def csv_signature(dataset: str) -> str:
+    """Return the SHA-256 of the dataset's CSV."""
+    digest = hashlib.sha256()
+    with open(here(get_dataset(dataset)['csv']), "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_version(dataset: str) -> Optional[Dict[str, Any]]:
+    """Return the recorded version of the built dataset, or None if unknown."""
+    try:
+        with open(version_path(dataset)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def record_version(dataset: str, signature: Optional[str] = None, rows: Optional[int] = None):
+    """Record the CSV signature and size the current build was made from."""
+    # The size is taken first: if the CSV grows meanwhile, the next append check fails safe
+    size = os.path.getsize(here(get_dataset(dataset)['csv']))
+    version = {"signature": signature or csv_signature(dataset), "rows": rows, "size": size}
+    path = version_path(dataset)
+    staging = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(staging, "w") as f:
+        json.dump(version, f)
+    os.replace(staging, path)
+
+
+def write_build(conn: sqlite3.Connection, dataset: str, signature: str, rows: Optional[int]):
+    """Record in a database the CSV signature and size its rows were built from."""
+    # As in record_version, a CSV that grew meanwhile makes the next append check fail safe
+    size = os.path.getsize(here(get_dataset(dataset)['csv']))
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {BUILD_TABLE} (signature TEXT, rows INTEGER, size INTEGER)")
+    conn.execute(f"DELETE FROM {BUILD_TABLE}")
+    conn.execute(f"INSERT INTO {BUILD_TABLE} VALUES (?, ?, ?)", (signature, rows, size))
+
+
+def read_build(dataset: str) -> Optional[Dict[str, Any]]:
+    """Return the CSV signature, rows and size the dataset's database holds, or None if unknown."""
+    try:
+        conn = sqlite3.connect(f"file:{database_path(dataset)}?mode=ro", uri=True)
+        try:
+            row = conn.execute(f"SELECT signature, rows, size FROM {BUILD_TABLE}").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    return dict(zip(("signature", "rows", "size"), row)) if row else None
+
+
+def build_sqlite(dataset: str, df: pd.DataFrame, signature: Optional[str] = None) -> str:
+    """
+    Write a dataset's table and its registry indexes to a side file and
+    atomically swap it in.
+
+    Open connections keep reading the old file until they close, so active
+    readers never see a missing or half-written table.
+
+    Args:
+        dataset (str): Dataset name
+        df (pd.DataFrame): Validated rows of the whole CSV
+        signature (str): Signature of the CSV `df` was read from
+
+    Returns:
+        str: Path of the database file
+    """
+    info = get_dataset(dataset)
+    path = database_path(dataset)
+    staging = f"{path}.building-{os.getpid()}-{threading.get_ident()}"
+    if os.path.exists(staging):
+        os.remove(staging)
+
+    with metrics.timer("db.build_seconds", dataset=dataset):
+        write_table(staging, info['table'], df, info['indexes'])
+        conn = sqlite3.connect(staging)
+        try:
+            create_views(conn, dataset)
+            write_build(conn, dataset, signature or csv_signature(dataset), len(df))
+            conn.commit()
+        finally:
+            conn.close()
+    os.replace(staging, path)
+    return path
+
+
+def appended_rows(dataset: str, version: Optional[Dict[str, Any]]) -> Optional[pd.DataFrame]:
+    """
+    Return the validated rows appended to a dataset's CSV since `version` was built.
+
+    Args:
+        dataset (str): Dataset name
+        version (Dict[str, Any]): Signature and size of the CSV the database
+            holds, as returned by read_build()
+
+    Returns:
+        Optional[pd.DataFrame]: The accepted new rows, or None if the CSV changed
+            in any other way (or the version predates size tracking)
+    """
+    size = (version or {}).get("size")
+    path = here(get_dataset(dataset)['csv'])
+    if not size or os.path.getsize(path) <= size:
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(0)
+        remaining = size
+        while remaining:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                return None
+            digest.update(block)
+            remaining -= len(block)
+        if digest.hexdigest() != version.get("signature"):
+            return None
+        tail = f.read()
+    # The old last line must be complete: either it ended in a newline or the append starts with one
+    if not block.endswith(b"\n") and not tail.startswith((b"\n", b"\r\n")):
+        return None
+    return validate(dataset, read_csv(dataset, io.BytesIO(header + tail)))[0]
+
+
+def append_sqlite(dataset: str, rows: pd.DataFrame, signature: str, total_rows: Optional[int] = None):
+    """
+    Insert appended rows into a dataset's database, refresh its views and
+    record the new CSV signature in one transaction, so readers see either
+    the old or the new version and the rows are never appended twice.
+
+    Args:
+        dataset (str): Dataset name
+        rows (pd.DataFrame): The validated appended rows
+        signature (str): Signature of the CSV including the appended rows
+        total_rows (int): Row count of the dataset after the append
+    """
+    info = get_dataset(dataset)
+    columns = ", ".join(quote(column) for column in rows.columns)
+    placeholders = ", ".join("?" for _ in rows.columns)
+    values = rows.astype(object).where(rows.notna(), None).values.tolist()
+    conn = sqlite3.connect(database_path(dataset), isolation_level=None, timeout=30)
+    try:
+        with metrics.timer("db.append_seconds", dataset=dataset):
+            conn.execute(f"CREATE TEMP TABLE mediaide_new_rows AS SELECT {columns} FROM {quote(info['table'])} WHERE 0")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(f"INSERT INTO mediaide_new_rows VALUES ({placeholders})", values)
+                conn.execute(f"INSERT INTO {quote(info['table'])} ({columns}) SELECT * FROM mediaide_new_rows")
+                refresh_views(conn, dataset, "temp.mediaide_new_rows")
+                write_build(conn, dataset, signature, total_rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.close()
+
+
+@contextlib.contextmanager
+def rebuild_lock(dataset: str):
+    """Serialize rebuilds of a dataset across threads and processes."""
+    with _local_locks[dataset]:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(database_dir(), f"{dataset}.reload.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@profiled(lambda dataset, *args, **kwargs: f"rebuild_{dataset}")
+def rebuild_dataset(dataset: str, df: Optional[pd.DataFrame] = None, signature: Optional[str] = None,
+                    appended: Optional[pd.DataFrame] = None):
+    """
+    Rebuild the database and derived data of a dataset from its CSV.
+
+    Every artifact is written to a side file and renamed into place, except
+    that `appended` rows are inserted into the existing database. The build
+    is then published as a snapshot.
+
+    Args:
+        dataset (str): Dataset name
+        df (pd.DataFrame): Validated rows of the whole CSV (loaded if omitted)
+        signature (str): Signature of the CSV (computed if omitted)
+        appended (pd.DataFrame): Rows appended since the database's build, from appended_rows()
+    """
+    signature = signature or csv_signature(dataset)
+    if df is None:
+        df = load_validated(dataset)
+    with metrics.timer("reload.rebuild_seconds", dataset=dataset):
+        if appended is not None:
+            append_sqlite(dataset, appended, signature, len(df))
+        else:
+            build_sqlite(dataset, df, signature)
+        build_partitions(dataset, df)
+        build_sample(dataset, df)
+        write_store(dataset, df)
+        build_risk_model(dataset, df)
+        build_cohort_index(dataset, df)
+        record_version(dataset, signature, len(df))
+    try:
+        publish_snapshot(dataset, signature, len(df))
+    except Exception as e:
+        metrics.inc("snapshot.errors", dataset=dataset)
+        logger.warning(f"⚠️ Could not publish a snapshot of '{dataset}': {e}")
+
+
+def restore_dataset(dataset: str, signature: str) -> bool:
+    """
+    Install the snapshot built from the current CSV, if one was published.
+
+    Returns:
+        bool: True if the dataset was restored and needs no rebuild
+    """
+    try:
+        manifest = restore_snapshot(dataset, signature)
+    except Exception as e:
+        metrics.inc("snapshot.errors", dataset=dataset)
+        logger.warning(f"⚠️ Could not restore a snapshot of '{dataset}', rebuilding: {e}")
+        return False
+    if manifest is None:
+        return False
+    record_version(dataset, signature, manifest.get("rows"))
+    return True
+
+
+def invalidate_dataset(dataset: str):
+    """Drop this process's cached data for a dataset and notify the reload listeners."""
+    invalidate_store(dataset)
+    invalidate_risk_model(dataset)
+    invalidate_cohort_index(dataset)
+    invalidate_engine(dataset)
+    invalidate_partitions(dataset)
+    invalidate_sample(dataset)
+    invalidate_views(dataset)
+    prefetcher.invalidate(dataset)
+    for callback in list(_listeners):
+        try:
+            callback(dataset)
+        except Exception as e:
+            logger.warning(f"⚠️ Reload listener failed for '{dataset}': {e}")
+    metrics.inc("reload.invalidations", dataset=dataset)
+
+
+def reload_dataset(dataset: str, force: bool = False) -> bool:
+    """
+    Bring a dataset up to date with its CSV and invalidate dependent caches.
+
+    Args:
+        dataset (str): Dataset name
+        force (bool): Rebuild even if the CSV signature is unchanged
+
+    Returns:
+        bool: True if this call rebuilt the dataset
+    """
+    with rebuild_lock(dataset):
+        signature = csv_signature(dataset)
+        version = read_version(dataset)
+        rebuilt = force or version is None or version.get("signature") != signature
+        if rebuilt and (force or not restore_dataset(dataset, signature)):
+            # Compared with the database's own record: after a failed rebuild it may be ahead of the version file
+            appended = None if force else appended_rows(dataset, read_build(dataset))
+            if appended is not None:
+                logger.info(f"➕ Appending {len(appended)} new rows to '{dataset}'...")
+                metrics.inc("reload.appends", dataset=dataset)
+            else:
+                logger.info(f"🔄 Rebuilding '{dataset}' from its updated CSV...")
+            rebuild_dataset(dataset, signature=signature, appended=appended)
+            metrics.inc("reload.rebuilds", dataset=dataset)
+    invalidate_dataset(dataset)
+    _current.add(dataset)
+    logger.info(f"✅ Dataset '{dataset}' reloaded" + ("" if rebuilt else " (already current)"))
+    return rebuilt
+
+
+def ensure_dataset(dataset: str) -> bool:
+    """
+    Build a dataset on first use in this process if its build is missing or stale.
+
+    Later calls return immediately; afterwards the watcher keeps the dataset
+    current.
+
+    Args:
+        dataset (str): Dataset name
+
+    Returns:
+        bool: True if this call rebuilt the dataset
+    """
+    if dataset in _current:
+        return False
+    get_dataset(dataset)
+    with rebuild_lock(dataset):
+        if dataset in _current:
+            return False
+        signature = csv_signature(dataset)
+        version = read_version(dataset)
+        stale = (version is None or version.get("signature") != signature
+                 or not os.path.exists(database_path(dataset)))
+        if stale:
+            if not restore_dataset(dataset, signature):
+                logger.info(f"🔨 Building '{dataset}' from its CSV...")
+                rebuild_dataset(dataset, signature=signature)
+                metrics.inc("reload.rebuilds", dataset=dataset)
+            invalidate_dataset(dataset)
+        _current.add(dataset)
+    return stale
+
+
+class DatasetWatcher:
+    """
+    Reloads datasets when their CSV files change.
+
+    Events are debounced per dataset so an editor's burst of writes
+    triggers a single rebuild.
+
+    Args:
+        debounce (float): Seconds without further events before reloading
+    """
+
+    RELOAD_EVENTS = ("created", "modified", "moved")
+
+    def __init__(self, debounce: float = RELOAD_DEBOUNCE):
+        self.debounce = debounce
+        self.paths = {os.path.abspath(str(here(info['csv']))): name for name, info in DATASETS.items()}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self._observer = None
+
+    def dispatch(self, event):
+        """watchdog event handler entry point."""
+        if event.is_directory or event.event_type not in self.RELOAD_EVENTS:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            dataset = self.paths.get(os.path.abspath(path)) if path else None
+            if dataset:
+                self.schedule(dataset)
+
+    def schedule(self, dataset: str):
+        """Reload `dataset` once no further changes arrive for `debounce` seconds."""
+        with self._lock:
+            timer = self._timers.get(dataset)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(self.debounce, self._reload, args=(dataset,))
+            timer.daemon = True
+            self._timers[dataset] = timer
+            timer.start()
+
+    def _reload(self, dataset: str):
+        with self._lock:
+            self._timers.pop(dataset, None)
+        try:
+            reload_dataset(dataset)
+        except Exception as e:
+            metrics.inc("reload.errors", dataset=dataset)
+            logger.error(f"❌ Failed to reload '{dataset}': {e}")
+
+    def start(self):
+        from watchdog.observers import Observer
+
+        self._observer = Observer()
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            self._observer.schedule(self, directory, recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+        logger.info("👀 Watching dataset CSVs for changes")
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+
+
+_watcher: Optional[DatasetWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def start_dataset_watcher() -> Optional[DatasetWatcher]:
+    """Start the process-wide CSV watcher once (unless MEDIAIDE_HOT_RELOAD=0)."""
+    global _watcher
+    if os.getenv("MEDIAIDE_HOT_RELOAD", "1").lower() in ("0", "false", "no"):
+        return None
+    with _watcher_lock:
+        if _watcher is None:
+            watcher = DatasetWatcher()
+            watcher.start()
+            _watcher = watcher
+        return _watcher
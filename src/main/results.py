@@ -0,0 +1,158 @@
+"""
+MediAide structured query results
+Captures the SQL statements the database agents execute, together with the
+result set as a compact columnar payload, row counts and timings, so that
+responses carry data the UI and API clients can render directly instead of
+re-parsing the agent's prose.
+
+Environment:
+    MEDIAIDE_RESULT_MAX_ROWS: rows kept in a response's data payload (default 1000)
+"""
+
+import contextlib
+import contextvars
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+MAX_DATA_ROWS = int(os.getenv("MEDIAIDE_RESULT_MAX_ROWS", "1000"))
+
+_captured: contextvars.ContextVar[Optional[List["QueryResult"]]] = contextvars.ContextVar(
+    "mediaide_captured_queries", default=None
+)
+
+
+def column_type(values: Sequence[Any]) -> str:
+    """Return a simple type name for a column: int, float, bool, str or null."""
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds:
+        return "null"
+    if kinds <= {bool}:
+        return "bool"
+    if kinds <= {int}:
+        return "int"
+    if kinds <= {int, float}:
+        return "float"
+    return "str"
+
+
+class QueryResult:
+    """
+    One executed SQL statement and its (possibly truncated) result set.
+
+    Args:
+        sql (str): The statement as executed
+        rows (Sequence[Dict[str, Any]]): Result rows as column -> value dicts
+        elapsed (float): Execution time in seconds
+        total_rows (int): Rows the statement produced, if larger than `rows`
+        max_rows (int): Rows kept in the columnar payload
+        next_cursor (str): Cursor for paging past `rows`, see sql_guard.fetch_page
+        intervals (Dict[str, List]): For approximate results, the 95% confidence
+            interval [low, high] of each estimated column per row
+    """
+
+    def __init__(self, sql: str, rows: Sequence[Dict[str, Any]], elapsed: float,
+                 total_rows: Optional[int] = None, max_rows: int = MAX_DATA_ROWS,
+                 next_cursor: Optional[str] = None, intervals: Optional[Dict[str, List]] = None):
+        self.sql = sql
+        self.columns: List[str] = list(rows[0]) if rows else []
+        kept = rows[:max_rows]
+        self.data: Dict[str, List[Any]] = {
+            column: [self._plain(row[column]) for row in kept] for column in self.columns
+        }
+        self.row_count = len(rows) if total_rows is None else total_rows
+        self.returned_rows = len(kept)
+        self.elapsed = elapsed
+        self.next_cursor = next_cursor
+        self.intervals = intervals
+
+    @staticmethod
+    def _plain(value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return str(value)
+
+    @property
+    def truncated(self) -> bool:
+        return self.returned_rows < self.row_count
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the JSON-serializable payload."""
+        return {
+            "sql": self.sql,
+            "columns": self.columns,
+            "types": {column: column_type(values) for column, values in self.data.items()},
+            "data": self.data,
+            "row_count": self.row_count,
+            "returned_rows": self.returned_rows,
+            "truncated": self.truncated,
+            "next_cursor": self.next_cursor,
+            "approximate": self.intervals is not None,
+            "intervals": self.intervals,
+            "sql_ms": round(self.elapsed * 1000, 3),
+        }
+
+
+@contextlib.contextmanager
+def capture_queries() -> Iterator[List[QueryResult]]:
+    """
+    Collect the QueryResults recorded while the block runs.
+
+    Yields:
+        List[QueryResult]: Filled in execution order
+    """
+    captured: List[QueryResult] = []
+    token = _captured.set(captured)
+    try:
+        yield captured
+    finally:
+        _captured.reset(token)
+
+
+def record_result(result: QueryResult):
+    """Add a result to the active capture, if any."""
+    captured = _captured.get()
+    if captured is not None:
+        captured.append(result)
+
+
+def result_payload(queries: List[QueryResult], started: float) -> Optional[Dict[str, Any]]:
+    """
+    Build a response's `data` field from the captured queries.
+
+    The last query that returned rows is the answer's result set; every
+    statement is listed with its timing under `queries`.
+
+    Args:
+        queries (List[QueryResult]): Captured results
+        started (float): perf_counter time the agent call started
+
+    Returns:
+        Optional[Dict[str, Any]]: The payload, or None if no SQL was run
+    """
+    if not queries:
+        return None
+    main = next((q for q in reversed(queries) if q.columns), queries[-1])
+    payload = main.to_dict()
+    payload["queries"] = [
+        {"sql": q.sql, "row_count": q.row_count, "sql_ms": round(q.elapsed * 1000, 3)} for q in queries
+    ]
+    payload["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return payload
+
+
+def to_arrow(payload: Dict[str, Any]):
+    """
+    Convert a `data` payload to a pyarrow Table.
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    import pyarrow as pa
+    return pa.table({column: payload["data"][column] for column in payload["columns"]})
+
+
+def to_frame(payload: Dict[str, Any]):
+    """Convert a `data` payload to a pandas DataFrame."""
+    import pandas as pd
+    return pd.DataFrame(payload["data"], columns=payload["columns"])
@@ -0,0 +1,263 @@
+"""
+MediAide risk scoring engine
+Lightweight logistic regression models trained per dataset at build time and
+scored in-process with NumPy, so individual or batch risk estimates don't
+need an LLM round-trip.
+"""
+
+import os
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+
+from src.main.datasets import get_dataset, database_dir
+from src.main.store import open_store
+from src.main.metrics import cache_lookup
+
+
+FeatureInput = Union[Dict[str, float], Sequence[float], np.ndarray]
+
+
+class RiskModel:
+    """
+    Standardized logistic regression model for a single dataset.
+
+    Features are z-scored with the training mean/std, so a missing feature can be
+    imputed with the population mean simply by leaving its standardized value at 0.
+    """
+
+    def __init__(self, dataset: str, features: List[str], mean: np.ndarray,
+                 scale: np.ndarray, coef: np.ndarray, intercept: float):
+        self.dataset = dataset
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self._index = {name: i for i, name in enumerate(self.features)}
+        # Fold standardization into the weights: z = (x - mean) / scale
+        self._weights = self.coef / self.scale
+        self._bias = self.intercept - float(np.dot(self.mean, self._weights))
+
+    def to_matrix(self, records: Union[FeatureInput, List[FeatureInput]]) -> np.ndarray:
+        """
+        Convert feature dicts or raw vectors into a (n, d) matrix in model order.
+
+        Missing dict entries are filled with the training mean.
+
+        Args:
+            records: A single record or a list of records
+
+        Returns:
+            np.ndarray: Feature matrix of shape (n, d)
+        """
+        if isinstance(records, dict):
+            records = [records]
+        if isinstance(records, np.ndarray):
+            return np.atleast_2d(records.astype(np.float64, copy=False))
+        if records and not isinstance(records[0], dict):
+            return np.atleast_2d(np.asarray(records, dtype=np.float64))
+
+        matrix = np.tile(self.mean, (len(records), 1))
+        for row, record in enumerate(records):
+            for name, value in record.items():
+                col = self._index.get(name)
+                if col is None:
+                    raise ValueError(f"Unknown feature '{name}' for {self.dataset}. Expected: {', '.join(self.features)}")
+                matrix[row, col] = float(value)
+        return matrix
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """
+        Score a feature matrix.
+
+        Args:
+            X (np.ndarray): Matrix of shape (n, d) or a single vector of shape (d,)
+
+        Returns:
+            np.ndarray: Outcome probabilities of shape (n,)
+        """
+        X = np.atleast_2d(X)
+        logits = X @ self._weights + self._bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def score_records(self, records: Union[FeatureInput, List[FeatureInput]]) -> np.ndarray:
+        """Score feature dicts or raw vectors, see `to_matrix`."""
+        return self.score(self.to_matrix(records))
+
+    def contributions(self, record: FeatureInput) -> Dict[str, float]:
+        """
+        Per-feature contribution to the logit for a single record.
+
+        Args:
+            record: Feature dict or raw vector
+
+        Returns:
+            Dict[str, float]: Feature name -> contribution, largest magnitude first
+        """
+        z = (self.to_matrix(record)[0] - self.mean) / self.scale
+        parts = z * self.coef
+        order = np.argsort(-np.abs(parts))
+        return {self.features[i]: float(parts[i]) for i in order}
+
+    def save(self, path: str):
+        """Persist the model as a compressed .npz file, replacing any previous one atomically."""
+        staging = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}.npz"
+        np.savez_compressed(
+            staging,
+            dataset=self.dataset,
+            features=np.array(self.features),
+            mean=self.mean,
+            scale=self.scale,
+            coef=self.coef,
+            intercept=self.intercept,
+        )
+        os.replace(staging, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RiskModel":
+        """Load a model previously written with `save`."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                dataset=str(data['dataset']),
+                features=[str(f) for f in data['features']],
+                mean=data['mean'],
+                scale=data['scale'],
+                coef=data['coef'],
+                intercept=float(data['intercept']),
+            )
+
+
+def train_risk_model(dataset: str, df: pd.DataFrame, target: str,
+                     l2: float = 1.0, max_iter: int = 50, tol: float = 1e-8) -> RiskModel:
+    """
+    Fit an L2-regularized logistic regression with Newton/IRLS iterations.
+
+    Args:
+        dataset (str): Dataset name stored on the model
+        df (pd.DataFrame): Training data including the target column
+        target (str): Name of the binary outcome column
+        l2 (float): Ridge penalty on the standardized coefficients
+        max_iter (int): Maximum Newton iterations
+        tol (float): Convergence tolerance on the parameter update
+
+    Returns:
+        RiskModel: The fitted model
+    """
+    features = [c for c in df.columns if c != target]
+    X = df[features].to_numpy(dtype=np.float64, na_value=np.nan)
+    y = df[target].to_numpy(dtype=np.float64)
+
+    mean = np.nanmean(X, axis=0)
+    scale = np.nanstd(X, axis=0)
+    scale[~(scale > 0)] = 1.0
+    # Missing measurements are imputed with the mean, i.e. a standardized value of 0
+    X = np.where(np.isnan(X), mean, X)
+    Z = np.hstack([np.ones((len(X), 1)), (X - mean) / scale])
+
+    beta = np.zeros(Z.shape[1])
+    penalty = np.full(Z.shape[1], l2)
+    penalty[0] = 0.0  # don't shrink the intercept
+    for _ in range(max_iter):
+        p = 1.0 / (1.0 + np.exp(-(Z @ beta)))
+        w = p * (1.0 - p)
+        gradient = Z.T @ (y - p) - penalty * beta
+        hessian = (Z * w[:, None]).T @ Z + np.diag(penalty)
+        step = np.linalg.solve(hessian, gradient)
+        beta += step
+        if np.max(np.abs(step)) < tol:
+            break
+
+    return RiskModel(dataset, features, mean, scale, beta[1:], beta[0])
+
+
+_models: Dict[str, RiskModel] = {}
+_models_lock = threading.Lock()
+
+
+def risk_model_path(dataset: str) -> str:
+    """Return the artifact path for a dataset's risk model."""
+    return os.path.join(database_dir(), f"{dataset}_risk.npz")
+
+
+def build_risk_model(dataset: str, df: Optional[pd.DataFrame] = None) -> RiskModel:
+    """
+    Train and persist the risk model for a dataset.
+
+    Args:
+        dataset (str): Dataset name
+        df (pd.DataFrame): Training data; read from the column store when omitted
+
+    Returns:
+        RiskModel: The trained model
+    """
+    if df is None:
+        df = open_store(dataset).to_frame()
+    model = train_risk_model(dataset, df, get_dataset(dataset)['target'])
+    model.save(risk_model_path(dataset))
+    with _models_lock:
+        _models[dataset] = model
+    return model
+
+
+def get_risk_model(dataset: str) -> RiskModel:
+    """
+    Return the risk model for a dataset, loading or training it on first use.
+
+    Args:
+        dataset (str): Dataset name
+
+    Returns:
+        RiskModel: The cached model
+    """
+    model = _models.get(dataset)
+    cache_lookup("risk_model", model is not None)
+    if model is not None:
+        return model
+
+    get_dataset(dataset)
+    path = risk_model_path(dataset)
+    if os.path.exists(path):
+        model = RiskModel.load(path)
+        with _models_lock:
+            _models[dataset] = model
+        return model
+    return build_risk_model(dataset)
+
+
+def invalidate_risk_model(dataset: str):
+    """Drop the cached model so the next `get_risk_model` loads it from disk again."""
+    with _models_lock:
+        _models.pop(dataset, None)
+
+
+def score_risk(dataset: str, features: Union[FeatureInput, List[FeatureInput]]) -> Dict[str, Any]:
+    """
+    Score one patient or a batch of patients against a dataset's risk model.
+
+    Args:
+        dataset (str): Dataset name
+        features: A feature dict/vector or a list of them
+
+    Returns:
+        Dict[str, Any]: Probabilities plus the feature order used
+    """
+    model = get_risk_model(dataset)
+    if isinstance(features, dict):
+        single = True
+    elif isinstance(features, (list, tuple)) and features and isinstance(features[0], dict):
+        single = False
+    else:
+        single = np.ndim(features) == 1
+    probabilities = model.score_records(features)
+    result = {
+        "dataset": dataset,
+        "target": get_dataset(dataset)['target'],
+        "features": model.features,
+        "probabilities": probabilities.tolist(),
+    }
+    if single:
+        result["probability"] = float(probabilities[0])
+        result["contributions"] = model.contributions(features)
+    return result
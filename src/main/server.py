@@ -0,0 +1,325 @@
+"""
+MediAide HTTP API
+Headless JSON service sharing one warm MediAide instance across requests.
+Blocking agent calls run on a bounded thread pool; when the pool and its
+queue are full new requests are rejected with 503 and Retry-After so a load
+balancer can route elsewhere. Batch and report clients send
+`X-MediAide-Priority: batch` so their LLM and search calls wait behind
+interactive users at the provider rate limiters. Sending
+`X-MediAide-Profile: sample` (or `cprofile`) profiles one request; the
+profile files are listed in the response's metadata (src/main/profiling.py).
+
+Run from the project root:
+    python src/main/server.py --port 8080 --workers 4 --max-queue 32
+"""
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional
+
+from aiohttp import web
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.main.app import MediAide
+from src.main.context import INTERACTIVE, request_context
+from src.main.datasets import DATASETS
+from src.main.metrics import metrics
+from src.main.profiling import MODES, profiling
+from src.main.ratelimit import PRIORITIES
+from src.main.shared_cache import SharedCache
+from src.main.sql_guard import PAGE_SIZE
+from src.main.reload import on_dataset_reload
+
+logger = logging.getLogger(__name__)
+
+class Overloaded(Exception):
+    """Raised when the worker pool and its queue are full."""
+
+
+class WorkerPool:
+    """
+    Bounded pool for blocking MediAide calls.
+
+    At most `max_workers` calls run at once and at most `max_queue` more wait;
+    anything beyond that is rejected immediately instead of piling up.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mediaide-worker")
+        self.pending = 0
+
+    @property
+    def saturated(self) -> bool:
+        return self.pending >= self.max_workers + self.max_queue
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None):
+        """
+        Run `func(*args)` on the pool.
+
+        Raises:
+            Overloaded: If the pool and queue are full
+            asyncio.TimeoutError: If the call exceeds `timeout` seconds
+        """
+        if self.saturated:
+            metrics.inc("server.rejected")
+            raise Overloaded()
+
+        self.pending += 1
+        metrics.set_gauge("server.pending", self.pending)
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        # Like asyncio.to_thread: the worker runs in a copy of this task's context
+        context = contextvars.copy_context()
+
+        def timed_call():
+            metrics.observe("server.queue_wait_seconds", time.perf_counter() - queued_at)
+            return context.run(func, *args)
+
+        future = loop.run_in_executor(self.executor, timed_call)
+
+        # Release the slot when the worker actually finishes, not when the
+        # caller stops waiting, so timed-out calls still count against capacity
+        def release(_):
+            self.pending -= 1
+            metrics.set_gauge("server.pending", self.pending)
+
+        future.add_done_callback(release)
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def bad_request(message: str) -> web.HTTPBadRequest:
+    return web.HTTPBadRequest(text=json.dumps({"error": message}), content_type="application/json")
+
+
+async def read_body(request: web.Request, *required: str) -> Dict[str, Any]:
+    """Parse the JSON object body and check that the `required` fields are present."""
+    try:
+        body = await request.json()
+    except Exception:
+        raise bad_request("Request body must be JSON")
+    if not isinstance(body, dict):
+        raise bad_request("Request body must be a JSON object")
+    for field in required:
+        if body.get(field) in (None, ""):
+            raise bad_request(f"Missing '{field}'")
+    return body
+
+
+def positive_int(body: Dict[str, Any], field: str, default: int) -> int:
+    """Read an optional positive integer field of a request body."""
+    value = body.get(field, default)
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise bad_request(f"'{field}' must be a positive integer")
+    if isinstance(value, bool) or (isinstance(value, float) and value != number) or number < 1:
+        raise bad_request(f"'{field}' must be a positive integer")
+    return number
+
+
+def prioritized(func: Callable, priority: str, profile: Optional[str] = None) -> Callable:
+    """Wrap a MediAide call to run as a request with the given rate limiter priority and profile mode."""
+    @functools.wraps(func)
+    def call(*args):
+        with request_context(func.__name__, priority=priority), profiling(profile):
+            return func(*args)
+    return call
+
+
+async def dispatch(request: web.Request, func: Callable, *args, cacheable: bool = False) -> web.Response:
+    """
+    Run a MediAide call on the worker pool and map failures to HTTP status codes.
+
+    Successful results of `cacheable` calls are served from and stored in the
+    app's shared response cache when one is configured.
+    """
+    pool: WorkerPool = request.app["pool"]
+    if not request.app["ready"]:
+        return web.json_response({"error": "MediAide is still initializing"}, status=503,
+                                 headers={"Retry-After": "5"})
+    priority = request.headers.get("X-MediAide-Priority", INTERACTIVE).lower()
+    if priority not in PRIORITIES:
+        raise bad_request(f"Unknown priority '{priority}'. Use one of: {', '.join(PRIORITIES)}")
+    profile = request.headers.get("X-MediAide-Profile")
+    if profile is not None and profile.lower() not in MODES:
+        raise bad_request(f"Unknown profile mode '{profile}'. Use one of: {', '.join(MODES)}")
+
+    # A cached answer would not run the code being profiled
+    cache: Optional[SharedCache] = request.app["cache"] if cacheable and not profile else None
+    if cache is not None:
+        key = SharedCache.make_key(func.__name__, args)
+        cached = cache.get(key)
+        if cached is not None:
+            return web.json_response(cached, dumps=_dumps)
+
+    try:
+        result = await pool.run(prioritized(func, priority, profile), *args, timeout=request.app["request_timeout"])
+    except Overloaded:
+        return web.json_response({"error": "Server busy, try again later"}, status=503,
+                                 headers={"Retry-After": "1"})
+    except asyncio.TimeoutError:
+        metrics.inc("server.timeouts")
+        return web.json_response({"error": "Request timed out"}, status=504)
+
+    if cache is not None and result.get("success", True):
+        cache.set(key, result)
+    return web.json_response(result, dumps=_dumps)
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, default=str)
+
+
+async def handle_query(request: web.Request) -> web.Response:
+    dataset = request.match_info["dataset"]
+    if dataset not in DATASETS:
+        return web.json_response(
+            {"error": f"Unknown dataset '{dataset}'. Available: {', '.join(DATASETS)}"}, status=404
+        )
+    body = await read_body(request, "question")
+    return await dispatch(request, request.app["mediaide"].query_dataset, dataset, body["question"],
+                          body.get("approximate"), cacheable=True)
+
+
+async def handle_search(request: web.Request) -> web.Response:
+    body = await read_body(request, "question")
+    return await dispatch(request, request.app["mediaide"].search_web, body["question"], cacheable=True)
+
+
+async def handle_comprehensive(request: web.Request) -> web.Response:
+    body = await read_body(request, "question")
+    return await dispatch(request, request.app["mediaide"].get_comprehensive_answer,
+                          body["question"], body.get("topics"), cacheable=True)
+
+
+async def handle_risk(request: web.Request) -> web.Response:
+    body = await read_body(request, "dataset", "features")
+    return await dispatch(request, request.app["mediaide"].score_risk, body.get("dataset"), body.get("features", {}))
+
+
+async def handle_similar(request: web.Request) -> web.Response:
+    body = await read_body(request, "dataset", "features")
+    return await dispatch(request, request.app["mediaide"].find_similar_patients,
+                          body.get("dataset"), body.get("features", {}), positive_int(body, "k", 25))
+
+
+async def handle_page(request: web.Request) -> web.Response:
+    body = await read_body(request, "dataset", "sql")
+    return await dispatch(request, request.app["mediaide"].page_query, body["dataset"], body["sql"],
+                          body.get("cursor"), positive_int(body, "page_size", PAGE_SIZE))
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    """Liveness: the event loop is responsive."""
+    return web.json_response({"status": "ok"})
+
+
+async def handle_ready(request: web.Request) -> web.Response:
+    """Readiness: MediAide is initialized and the worker queue has room."""
+    pool: WorkerPool = request.app["pool"]
+    ready = request.app["ready"] and not pool.saturated
+    return web.json_response(
+        {"ready": ready, "initialized": request.app["ready"], "pending": pool.pending,
+         "capacity": pool.max_workers + pool.max_queue},
+        status=200 if ready else 503,
+    )
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.json_response(metrics.snapshot(), dumps=_dumps)
+
+
+async def warm_up(app: web.Application):
+    """Initialize the shared MediAide on the pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    mediaide: MediAide = app["mediaide"]
+    if not mediaide.initialized:
+        ok = await loop.run_in_executor(app["pool"].executor, mediaide.initialize)
+        if not ok:
+            logger.error("❌ MediAide failed to initialize; readiness will stay false")
+            return
+    app["ready"] = True
+    logger.info("🚀 MediAide API ready")
+
+
+async def start_warm_up(app: web.Application):
+    app["warm_up"] = asyncio.create_task(warm_up(app))
+
+
+async def stop_pool(app: web.Application):
+    app["pool"].shutdown()
+
+
+def create_app(mediaide: Optional[MediAide] = None, max_workers: int = 4, max_queue: int = 32,
+               request_timeout: float = 120.0, cache: Optional[SharedCache] = None) -> web.Application:
+    """
+    Build the aiohttp application.
+
+    Args:
+        mediaide (MediAide): Shared instance; created (and initialized at startup) if omitted
+        max_workers (int): Concurrent blocking MediAide calls
+        max_queue (int): Additional requests allowed to wait for a worker
+        request_timeout (float): Seconds before a request is answered with 504
+        cache (SharedCache): Optional response cache for query/search endpoints
+
+    Returns:
+        web.Application: The configured application
+    """
+    app = web.Application()
+    app["mediaide"] = mediaide or MediAide()
+    app["pool"] = WorkerPool(max_workers, max_queue)
+    app["request_timeout"] = request_timeout
+    app["cache"] = cache
+    if cache is not None:
+        # Cached answers may be derived from the old data
+        on_dataset_reload(lambda dataset: cache.clear())
+    app["ready"] = False
+
+    app.add_routes([
+        web.post("/query/{dataset}", handle_query),
+        web.post("/search", handle_search),
+        web.post("/comprehensive", handle_comprehensive),
+        web.post("/risk", handle_risk),
+        web.post("/similar", handle_similar),
+        web.post("/page", handle_page),
+        web.get("/healthz", handle_health),
+        web.get("/readyz", handle_ready),
+        web.get("/metrics", handle_metrics),
+    ])
+    app.on_startup.append(start_warm_up)
+    app.on_cleanup.append(stop_pool)
+    return app
+
+
+def main():
+    """Run the MediAide HTTP API."""
+    parser = argparse.ArgumentParser(description="MediAide HTTP API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent blocking MediAide calls")
+    parser.add_argument("--max-queue", type=int, default=32, help="Requests allowed to wait for a worker")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    app = create_app(max_workers=args.workers, max_queue=args.max_queue, request_timeout=args.timeout)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ import dotenv
 from langchain_openai import AzureChatOpenAI
 from openai import AsyncOpenAI
 
+from src.main.llm_cache import cached_chat_model, cached_openai_client
+from src.main.ratelimit import rate_limited_chat_model, rate_limited_openai_client
+
 dotenv.load_dotenv()
 
 
@@ -17,6 +20,9 @@ llm = AzureChatOpenAI(
     model_name=model_name,
     temperature=0.0
 )
+# Deterministic completions are served from the shared LLM response cache;
+# only cache misses wait for the Azure OpenAI rate limiter
+llm = cached_chat_model(rate_limited_chat_model(llm))
 
 # Configure OpenAI
 
@@ -29,7 +35,8 @@ if not BASE_URL or not API_KEY or not MODEL_NAME:
         "Please set BASE_URL, API_KEY, and MODEL_NAME."
     )
     
-client = AsyncOpenAI(base_url=BASE_URL, api_key=API_KEY)
+client = cached_openai_client(rate_limited_openai_client(AsyncOpenAI(base_url=BASE_URL, api_key=API_KEY)))
+openai_client = client
 
 #Configure SerpAPI
 
@@ -0,0 +1,164 @@
+"""
+MediAide shared cache
+A small key/value cache in a local SQLite file that every thread and every
+worker process can read and write. Entries carry an optional TTL and the
+table is trimmed to `max_entries` by least-recent access, so the file stays
+bounded. Access times are only refreshed once per `touch_interval` to keep
+reads from turning into writes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.main.datasets import database_dir
+from src.main.metrics import cache_lookup
+
+
+class SharedCache:
+    """
+    Process- and thread-safe LRU cache backed by SQLite in WAL mode.
+
+    Connections are opened per thread and re-opened after a fork, so an
+    instance created in a pre-fork parent is safe to use in its children.
+
+    Args:
+        path (str): SQLite file shared by all workers
+        name (str): Label used for hit/miss metrics
+        max_entries (int): Entries kept before least-recently used ones are evicted
+        default_ttl (float): Seconds an entry stays valid; None for no expiry
+        touch_interval (float): Minimum seconds between access-time updates per entry
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires REAL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access);
+    """
+
+    def __init__(self, path: str, name: str = "shared", max_entries: int = 10000,
+                 default_ttl: Optional[float] = None, touch_interval: float = 60.0):
+        self.path = path
+        self.name = name
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        conn = self._connection()
+        with conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        if os.getpid() != self._pid:
+            # Forked child: never reuse the parent's connections
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a stable cache key from JSON-serializable parts."""
+        payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value for `key`, or None if missing or expired.
+        """
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires, last_access FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < now):
+            cache_lookup(self.name, False)
+            return None
+
+        value, _, last_access = row
+        if now - last_access > self.touch_interval:
+            with conn:
+                conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        cache_lookup(self.name, True)
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Store a JSON-serializable value.
+
+        Args:
+            key (str): Cache key, see `make_key`
+            value: Value to store
+            ttl (float): Seconds until expiry; defaults to `default_ttl`
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now + ttl if ttl else None, now),
+            )
+
+        # Eviction is amortized over writes
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % 100 == 0
+        if due:
+            self.evict()
+
+    def delete(self, key: str):
+        """Remove an entry."""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def evict(self):
+        """Drop expired entries and trim to `max_entries` by least-recent access."""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "  SELECT key FROM cache ORDER BY last_access DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        """Remove every entry."""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the entry count and file size."""
+        (entries,) = self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+def shared_cache_path(name: str) -> str:
+    """Return the default SQLite path for a named shared cache (MEDIAIDE_CACHE_DIR overrides the directory)."""
+    directory = os.getenv("MEDIAIDE_CACHE_DIR", os.path.join(database_dir(), "cache"))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{name}.db")
@@ -0,0 +1,263 @@
+"""
+MediAide build snapshots
+Every dataset build is also published as one zstd-compressed tar of its
+artifacts (SQLite database, partitions, sample, column store, risk model,
+cohort index and rejects report) under src/database/snapshots/<name>/.
+
+Snapshots are content-addressed: the key is a hash of the CSV's SHA-256, the
+dataset's registry entry and the snapshot format, so a process that needs a
+build for given data first looks for that key and, if found, unpacks it
+instead of parsing the CSV and rebuilding. Artifacts are restored as plain
+files, so the column store and cohort matrix stay memory-mappable, and
+directories are installed as new versions (src/main/versions.py) like a
+rebuild's.
+
+Deploys ship the snapshot directory instead of the databases, and rolling
+back the data (or the registry) to an earlier version restores its snapshot
+without a rebuild. The newest MEDIAIDE_SNAPSHOT_KEEP snapshots per dataset
+are kept.
+
+Build snapshots ahead of a deploy and list them with:
+    python -m src.main.snapshots build [dataset ...]
+    python -m src.main.snapshots list [dataset ...]
+
+Environment:
+    MEDIAIDE_SNAPSHOTS: set to 0 to disable publishing and restoring snapshots
+    MEDIAIDE_SNAPSHOT_DIR: snapshot directory (default src/database/snapshots)
+    MEDIAIDE_SNAPSHOT_KEEP: snapshots kept per dataset (default 5)
+    MEDIAIDE_SNAPSHOT_LEVEL: zstd compression level (default 10)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tarfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import zstandard
+
+from src.main.approximate import sample_path
+from src.main.cohort import cohort_index_path
+from src.main.datasets import DATASETS, database_dir, get_dataset
+from src.main.metrics import metrics
+from src.main.partitions import partitions_path
+from src.main.risk import risk_model_path
+from src.main.store import store_path
+from src.main.validation import rejects_path
+from src.main.versions import publish_version, resolve_version
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS_ENABLED = os.getenv("MEDIAIDE_SNAPSHOTS", "1").lower() not in ("0", "false", "no")
+SNAPSHOT_KEEP = int(os.getenv("MEDIAIDE_SNAPSHOT_KEEP", "5"))
+SNAPSHOT_LEVEL = int(os.getenv("MEDIAIDE_SNAPSHOT_LEVEL", "10"))
+
+# Bump when the artifacts' layout changes so old snapshots are not restored
+SNAPSHOT_FORMAT = 2
+
+
+def snapshot_dir(dataset: str) -> str:
+    """Return the directory holding a dataset's snapshots."""
+    root = os.getenv("MEDIAIDE_SNAPSHOT_DIR") or os.path.join(database_dir(), "snapshots")
+    return os.path.join(root, dataset)
+
+
+def snapshot_key(dataset: str, signature: str) -> str:
+    """
+    Return the content address of a dataset build.
+
+    Args:
+        dataset (str): Dataset name
+        signature (str): SHA-256 of the dataset's CSV
+
+    Returns:
+        str: Hex digest over the source, the registry entry and the format
+    """
+    source = json.dumps({"format": SNAPSHOT_FORMAT, "source": signature, "dataset": get_dataset(dataset)},
+                        sort_keys=True, default=str)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def artifacts(dataset: str) -> Dict[str, str]:
+    """Return archive name -> path of every build artifact of a dataset."""
+    paths = [
+        os.path.join(database_dir(), get_dataset(dataset)['db']),
+        partitions_path(dataset),
+        sample_path(dataset),
+        store_path(dataset),
+        risk_model_path(dataset),
+        cohort_index_path(dataset),
+        rejects_path(dataset),
+    ]
+    return {os.path.basename(path): path for path in paths}
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    staging = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(staging, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(staging, path)
+
+
+def publish_snapshot(dataset: str, signature: str, rows: Optional[int] = None) -> Optional[str]:
+    """
+    Archive a dataset's current build under its content address.
+
+    Args:
+        dataset (str): Dataset name
+        signature (str): SHA-256 of the CSV the build was made from
+        rows (int): Rows in the build, recorded in the manifest
+
+    Returns:
+        Optional[str]: The snapshot key, or None if snapshots are disabled
+    """
+    if not SNAPSHOTS_ENABLED:
+        return None
+    key = snapshot_key(dataset, signature)
+    directory = snapshot_dir(dataset)
+    path = os.path.join(directory, f"{key}.tar.zst")
+    if os.path.exists(path):
+        return key
+    os.makedirs(directory, exist_ok=True)
+
+    staging = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    names = []
+    with metrics.timer("snapshot.publish_seconds", dataset=dataset):
+        with open(staging, "wb") as f:
+            compressor = zstandard.ZstdCompressor(level=SNAPSHOT_LEVEL, threads=-1)
+            with compressor.stream_writer(f, closefd=False) as compressed:
+                with tarfile.open(fileobj=compressed, mode="w|") as tar:
+                    for name, artifact in artifacts(dataset).items():
+                        if os.path.exists(artifact):
+                            # Archive the current version's files, not the symlink to them
+                            tar.add(resolve_version(artifact), arcname=name)
+                            names.append(name)
+        os.replace(staging, path)
+
+    size = os.path.getsize(path)
+    _write_json(os.path.join(directory, f"{key}.json"), {
+        "dataset": dataset,
+        "key": key,
+        "source": signature,
+        "rows": rows,
+        "format": SNAPSHOT_FORMAT,
+        "created": time.time(),
+        "bytes": size,
+        "artifacts": names,
+    })
+    metrics.inc("snapshot.published", dataset=dataset)
+    metrics.inc("snapshot.bytes", size, dataset=dataset)
+    logger.info(f"📦 Published snapshot {key[:12]} of '{dataset}' ({size / 2**20:.1f} MB)")
+    prune_snapshots(dataset)
+    return key
+
+
+def _swap(source: str, target: str):
+    """Move a restored artifact into place; directories are published as a new version."""
+    if os.path.isdir(source):
+        publish_version(source, target)
+    else:
+        os.replace(source, target)
+
+
+def restore_snapshot(dataset: str, signature: str) -> Optional[Dict[str, Any]]:
+    """
+    Install the snapshot built from a CSV signature, if one exists.
+
+    The archive is unpacked next to the live artifacts and each one is
+    renamed into place, as a rebuild would.
+
+    Args:
+        dataset (str): Dataset name
+        signature (str): SHA-256 of the dataset's CSV
+
+    Returns:
+        Optional[Dict[str, Any]]: The snapshot's manifest, or None if there is no snapshot
+    """
+    if not SNAPSHOTS_ENABLED:
+        return None
+    key = snapshot_key(dataset, signature)
+    path = os.path.join(snapshot_dir(dataset), f"{key}.tar.zst")
+    if not os.path.exists(path):
+        metrics.inc("snapshot.misses", dataset=dataset)
+        return None
+
+    expected = artifacts(dataset)
+    staging = os.path.join(database_dir(), f"{dataset}.restore-{os.getpid()}-{threading.get_ident()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        with metrics.timer("snapshot.restore_seconds", dataset=dataset):
+            with open(path, "rb") as f:
+                with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                    with tarfile.open(fileobj=reader, mode="r|") as tar:
+                        tar.extractall(staging, filter="data")
+            for name in os.listdir(staging):
+                if name in expected:
+                    _swap(os.path.join(staging, name), expected[name])
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    try:
+        with open(os.path.join(snapshot_dir(dataset), f"{key}.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {"dataset": dataset, "key": key, "source": signature, "rows": None}
+    metrics.inc("snapshot.restores", dataset=dataset)
+    logger.info(f"📦 Restored '{dataset}' from snapshot {key[:12]}")
+    return manifest
+
+
+def list_snapshots(dataset: str) -> List[Dict[str, Any]]:
+    """Return the manifests of a dataset's snapshots, newest first."""
+    directory = snapshot_dir(dataset)
+    manifests = []
+    for name in os.listdir(directory) if os.path.isdir(directory) else []:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(manifests, key=lambda manifest: manifest.get("created", 0), reverse=True)
+
+
+def prune_snapshots(dataset: str, keep: int = SNAPSHOT_KEEP):
+    """Delete all but the newest `keep` snapshots of a dataset."""
+    for manifest in list_snapshots(dataset)[keep:]:
+        for suffix in (".tar.zst", ".json"):
+            try:
+                os.remove(os.path.join(snapshot_dir(dataset), f"{manifest['key']}{suffix}"))
+            except OSError:
+                pass
+
+
+def main(argv: Optional[List[str]] = None):
+    """Build or list snapshots for the given datasets (default: all)."""
+    # reload publishes through this module, so it is imported only for the CLI
+    from src.main.reload import read_version, reload_dataset
+
+    argv = sys.argv[1:] if argv is None else argv
+    command, datasets = (argv[0] if argv else "list"), (argv[1:] or list(DATASETS))
+    for dataset in datasets:
+        if command == "build":
+            reload_dataset(dataset)
+            version = read_version(dataset)
+            publish_snapshot(dataset, version["signature"], version.get("rows"))
+        elif command != "list":
+            print(f"❓ Unknown command: {command}. Use 'build' or 'list'.")
+            return
+        print(f"📦 {get_dataset(dataset)['label']}:")
+        for manifest in list_snapshots(dataset):
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(manifest.get("created", 0)))
+            print(f"  • {manifest['key'][:12]}  {created}  {manifest.get('rows')} rows  "
+                  f"{manifest.get('bytes', 0) / 2**20:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
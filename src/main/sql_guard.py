@@ -0,0 +1,235 @@
+"""
+MediAide guarded SQL execution
+Bounded execution for agent- and client-issued queries: results are read
+through a streaming cursor and never materialized past a row limit, the true
+row count and column summaries are computed inside the database, and full
+results can be paged through with keyset (rowid) pagination where the query
+allows it and LIMIT/OFFSET otherwise.
+
+Environment:
+    MEDIAIDE_SQL_PAGE_SIZE: default rows per page (default 100)
+    MEDIAIDE_SQL_MAX_PAGE_SIZE: largest page a caller may request (default 1000)
+"""
+
+import base64
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from src.main.datasets import database_dir, get_dataset
+
+PAGE_SIZE = int(os.getenv("MEDIAIDE_SQL_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MEDIAIDE_SQL_MAX_PAGE_SIZE", "1000"))
+
+ROWID_COLUMN = "__mediaide_rowid__"
+
+# Single-table selects without grouping, ordering or limits can be paged by rowid
+_SIMPLE_SELECT = re.compile(
+    r"^\s*select\s+(?P<columns>.+?)\s+from\s+(?P<table>\w+|\"[^\"]+\")"
+    r"(?:\s+where\s+(?P<where>.+?))?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+_NOT_KEYSET = re.compile(
+    r"\b(group\s+by|order\s+by|limit|offset|union|intersect|except|join|having|distinct)\b|"
+    r"\b(count|sum|avg|min|max|total|group_concat)\s*\(|\(\s*select\b",
+    re.IGNORECASE,
+)
+_READ_ONLY = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+
+
+class QueryRejected(ValueError):
+    """Raised when a statement may not be run through the paging API."""
+
+
+def clean_statement(sql: str) -> str:
+    """Strip whitespace and a trailing semicolon."""
+    return sql.strip().rstrip(";").strip()
+
+
+def check_read_only(sql: str) -> str:
+    """
+    Return the cleaned statement if it is a single SELECT.
+
+    Raises:
+        QueryRejected: For writes or multiple statements
+    """
+    statement = clean_statement(sql)
+    if not _READ_ONLY.match(statement) or ";" in statement:
+        raise QueryRejected("Only a single SELECT statement can be paged")
+    return statement
+
+
+def quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def write_table(path: str, table: str, df, indexes: List[List[str]] = ()):
+    """Write a DataFrame to a new SQLite file as `table` and create its indexes."""
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        df.to_sql(table, engine, index=False, if_exists='replace')
+        with engine.begin() as conn:
+            for columns in indexes:
+                name = f"ix_{table}_{'_'.join(columns)}"
+                conn.execute(text(f"CREATE INDEX {quote(name)} ON {quote(table)} "
+                                  f"({', '.join(quote(column) for column in columns)})"))
+    finally:
+        engine.dispose()
+
+
+def execute_limited(conn: Connection, sql: str, limit: int,
+                    parameters: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Run a statement and read at most `limit` rows through a streaming cursor.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], bool]: The rows and whether more were available
+    """
+    result = conn.execution_options(stream_results=True).execute(text(sql), parameters or {})
+    if not result.returns_rows:
+        return [], False
+    try:
+        rows = [dict(row) for row in result.mappings().fetchmany(limit + 1)]
+    finally:
+        result.close()
+    return rows[:limit], len(rows) > limit
+
+
+def count_rows(conn: Connection, sql: str, parameters: Optional[Dict[str, Any]] = None) -> int:
+    """Count a statement's rows inside the database."""
+    return conn.execute(text(f"SELECT COUNT(*) FROM ({clean_statement(sql)})"), parameters or {}).scalar()
+
+
+def summarize_columns(conn: Connection, sql: str, columns: List[str],
+                      parameters: Optional[Dict[str, Any]] = None) -> str:
+    """Describe numeric columns of the full result as min/max/mean, computed in the database."""
+    if not columns:
+        return ""
+    selects = ", ".join(f"MIN({quote(c)}), MAX({quote(c)}), AVG({quote(c)})" for c in columns)
+    values = conn.execute(text(f"SELECT {selects} FROM ({clean_statement(sql)})"), parameters or {}).one()
+    parts = []
+    for i, column in enumerate(columns):
+        low, high, mean = values[3 * i:3 * i + 3]
+        if mean is not None:
+            parts.append(f"{column}: min {low:g}, max {high:g}, mean {mean:.4g}")
+    return "; ".join(parts)
+
+
+def summarize_rows(rows: List[Dict[str, Any]], columns: List[str]) -> str:
+    """Describe numeric columns of a result already in memory, like summarize_columns."""
+    parts = []
+    for column in columns:
+        values = [row[column] for row in rows
+                  if isinstance(row[column], (int, float)) and not isinstance(row[column], bool)]
+        if values:
+            parts.append(f"{column}: min {min(values):g}, max {max(values):g}, mean {sum(values) / len(values):.4g}")
+    return "; ".join(parts)
+
+
+def keyset_query(sql: str) -> Optional[str]:
+    """
+    Rewrite a simple single-table SELECT for rowid keyset pagination.
+
+    Returns:
+        Optional[str]: A statement taking :after, :offset and :limit, or None
+            if the query cannot be paged by rowid
+    """
+    statement = clean_statement(sql)
+    match = _SIMPLE_SELECT.match(statement)
+    if not match or _NOT_KEYSET.search(statement):
+        return None
+    where = f"({match['where']}) AND " if match["where"] else ""
+    return (f"SELECT rowid AS {ROWID_COLUMN}, {match['columns']} FROM {match['table']} "
+            f"WHERE {where}rowid > :after ORDER BY rowid LIMIT :limit OFFSET :offset")
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    Decode a page cursor; None starts at the first row.
+
+    Raises:
+        QueryRejected: If the cursor is malformed
+    """
+    if not cursor:
+        return {"offset": 0}
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise QueryRejected("Invalid cursor")
+    if not isinstance(state, dict) or not ({"after", "offset"} & state.keys()):
+        raise QueryRejected("Invalid cursor")
+    return state
+
+
+def fetch_page(conn: Connection, sql: str, cursor: Optional[str] = None,
+               page_size: int = PAGE_SIZE) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page of a SELECT's result.
+
+    Simple single-table selects are paged by rowid, so each page is an index
+    seek however deep it is. Other queries fall back to LIMIT/OFFSET. A
+    cursor of the form {"offset": n} (as returned with truncated agent
+    results) is accepted for either.
+
+    Args:
+        conn (Connection): Open connection
+        sql (str): The SELECT statement
+        cursor (str): Cursor from a previous page, or None for the first
+        page_size (int): Rows per page, capped at MAX_PAGE_SIZE
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str]]: Rows and the next cursor (None on the last page)
+    """
+    statement = check_read_only(sql)
+    state = decode_cursor(cursor)
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    keyset = keyset_query(statement)
+
+    if keyset is not None:
+        params = {"after": state.get("after", -2**63), "offset": state.get("offset", 0), "limit": page_size + 1}
+        rows, more = execute_limited(conn, keyset, page_size, params)
+        last = rows[-1][ROWID_COLUMN] if rows else None
+        for row in rows:
+            del row[ROWID_COLUMN]
+        return rows, encode_cursor({"after": last}) if more else None
+
+    offset = int(state.get("offset", 0))
+    rows, more = execute_limited(
+        conn, f"SELECT * FROM ({statement}) LIMIT :limit OFFSET :offset",
+        page_size, {"limit": page_size + 1, "offset": offset}
+    )
+    return rows, encode_cursor({"offset": offset + len(rows)}) if more else None
+
+
+_readonly_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def readonly_engine(dataset: str) -> Engine:
+    """Return a cached engine opening the dataset's SQLite file read-only."""
+    engine = _readonly_engines.get(dataset)
+    if engine is None:
+        with _engines_lock:
+            engine = _readonly_engines.get(dataset)
+            if engine is None:
+                path = os.path.join(database_dir(), get_dataset(dataset)['db'])
+                engine = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true")
+                _readonly_engines[dataset] = engine
+    return engine
+
+
+def invalidate_engine(dataset: str):
+    """Close the dataset's read-only engine so new connections open the current file."""
+    with _engines_lock:
+        engine = _readonly_engines.pop(dataset, None)
+    if engine is not None:
+        engine.dispose()
@@ -0,0 +1,206 @@
+"""
+MediAide column store
+Compact, column-major binary copies of the datasets. Each column is written
+as its own .npy file with the smallest adequate dtype (int8 for flags,
+float32 for measurements) and opened with mmap, so every process reading
+the store shares the same page-cache pages instead of holding its own copy.
+
+Each build is a new version directory published with an atomic symlink
+swap (src/main/versions.py), so workers opening the store while it is
+rebuilt see either the old or the new store, never none.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Any, List, Optional
+import numpy as np
+import pandas as pd
+
+from src.main.datasets import database_dir
+from src.main.metrics import cache_lookup
+from src.main.validation import load_validated
+from src.main.versions import publish_version, resolve_version, staging_dir
+
+
+MANIFEST_NAME = "manifest.json"
+OPEN_ATTEMPTS = 5
+
+
+def smallest_dtype(values: np.ndarray) -> np.dtype:
+    """
+    Pick the smallest dtype that holds a numeric column without loss.
+
+    Integer columns get the narrowest signed integer type covering their range;
+    floating point columns are stored as float32.
+
+    Args:
+        values (np.ndarray): Column values
+
+    Returns:
+        np.dtype: The chosen dtype
+    """
+    if np.issubdtype(values.dtype, np.bool_):
+        return np.dtype(np.int8)
+    if np.issubdtype(values.dtype, np.integer):
+        if len(values) == 0:
+            return np.dtype(np.int8)
+        low, high = values.min(), values.max()
+        for dtype in (np.int8, np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype)
+        return np.dtype(np.int64)
+    if np.issubdtype(values.dtype, np.floating):
+        return np.dtype(np.float32)
+    raise TypeError(f"Column of dtype {values.dtype} is not numeric")
+
+
+def column_values(column: pd.Series) -> np.ndarray:
+    """Return a column as a NumPy array; nullable integers become floats with NaN for missing values."""
+    if isinstance(column.dtype, pd.api.extensions.ExtensionDtype):
+        return column.to_numpy(dtype=np.float64, na_value=np.nan)
+    return column.to_numpy()
+
+
+def downcast_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of `df` with every column cast to its smallest adequate dtype."""
+    columns = {}
+    for col in df.columns:
+        values = column_values(df[col])
+        columns[col] = values.astype(smallest_dtype(values), copy=False)
+    return pd.DataFrame(columns, columns=df.columns)
+
+
+def store_path(dataset: str) -> str:
+    """Return the path of a dataset's column store (a symlink to its current version)."""
+    return os.path.join(database_dir(), f"{dataset}_store")
+
+
+def write_store(dataset: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Write a dataset as one typed .npy file per column plus a JSON manifest.
+
+    The store is written to a new version directory and published with an
+    atomic symlink swap, so readers never see a partial or missing store.
+
+    Args:
+        dataset (str): Dataset name
+        df (pd.DataFrame): Dataset contents
+
+    Returns:
+        Dict[str, Any]: The manifest that was written
+    """
+    staging = staging_dir(store_path(dataset))
+
+    columns = []
+    for position, col in enumerate(df.columns):
+        values = column_values(df[col])
+        values = np.ascontiguousarray(values.astype(smallest_dtype(values), copy=False))
+        filename = f"{position:03d}.npy"
+        np.save(os.path.join(staging, filename), values)
+        columns.append({"name": col, "dtype": values.dtype.str, "file": filename})
+
+    manifest = {"dataset": dataset, "rows": len(df), "columns": columns}
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Processes that already mapped the old version keep reading valid pages
+    publish_version(staging, store_path(dataset))
+
+    with _stores_lock:
+        _stores.pop(dataset, None)
+    return manifest
+
+
+class ColumnStore:
+    """
+    Read-only, memory-mapped view of a dataset's column store.
+
+    Every column of one store version is mapped when the store is opened
+    (mapping reads only the headers) and never copied, so the returned arrays
+    are zero-copy views over the shared page cache that stay valid after a
+    rebuild deletes the version.
+    """
+
+    def __init__(self, path: str):
+        self.path = resolve_version(path)
+        with open(os.path.join(self.path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        self.rows: int = self.manifest["rows"]
+        self.columns: List[str] = [c["name"] for c in self.manifest["columns"]]
+        self._arrays: Dict[str, np.ndarray] = {
+            c["name"]: np.load(os.path.join(self.path, c["file"]), mmap_mode='r')
+            for c in self.manifest["columns"]
+        }
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        array = self._arrays.get(column)
+        if array is None:
+            raise KeyError(f"Unknown column '{column}'. Available: {', '.join(self.columns)}")
+        return array
+
+    def dtypes(self) -> Dict[str, str]:
+        """Return the stored dtype of every column."""
+        return {c["name"]: np.dtype(c["dtype"]).name for c in self.manifest["columns"]}
+
+    def matrix(self, columns: Optional[List[str]] = None, dtype=np.float32) -> np.ndarray:
+        """
+        Stack columns into a row-major (rows, len(columns)) matrix.
+
+        This materializes a new array; use column access for zero-copy reads.
+        """
+        columns = columns or self.columns
+        out = np.empty((self.rows, len(columns)), dtype=dtype)
+        for i, col in enumerate(columns):
+            out[:, i] = self[col]
+        return out
+
+    def to_frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Build a DataFrame from the stored columns, keeping the compact dtypes."""
+        columns = columns or self.columns
+        return pd.DataFrame({col: np.asarray(self[col]) for col in columns}, columns=columns)
+
+
+_stores: Dict[str, ColumnStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(dataset: str) -> ColumnStore:
+    """
+    Return the memory-mapped column store for a dataset, building it from the CSV if missing.
+
+    Args:
+        dataset (str): Dataset name
+
+    Returns:
+        ColumnStore: The cached store
+    """
+    store = _stores.get(dataset)
+    cache_lookup("column_store", store is not None)
+    if store is not None:
+        return store
+
+    path = store_path(dataset)
+    if not os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        write_store(dataset, load_validated(dataset))
+    for attempt in range(OPEN_ATTEMPTS):
+        try:
+            store = ColumnStore(path)
+            break
+        except FileNotFoundError:
+            # A rebuild deleted the version between resolving and mapping it
+            if attempt == OPEN_ATTEMPTS - 1:
+                raise
+    with _stores_lock:
+        _stores[dataset] = store
+    return store
+
+
+def invalidate_store(dataset: str):
+    """Drop the cached store so the next `open_store` maps the files on disk again."""
+    with _stores_lock:
+        _stores.pop(dataset, None)
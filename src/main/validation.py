@@ -0,0 +1,228 @@
+"""
+MediAide ingestion validation
+Every dataset CSV is validated before it is written to SQLite and the derived
+artifacts. The registry declares each column's compact storage dtype
+(`dtypes`) and its rules (`schema`):
+
+    schema:
+      Insulin: {min: 0, max: 1200, missing: [0]}
+
+Numeric columns are parsed as float64 and checked with vectorized NumPy
+operations: missing-value codes become NULL, and a row is rejected if a value
+is not a number, missing in a non-nullable column, outside [min, max],
+fractional in an integer column or too large for its storage dtype. Accepted
+rows are downcast to the declared dtypes.
+
+Rejected rows are listed in src/database/<name>_rejects.csv with their CSV
+line, column, value and reason.
+"""
+
+import io
+import logging
+import os
+import threading
+from typing import List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pyprojroot import here
+
+from src.main.datasets import database_dir, get_dataset, parse_dtypes
+from src.main.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+REJECT_COLUMNS = ["line", "column", "value", "reason"]
+
+
+def rejects_path(dataset: str) -> str:
+    """Return the path of a dataset's rejected rows report."""
+    return os.path.join(database_dir(), f"{dataset}_rejects.csv")
+
+
+def read_csv(dataset: str, source: Union[str, io.BytesIO, None] = None) -> pd.DataFrame:
+    """
+    Parse a dataset CSV for validation.
+
+    Integer columns are parsed as int64, the fastest path. If one holds blanks
+    or fractions they are parsed as float64, and if a numeric column holds
+    text, numeric columns are parsed as text for validate() to reject it.
+
+    Args:
+        dataset (str): Dataset name
+        source: CSV path or buffer, defaults to the dataset's CSV
+
+    Returns:
+        pd.DataFrame: The parsed rows
+    """
+    source = source if source is not None else here(get_dataset(dataset)['csv'])
+    dtypes = parse_dtypes(dataset)
+    fallbacks = [
+        {column: 'float64' if dtype == 'int64' else dtype for column, dtype in dtypes.items()},
+        {column: object if dtype in ('int64', 'float64') else dtype for column, dtype in dtypes.items()},
+    ]
+    for attempt in [dtypes, *fallbacks]:
+        try:
+            return pd.read_csv(source, dtype=attempt or None)
+        except ValueError:
+            if attempt is fallbacks[-1]:
+                raise
+            if hasattr(source, "seek"):
+                source.seek(0)
+
+
+def validate(dataset: str, df: pd.DataFrame, first_line: int = 2) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Validate parsed rows against a dataset's schema and downcast them.
+
+    Each check is a reduction over the whole column first (min, max, sum);
+    per-row masks are only built for columns that fail it, so clean data
+    costs a few passes per column.
+
+    Args:
+        dataset (str): Dataset name
+        df (pd.DataFrame): Rows from read_csv()
+        first_line (int): CSV line number of the first row, for the report
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The accepted rows with the declared
+            dtypes, and one report row per rejected value
+    """
+    info = get_dataset(dataset)
+    rejected = np.zeros(len(df), dtype=bool)
+    problems: List[Tuple[np.ndarray, str, str]] = []
+    columns = {column: df[column] for column in df.columns}
+
+    def flag(mask: np.ndarray, column: str, reason: str):
+        if mask.any():
+            problems.append((mask, column, reason))
+            np.logical_or(rejected, mask, out=rejected)
+
+    for column, dtype in info['dtypes'].items():
+        if column not in df.columns:
+            raise ValueError(f"Dataset '{dataset}' has no column '{column}'")
+        target = pd.api.types.pandas_dtype(dtype)
+        if not pd.api.types.is_numeric_dtype(target):
+            columns[column] = df[column].astype(target)
+            continue
+        rules = info['schema'].get(column) or {'min': None, 'max': None, 'missing': [], 'nullable': False}
+
+        values = df[column]
+        if values.dtype == object:
+            parsed = pd.to_numeric(values, errors="coerce")
+            flag((parsed.isna() & values.notna()).to_numpy(), column, "not a number")
+            values = parsed
+        x = values.to_numpy()
+        integral = x.dtype.kind in "iu"
+        if not integral:
+            x = x.astype(np.float64, copy=False)
+
+        # Whole-column reductions first; a float sum is NaN only if some value is
+        low, high = (x.min(), x.max()) if integral else (np.fmin.reduce(x), np.fmax.reduce(x))
+        missing = None
+        for code in rules['missing']:
+            if low <= code <= high:
+                coded = x == code
+                missing = coded if missing is None else missing | coded
+        if missing is not None and not missing.any():
+            missing = None
+        if not integral and np.isnan(x.sum()):
+            missing = np.isnan(x) if missing is None else missing | np.isnan(x)
+        if missing is not None and not rules['nullable']:
+            flag(missing, column, "missing")
+        present = ~missing if missing is not None else True
+        if rules['min'] is not None and low < rules['min']:
+            flag((x < rules['min']) & present, column, f"below minimum {rules['min']}")
+        if rules['max'] is not None and high > rules['max']:
+            flag((x > rules['max']) & present, column, f"above maximum {rules['max']}")
+
+        if pd.api.types.is_integer_dtype(target):
+            storage = target.numpy_dtype if isinstance(target, pd.api.extensions.ExtensionDtype) else target
+            limits = np.iinfo(storage)
+            if integral:
+                if low < limits.min or high > limits.max:
+                    flag(((x < limits.min) | (x > limits.max)) & present, column, f"does not fit {storage}")
+                data = x.astype(storage)
+            else:
+                with np.errstate(invalid="ignore"):
+                    data = x.astype(storage)
+                # Fractional values and values outside the dtype's range don't survive the cast
+                lost = (data != x) & present
+                if lost.any():
+                    fits = (x >= limits.min) & (x <= limits.max)
+                    flag(lost & fits, column, "not an integer")
+                    flag(lost & ~fits, column, f"does not fit {storage}")
+            if rules['nullable'] or isinstance(target, pd.api.extensions.ExtensionDtype):
+                mask = missing if missing is not None else np.zeros(len(x), dtype=bool)
+                columns[column] = pd.arrays.IntegerArray(data, mask)
+            else:
+                columns[column] = data
+        else:
+            if missing is not None:
+                x = np.where(missing, np.nan, x)
+            columns[column] = x.astype(target, copy=False)
+
+    report = _report(df, problems, first_line)
+    if rejected.any():
+        keep = ~rejected
+        columns = {column: values[keep] if isinstance(values, (np.ndarray, pd.api.extensions.ExtensionArray))
+                   else values.to_numpy()[keep] for column, values in columns.items()}
+    return pd.DataFrame({column: pd.Series(values, copy=False) for column, values in columns.items()},
+                        copy=False), report
+
+
+def _report(df: pd.DataFrame, problems: List[Tuple[np.ndarray, str, str]], first_line: int) -> pd.DataFrame:
+    """Build the rejected values report, ordered by CSV line."""
+    if not problems:
+        return pd.DataFrame(columns=REJECT_COLUMNS)
+    parts = []
+    for mask, column, reason in problems:
+        rows = np.flatnonzero(mask)
+        parts.append(pd.DataFrame({
+            "line": rows + first_line,
+            "column": column,
+            "value": df[column].to_numpy()[rows],
+            "reason": reason,
+        }))
+    return pd.concat(parts, ignore_index=True).sort_values("line", kind="stable", ignore_index=True)
+
+
+def write_rejects(dataset: str, report: pd.DataFrame) -> str:
+    """Replace a dataset's rejected rows report. Returns its path."""
+    path = rejects_path(dataset)
+    staging = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    report.to_csv(staging, index=False)
+    os.replace(staging, path)
+    return path
+
+
+def load_rejects(dataset: str) -> pd.DataFrame:
+    """Return the rejected rows report of a dataset's last ingestion (empty if none)."""
+    try:
+        return pd.read_csv(rejects_path(dataset))
+    except (OSError, pd.errors.EmptyDataError):
+        return pd.DataFrame(columns=REJECT_COLUMNS)
+
+
+def load_validated(dataset: str) -> pd.DataFrame:
+    """
+    Ingest a dataset's CSV: parse, validate and downcast it, and write the
+    rejected rows report.
+
+    Args:
+        dataset (str): Dataset name
+
+    Returns:
+        pd.DataFrame: The accepted rows with the declared dtypes
+    """
+    with metrics.timer("ingest.seconds", dataset=dataset):
+        df = read_csv(dataset)
+        clean, report = validate(dataset, df)
+    write_rejects(dataset, report)
+
+    rejected = len(df) - len(clean)
+    metrics.inc("ingest.rows", len(df), dataset=dataset)
+    metrics.inc("ingest.rejected_rows", rejected, dataset=dataset)
+    if rejected:
+        logger.warning(f"⚠️ Rejected {rejected} of {len(df)} rows of '{dataset}', see {rejects_path(dataset)}")
+    return clean
@@ -0,0 +1,65 @@
+"""
+MediAide versioned artifact directories
+Build artifacts made of several files (column store, partitions, cohort
+index) are written to a fresh version directory next to their path, e.g.
+src/database/diabetes_store.v-<id>/, and published by atomically replacing
+a symlink at the artifact's path with one pointing to the new version. A
+reader resolving the path always gets one complete version; there is no
+moment at which the path is missing or mixes files of two builds.
+
+Readers resolve the symlink once (resolve_version) and read every file of
+the artifact from that directory. The replaced version is deleted after the
+swap: files a process has already opened or memory-mapped stay readable,
+so readers open everything they need when they resolve the version.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+
+def staging_dir(target: str) -> str:
+    """Create and return an empty side directory to write a new version of `target` into."""
+    staging = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    return staging
+
+
+def publish_version(staging: str, target: str) -> str:
+    """
+    Make a completely written directory the current version of `target`.
+
+    Args:
+        staging (str): Directory holding the new version, e.g. from staging_dir()
+        target (str): Artifact path; becomes a symlink to the new version
+
+    Returns:
+        str: The new version's directory
+    """
+    version = f"{target}.v-{time.time_ns():x}-{os.getpid()}-{threading.get_ident()}"
+    os.replace(staging, version)
+    previous = os.path.realpath(target) if os.path.islink(target) else None
+
+    link = f"{target}.link-{os.getpid()}-{threading.get_ident()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version), link)
+
+    legacy = None
+    if os.path.isdir(target) and not os.path.islink(target):
+        # A plain directory from before versioning; rename() cannot replace it with a link
+        legacy = f"{target}.old-{os.getpid()}-{threading.get_ident()}"
+        os.replace(target, legacy)
+    os.replace(link, target)
+
+    for retired in (previous, legacy):
+        if retired and retired != version:
+            shutil.rmtree(retired, ignore_errors=True)
+    return version
+
+
+def resolve_version(target: str) -> str:
+    """Return the directory of the current version of `target` (the path itself if unversioned)."""
+    return os.path.realpath(target)
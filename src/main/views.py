@@ -0,0 +1,243 @@
+"""
+MediAide materialized views
+Cohort breakdowns (outcome by age band and sex, diagnosis by smoking and
+genetic risk, ...) are declared once per dataset in the registry and stored as
+pre-aggregated tables, mv_<name>, inside the dataset's database. Each row holds
+one combination of the view's dimensions with its row count and, per measure
+column, SUM, COUNT, MIN and MAX.
+
+Views are created with the database. When rows are appended to a dataset's
+CSV, refresh_views() adds the new rows' aggregates to the existing ones
+instead of recomputing them.
+
+rewrite_query() transparently answers a GROUP BY query from the smallest view
+covering its groups, filters and aggregates, e.g.
+    SELECT Outcome, COUNT(*), AVG(Glucose) FROM diabetes WHERE Outcome = 1 GROUP BY Outcome
+becomes
+    SELECT "Outcome" AS "Outcome", COALESCE(SUM(n_rows), 0) AS "COUNT(*)", ...
+    FROM "mv_diabetes_by_age_band" WHERE Outcome = 1 GROUP BY "Outcome"
+Any other statement runs unchanged.
+
+Registry example:
+    views:
+      - name: diabetes_by_age_band
+        dimensions:
+          age_band: "Age / 10 * 10"
+          Outcome: Outcome
+        measures: [Glucose, BMI]
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from src.main.datasets import get_dataset
+from src.main.metrics import metrics
+from src.main.partitions import normalize_expr, parse_select, replace_aggregates
+from src.main.sql_guard import quote
+
+logger = logging.getLogger(__name__)
+
+ROWS_COLUMN = "n_rows"
+_STATISTICS = ("sum", "cnt", "min", "max")
+_FILTER_WORDS = {"and", "or", "not", "in", "between", "is", "null", "like", "glob", "true", "false"}
+
+
+def view_table(view: Dict[str, Any]) -> str:
+    """Return the table name a view is materialized as."""
+    return f"mv_{view['name']}"
+
+
+def aggregate_select(view: Dict[str, Any], source: str) -> str:
+    """SELECT computing a view's rows from the rows of `source`."""
+    columns = [f"{expr} AS {quote(name)}" for name, expr in view['dimensions'].items()]
+    columns.append(f"COUNT(*) AS {ROWS_COLUMN}")
+    for measure in view['measures']:
+        columns += [f"SUM({quote(measure)}) AS {quote('sum_' + measure)}",
+                    f"COUNT({quote(measure)}) AS {quote('cnt_' + measure)}",
+                    f"MIN({quote(measure)}) AS {quote('min_' + measure)}",
+                    f"MAX({quote(measure)}) AS {quote('max_' + measure)}"]
+    # WHERE 1 keeps the upsert's ON CONFLICT from being parsed as a join constraint
+    return (f"SELECT {', '.join(columns)} FROM {source} WHERE 1 "
+            f"GROUP BY {', '.join(view['dimensions'].values())}")
+
+
+def create_views(conn: sqlite3.Connection, dataset: str):
+    """
+    Materialize a dataset's views from its table.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database being built
+        dataset (str): Dataset name
+    """
+    info = get_dataset(dataset)
+    for view in info['views']:
+        table = view_table(view)
+        with metrics.timer("views.build_seconds", view=view['name']):
+            conn.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+            conn.execute(f"CREATE TABLE {quote(table)} AS {aggregate_select(view, quote(info['table']))}")
+            conn.execute(f"CREATE UNIQUE INDEX {quote('ux_' + table)} ON {quote(table)} "
+                         f"({', '.join(quote(name) for name in view['dimensions'])})")
+    conn.commit()
+
+
+def refresh_views(conn: sqlite3.Connection, dataset: str, source: str):
+    """
+    Add the aggregates of newly inserted rows to a dataset's views.
+
+    Runs inside the caller's transaction, so the rows and the views are
+    updated together.
+
+    Args:
+        conn (sqlite3.Connection): Connection with an open transaction
+        dataset (str): Dataset name
+        source (str): Table holding only the new rows
+    """
+    for view in get_dataset(dataset)['views']:
+        updates = [f"{ROWS_COLUMN} = {ROWS_COLUMN} + excluded.{ROWS_COLUMN}"]
+        for measure in view['measures']:
+            total, count, low, high = (quote(f"{s}_{measure}") for s in _STATISTICS)
+            updates += [f"{total} = COALESCE({total} + excluded.{total}, {total}, excluded.{total})",
+                        f"{count} = {count} + excluded.{count}",
+                        f"{low} = COALESCE(MIN({low}, excluded.{low}), {low}, excluded.{low})",
+                        f"{high} = COALESCE(MAX({high}, excluded.{high}), {high}, excluded.{high})"]
+        conn.execute(f"INSERT INTO {quote(view_table(view))} {aggregate_select(view, source)} "
+                     f"ON CONFLICT ({', '.join(quote(name) for name in view['dimensions'])}) "
+                     f"DO UPDATE SET {', '.join(updates)}")
+        metrics.inc("views.refreshes", view=view['name'])
+
+
+_sizes: Dict[str, Dict[str, int]] = {}
+_sizes_lock = threading.Lock()
+
+
+def view_sizes(dataset: str, path: str) -> Dict[str, int]:
+    """Return the cached row count of each of a dataset's views (missing views are left out)."""
+    sizes = _sizes.get(dataset)
+    if sizes is None:
+        sizes = {}
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for view in get_dataset(dataset)['views']:
+                try:
+                    sizes[view['name']] = conn.execute(f"SELECT COUNT(*) FROM {quote(view_table(view))}").fetchone()[0]
+                except sqlite3.Error:
+                    continue
+        finally:
+            conn.close()
+        with _sizes_lock:
+            _sizes[dataset] = sizes
+    return sizes
+
+
+def invalidate_views(dataset: str):
+    """Drop the cached view sizes so the next query reads the database on disk again."""
+    with _sizes_lock:
+        _sizes.pop(dataset, None)
+
+
+def filter_words(where: str) -> set:
+    """Return the lower-cased identifiers a WHERE condition uses, without SQL keywords and strings."""
+    words = set(re.findall(r"[a-z_]\w*", re.sub(r"'[^']*'", "", where.lower().replace('"', ""))))
+    return words - _FILTER_WORDS
+
+
+def rewrite_for_view(query, view: Dict[str, Any]) -> Optional[str]:
+    """Rewrite a parsed query against one view, or return None if the view does not cover it."""
+    dimensions = {normalize_expr(expr): name for name, expr in view['dimensions'].items()}
+    columns = {name.lower() for name, expr in view['dimensions'].items()
+               if normalize_expr(expr) == normalize_expr(name)}
+    measures = {measure.lower(): measure for measure in view['measures']}
+
+    # Filters may only use plain column dimensions, which keep their names in the view
+    if query.where and filter_words(query.where) - columns:
+        return None
+
+    def aggregate(function: str, argument: str) -> str:
+        key = normalize_expr(argument)
+        if key == "*" and function == "count":
+            return f"COALESCE(SUM({ROWS_COLUMN}), 0)"
+        if key in measures:
+            total, count, low, high = (quote(f"{s}_{measures[key]}") for s in _STATISTICS)
+            return {
+                "count": f"COALESCE(SUM({count}), 0)",
+                "sum": f"SUM({total})",
+                "total": f"TOTAL({total})",
+                "avg": f"(CAST(SUM({total}) AS REAL) / NULLIF(SUM({count}), 0))",
+                "min": f"MIN({low})",
+                "max": f"MAX({high})",
+            }[function]
+        if key in dimensions:
+            # Aggregates of a dimension weight each stored value by its row count
+            column = quote(dimensions[key])
+            present = f"SUM(CASE WHEN {column} IS NOT NULL THEN {ROWS_COLUMN} END)"
+            return {
+                "count": f"COALESCE({present}, 0)",
+                "sum": f"SUM({column} * {ROWS_COLUMN})",
+                "total": f"TOTAL({column} * {ROWS_COLUMN})",
+                "avg": f"(CAST(SUM({column} * {ROWS_COLUMN}) AS REAL) / NULLIF({present}, 0))",
+                "min": f"MIN({column})",
+                "max": f"MAX({column})",
+            }[function]
+        raise ValueError(f"'{argument}' is not stored in view '{view['name']}'")
+
+    def rewrite(expr: str) -> str:
+        name = dimensions.get(normalize_expr(expr))
+        if name:
+            return quote(name)
+        return replace_aggregates(expr, aggregate)
+
+    try:
+        groups = []
+        for expr in query.groups:
+            if normalize_expr(expr) not in dimensions:
+                return None
+            groups.append(quote(dimensions[normalize_expr(expr)]))
+        select = [f"{rewrite(expr)} AS {quote(name)}" for expr, name in query.items]
+        orders = []
+        for expr, direction in query.orders:
+            name = query.output_name(expr)
+            orders.append(f"{quote(name) if name else rewrite(expr)}{direction or ''}")
+    except ValueError:
+        return None
+
+    where = f" WHERE {query.where}" if query.where else ""
+    group_by = f" GROUP BY {', '.join(groups)}" if groups else ""
+    order_by = f" ORDER BY {', '.join(orders)}" if orders else ""
+    limit = f" LIMIT {query.limit}" if query.limit else ""
+    return f"SELECT {', '.join(select)} FROM {quote(view_table(view))}{where}{group_by}{order_by}{limit}"
+
+
+def rewrite_query(dataset: str, sql: str, path: str) -> Optional[str]:
+    """
+    Rewrite an aggregate query to read from a materialized view.
+
+    Args:
+        dataset (str): Dataset name
+        sql (str): SELECT statement against the dataset's table
+        path (str): Dataset database holding the views
+
+    Returns:
+        Optional[str]: Equivalent statement on the smallest covering view, or
+            None when no view answers the query exactly
+    """
+    info = get_dataset(dataset)
+    if not info['views']:
+        return None
+    query = parse_select(sql, info['table'])
+    if query is None or not query.has_aggregates:
+        return None
+    if any(expr == "*" or expr.endswith(".*") for expr, _ in query.items):
+        return None
+
+    sizes = view_sizes(dataset, path)
+    for view in sorted((v for v in info['views'] if v['name'] in sizes), key=lambda v: sizes[v['name']]):
+        rewritten = rewrite_for_view(query, view)
+        if rewritten is not None:
+            metrics.inc("views.hits", view=view['name'])
+            logger.debug(f"Answering from view '{view['name']}': {rewritten}")
+            return rewritten
+    metrics.inc("views.misses", dataset=dataset)
+    return None
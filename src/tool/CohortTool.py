@@ -0,0 +1,69 @@
+import json
+from agents import function_tool
+from src.main.cohort import find_similar
+
+
+def similar_patients(dataset: str, features_json: str, k: int = 25) -> str:
+    """
+    Look up the most similar patients in a dataset and report their outcome rate.
+
+    Args:
+        dataset (str): One of 'diabetes', 'cancer' or 'heart_disease'
+        features_json (str): JSON object of feature values to match on
+        k (int): Number of similar patients to consider
+    """
+    try:
+        features = json.loads(features_json)
+        result = find_similar(dataset, features, k)
+
+        matched = ", ".join(f"{name}={features[name]}" for name in result["matched_on"])
+        nearest = result["neighbors"][:3]
+        formatted_neighbors = []
+        for idx, neighbor in enumerate(nearest, 1):
+            values = ", ".join(f"{name}={neighbor[name]:.4g}" for name in result["matched_on"])
+            formatted_neighbors.append(f"{idx}. {values}, {result['target']}={neighbor[result['target']]}")
+
+        return (
+            f"Of the {result['k']} patients most similar to {matched} in the {dataset} dataset, "
+            f"{result['outcome_rate']:.1%} had {result['target']}=1 "
+            f"(dataset-wide rate: {result['base_rate']:.1%}).\n"
+            f"Closest matches:\n" + "\n".join(formatted_neighbors)
+        )
+
+    except Exception as e:
+        return f"Error finding similar patients: {str(e)}"
+
+
+@function_tool
+def similar_patients_tool(dataset: str, features_json: str, k: int):
+    """
+    Tool for "patients like me" questions: finds the k most similar records and their outcome rate.
+
+    Args:
+        dataset: One of 'diabetes', 'cancer' or 'heart_disease'
+        features_json: JSON object of feature values to match on, using the dataset's column names
+        k: Number of similar patients to consider, e.g. 25
+    """
+    return similar_patients(dataset, features_json, k)
+
+
+def main():
+    """
+    Test function for the cohort tool.
+    """
+    print("Testing Cohort Tool...")
+
+    try:
+        test_features = {"Age": 55, "BMI": 31, "Glucose": 150}
+        print(f"Finding diabetes patients similar to: {test_features}")
+
+        result = similar_patients("diabetes", json.dumps(test_features), 25)
+        print("✅ Cohort lookup completed successfully")
+        print(result)
+
+    except Exception as e:
+        print(f"❌ Error testing cohort tool: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,41 @@
 from serpapi import GoogleSearch
 from src.main import settings
+from src.main.metrics import metrics
+from src.main.ratelimit import RATE_LIMIT_RETRIES, get_limiter
+import time
 from agents import function_tool
 
-@function_tool
-def web_search(query: str):
+def is_rate_limited(results: dict) -> bool:
+    """Return True if SerpAPI refused a search for exceeding the account's throughput."""
+    error = str(results.get("error", "")).lower()
+    return "throughput" in error or "rate limit" in error or "429" in error
+
+
+def search_medical_web(query: str) -> str:
+    """
+    Search the web for medical information and format the top results.
+
+    Args:
+        query (str): The medical question to search for
+    """
     try:
         # Add the query to params dynamically
         params = settings.params.copy()  # Copy existing params to avoid modifying the original
         params['q'] = query
 
         search = GoogleSearch(params)
-        results = search.get_dict()
+        limiter = get_limiter("serpapi")
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            limiter.acquire()
+            metrics.inc("serpapi.calls")
+            start_time = time.perf_counter()
+            results = search.get_dict()
+            metrics.observe("serpapi.latency_seconds", time.perf_counter() - start_time)
+            if not is_rate_limited(results) or attempt == RATE_LIMIT_RETRIES:
+                break
+            limiter.backoff()
+        if "error" in results:
+            metrics.inc("serpapi.errors")
         
         # Format the results
         if "organic_results" in results:
@@ -27,9 +52,21 @@ def web_search(query: str):
             return f"No organic results found for '{query}'"
             
     except Exception as e:
+        metrics.inc("serpapi.errors")
         return f"Error performing search: {str(e)}"
 
 
+@function_tool
+def web_search(query: str):
+    """
+    Tool for searching the web for medical information.
+
+    Args:
+        query: The medical question to search for
+    """
+    return search_medical_web(query)
+
+
 def main():
     """
     Test function for the medical web search tool.
@@ -41,7 +78,7 @@ def main():
         test_query = "diabetes symptoms and treatment"
         print(f"Testing search for: '{test_query}'")
         
-        result = web_search(test_query)
+        result = search_medical_web(test_query)
         print("✅ Search completed successfully")
         print("Search Results:")
         print("-" * 50)
@@ -0,0 +1,65 @@
+import json
+from agents import function_tool
+from src.main.risk import score_risk
+
+
+def risk_score(dataset: str, features_json: str) -> str:
+    """
+    Score patient risk against a dataset's in-process logistic regression model.
+
+    Args:
+        dataset (str): One of 'diabetes', 'cancer' or 'heart_disease'
+        features_json (str): JSON object of feature values, or a JSON list of such objects
+    """
+    try:
+        features = json.loads(features_json)
+        result = score_risk(dataset, features)
+
+        if "probability" in result:
+            drivers = list(result["contributions"].items())[:3]
+            formatted_drivers = ", ".join(f"{name} ({value:+.2f})" for name, value in drivers)
+            return (
+                f"Estimated probability of {result['target']}=1 in the {dataset} model: "
+                f"{result['probability']:.1%}\n"
+                f"Main drivers (logit contribution): {formatted_drivers}"
+            )
+
+        formatted_scores = [f"{idx}. {p:.1%}" for idx, p in enumerate(result["probabilities"], 1)]
+        return f"Estimated probabilities of {result['target']}=1 in the {dataset} model:\n" + "\n".join(formatted_scores)
+
+    except Exception as e:
+        return f"Error scoring risk: {str(e)}"
+
+
+@function_tool
+def risk_score_tool(dataset: str, features_json: str):
+    """
+    Tool for estimating an individual's outcome risk from the labeled datasets.
+
+    Args:
+        dataset: One of 'diabetes', 'cancer' or 'heart_disease'
+        features_json: JSON object of feature values using the dataset's column names; omitted features use the population mean
+    """
+    return risk_score(dataset, features_json)
+
+
+def main():
+    """
+    Test function for the risk scoring tool.
+    """
+    print("Testing Risk Scoring Tool...")
+
+    try:
+        test_features = {"Glucose": 150, "BMI": 31, "Age": 55}
+        print(f"Scoring diabetes risk for: {test_features}")
+
+        result = risk_score("diabetes", json.dumps(test_features))
+        print("✅ Risk scoring completed successfully")
+        print(result)
+
+    except Exception as e:
+        print(f"❌ Error testing risk scoring tool: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,56 +11,56 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
-def test_diabetes_tool():
-    """Test the diabetes database tool."""
+def test_dataset_tools():
+    """Test the database tool of every registered dataset."""
     print("\n" + "="*60)
-    print("TESTING DIABETES DATABASE TOOL")
+    print("TESTING DATASET DATABASE TOOLS")
     print("="*60)
     
     try:
-        from src.tool.DiabetesDBTool import main as diabetes_main
-        diabetes_main()
+        from src.tool.DatasetDBTool import main as dataset_main
+        dataset_main()
     except Exception as e:
-        print(f"❌ Failed to test diabetes tool: {e}")
+        print(f"❌ Failed to test dataset tools: {e}")
 
 
-def test_cancer_tool():
-    """Test the cancer database tool."""
+def test_web_search_tool():
+    """Test the medical web search tool."""
     print("\n" + "="*60)
-    print("TESTING CANCER DATABASE TOOL")
+    print("TESTING MEDICAL WEB SEARCH TOOL")
     print("="*60)
     
     try:
-        from src.tool.CancerDBTool import main as cancer_main
-        cancer_main()
+        from src.tool.MedicalWebSearchTool import main as web_main
+        web_main()
     except Exception as e:
-        print(f"❌ Failed to test cancer tool: {e}")
+        print(f"❌ Failed to test web search tool: {e}")
 
 
-def test_heart_disease_tool():
-    """Test the heart disease database tool."""
+def test_risk_tool():
+    """Test the risk scoring tool."""
     print("\n" + "="*60)
-    print("TESTING HEART DISEASE DATABASE TOOL")
+    print("TESTING RISK SCORING TOOL")
     print("="*60)
     
     try:
-        from src.tool.HeartDiseaseDBTool import main as heart_main
-        heart_main()
+        from src.tool.RiskScoringTool import main as risk_main
+        risk_main()
     except Exception as e:
-        print(f"❌ Failed to test heart disease tool: {e}")
+        print(f"❌ Failed to test risk scoring tool: {e}")
 
 
-def test_web_search_tool():
-    """Test the medical web search tool."""
+def test_cohort_tool():
+    """Test the cohort tool."""
     print("\n" + "="*60)
-    print("TESTING MEDICAL WEB SEARCH TOOL")
+    print("TESTING COHORT TOOL")
     print("="*60)
     
     try:
-        from src.tool.MedicalWebSearchTool import main as web_main
-        web_main()
+        from src.tool.CohortTool import main as cohort_main
+        cohort_main()
     except Exception as e:
-        print(f"❌ Failed to test web search tool: {e}")
+        print(f"❌ Failed to test cohort tool: {e}")
 
 
 def main():
@@ -69,19 +69,19 @@ def main():
     print("="*60)
     
     # Test each tool
-    test_diabetes_tool()
-    test_cancer_tool()
-    test_heart_disease_tool()
+    test_dataset_tools()
     test_web_search_tool()
+    test_risk_tool()
+    test_cohort_tool()
     
     print("\n" + "="*60)
     print("✅ ALL TESTS COMPLETED")
     print("="*60)
     print("\nTo run individual tests:")
-    print("python src/tool/DiabetesDBTool.py")
-    print("python src/tool/CancerDBTool.py")
-    print("python src/tool/HeartDiseaseDBTool.py")
+    print("python src/tool/DatasetDBTool.py [dataset ...]")
     print("python src/tool/MedicalWebSearchTool.py")
+    print("python src/tool/RiskScoringTool.py")
+    print("python src/tool/CohortTool.py")
 
 
 if __name__ == "__main__":
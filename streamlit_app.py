@@ -9,8 +9,8 @@ from pathlib import Path
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
 import time
+import uuid
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
@@ -19,10 +19,19 @@ sys.path.append(str(project_root))
 # Import the main application
 try:
     from src.main.app import MediAide
+    from src.main.history import compact_entry, get_history_store
+    from src.main.analytics import SessionAnalytics
+    from src.main.metrics import metrics, export_metrics, load_exported_metrics, metrics_dir, cache_hit_rates
+    from src.main.results import to_frame
+    from src.main.datasets import DATASETS, display_name
+    from src.main.reload import reload_dataset
 except ImportError as e:
     st.error(f"Failed to import MediAide application: {e}")
     st.stop()
 
+# Query types for the registered datasets, e.g. "📈 Diabetes DB" -> "diabetes"
+DATABASE_QUERY_TYPES = {display_name(dataset): dataset for dataset in DATASETS}
+
 # Page configuration
 st.set_page_config(
     page_title="MediAide - AI Medical Assistant",
@@ -77,11 +86,49 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Number of history entries shown per page
+HISTORY_PAGE_SIZE = 20
+
+@st.cache_resource
+def get_history():
+    """Return the conversation history store shared by all sessions."""
+    return get_history_store()
+
+# Query parameter carrying the history key, so a refresh or restart finds the same history.
+# The key is the only credential for a session's history: anyone with the page URL can
+# read and clear it, so the URL must be treated as a secret (see new_session_token()).
+SESSION_PARAM = "session"
+
+def session_token() -> str:
+    """Return the session key from the URL, creating one and writing it back on first visit."""
+    token = st.query_params.get(SESSION_PARAM, "")
+    if len(token) != 32 or any(c not in "0123456789abcdef" for c in token):
+        token = new_session_token()
+    return token
+
+def new_session_token() -> str:
+    """Start a new private session key, so links copied earlier no longer reach new history."""
+    token = uuid.uuid4().hex
+    st.query_params[SESSION_PARAM] = token
+    return token
+
+def restore_analytics(session_id: str) -> SessionAnalytics:
+    """Rebuild the running analytics from a session's stored history."""
+    analytics = SessionAnalytics()
+    history = get_history()
+    # Pages are newest first; fold oldest first so the time buckets stay ordered
+    for entry in reversed(history.page(session_id, 0, history.count(session_id))):
+        analytics.record(entry['query_type'], entry['response_time'],
+                         entry['timestamp'].timestamp(), entry['success'])
+    return analytics
+
 # Initialize session state
 if 'app' not in st.session_state:
     st.session_state.app = None
     st.session_state.initialized = False
-    st.session_state.conversation_history = []
+    st.session_state.session_id = session_token()
+    st.session_state.history_page = 0
+    st.session_state.analytics = restore_analytics(st.session_state.session_id)
 
 def initialize_app():
     """Initialize the MediAide application."""
@@ -143,7 +190,7 @@ def display_sidebar():
     
     return st.sidebar.selectbox(
         "Choose a section:",
-        ["🏠 Home", "🔍 Query Tools", "📊 Analytics", "📋 History", "⚙️ Settings"]
+        ["🏠 Home", "🔍 Query Tools", "📊 Analytics", "📋 History", "🛠️ Admin", "⚙️ Settings"]
     )
 
 def display_query_interface():
@@ -163,16 +210,21 @@ def display_query_interface():
     with col2:
         query_type = st.selectbox(
             "Query Type:",
-            ["🌐 Web Search", "📈 Diabetes DB", "🩺 Cancer DB", "❤️ Heart Disease DB", "🔄 All Sources"]
+            ["🌐 Web Search", *DATABASE_QUERY_TYPES, "🔄 All Sources"]
+        )
+        approximate = st.checkbox(
+            "Approximate answers",
+            help="Estimate database aggregates from stratified samples with 95% confidence intervals. "
+                 "Ask for an exact answer to scan the full table."
         )
     
     if st.button("🔍 Search", type="primary", use_container_width=True):
         if query:
-            process_query(query, query_type)
+            process_query(query, query_type, approximate)
         else:
             st.warning("Please enter a question first!")
 
-def process_query(query: str, query_type: str):
+def process_query(query: str, query_type: str, approximate: bool = False):
     """Process the user query and display results."""
     if not st.session_state.initialized or not st.session_state.app:
         st.error("Application not initialized. Please refresh the page.")
@@ -185,12 +237,8 @@ def process_query(query: str, query_type: str):
             # Route query based on type
             if query_type == "🌐 Web Search":
                 response = st.session_state.app.search_web(query)
-            elif query_type == "📈 Diabetes DB":
-                response = st.session_state.app.query_diabetes(query)
-            elif query_type == "🩺 Cancer DB":
-                response = st.session_state.app.query_cancer(query)
-            elif query_type == "❤️ Heart Disease DB":
-                response = st.session_state.app.query_heart_disease(query)
+            elif query_type in DATABASE_QUERY_TYPES:
+                response = st.session_state.app.query_dataset(DATABASE_QUERY_TYPES[query_type], query, approximate)
             elif query_type == "🔄 All Sources":
                 response = st.session_state.app.get_comprehensive_answer(query)
                 display_comprehensive_response(query, response, time.time() - start_time)
@@ -203,13 +251,7 @@ def process_query(query: str, query_type: str):
             display_single_response(query, response, query_type, time.time() - start_time)
             
             # Add to conversation history
-            st.session_state.conversation_history.append({
-                "timestamp": datetime.now(),
-                "query": query,
-                "query_type": query_type,
-                "response": response,
-                "response_time": time.time() - start_time
-            })
+            record_query(query, query_type, response, time.time() - start_time)
             
         except Exception as e:
             st.error(f"Error processing query: {e}")
@@ -232,11 +274,38 @@ def display_single_response(query: str, response: dict, query_type: str, respons
         st.markdown('<div class="response-box">', unsafe_allow_html=True)
         st.markdown(response.get('answer', 'No answer provided'))
         st.markdown('</div>', unsafe_allow_html=True)
+        display_result_data(response.get('data'))
     else:
         st.markdown('<div class="error-box">', unsafe_allow_html=True)
         st.markdown(f"Error: {response.get('answer', 'Unknown error')}")
         st.markdown('</div>', unsafe_allow_html=True)
 
+def display_result_data(data: dict):
+    """Display the SQL and result set behind a database answer."""
+    if not data or not data.get('columns'):
+        return
+    
+    df = to_frame(data)
+    st.markdown(f"**Rows:** {data['row_count']} · **SQL time:** {data['sql_ms']:.1f}ms · "
+                f"**Total time:** {data['total_ms']:.0f}ms")
+    st.code(data['sql'], language='sql')
+    st.dataframe(df, use_container_width=True)
+    if data['truncated']:
+        st.caption(f"Showing {data['returned_rows']} of {data['row_count']} rows")
+    if data.get('approximate'):
+        intervals = pd.DataFrame({
+            f"{column} 95% CI": [f"{bounds[0]:g} – {bounds[1]:g}" if bounds else "" for bounds in values]
+            for column, values in data['intervals'].items()
+        })
+        st.caption("≈ Estimated from a stratified sample; ask for an exact answer to scan the full table")
+        st.dataframe(intervals, use_container_width=True)
+
+    # Chart small label/value results directly
+    numeric = [c for c in data['columns'] if data['types'][c] in ('int', 'float')]
+    if len(data['columns']) == 2 and len(numeric) == 1 and 1 < len(df) <= 50:
+        label = next(c for c in data['columns'] if c not in numeric)
+        st.plotly_chart(px.bar(df, x=label, y=numeric[0]), use_container_width=True)
+
 def display_comprehensive_response(query: str, response: dict, response_time: float):
     """Display comprehensive response from multiple sources."""
     st.markdown("---")
@@ -255,50 +324,50 @@ def display_comprehensive_response(query: str, response: dict, response_time: fl
         with st.expander(f"📝 {source.replace('_', ' ').title()}", expanded=True):
             if result.get('success', True):
                 st.markdown(result.get('answer', 'No answer provided'))
+                display_result_data(result.get('data'))
             else:
                 st.error(f"Error: {result.get('answer', 'Unknown error')}")
     
     # Add to conversation history
-    st.session_state.conversation_history.append({
-        "timestamp": datetime.now(),
-        "query": query,
-        "query_type": "🔄 All Sources",
-        "response": response,
-        "response_time": response_time
-    })
+    record_query(query, "🔄 All Sources", response, response_time)
+
+def record_query(query: str, query_type: str, response: dict, response_time: float):
+    """Persist a completed query and fold it into the running analytics."""
+    entry = compact_entry(query, query_type, response, response_time)
+    get_history().append(st.session_state.session_id, entry)
+    st.session_state.analytics.record(query_type, response_time, entry['timestamp'], entry['success'])
 
 def display_analytics():
     """Display analytics and visualizations."""
     st.subheader("📊 Analytics Dashboard")
     
-    if not st.session_state.conversation_history:
+    summary = st.session_state.analytics.summary()
+    if not summary['total']:
         st.info("No conversation history available yet. Start asking questions to see analytics!")
         return
     
-    # Create analytics from conversation history
-    df = pd.DataFrame(st.session_state.conversation_history)
-    
     col1, col2 = st.columns(2)
     
     with col1:
         # Query types distribution
-        query_type_counts = df['query_type'].value_counts()
         fig_pie = px.pie(
-            values=query_type_counts.values,
-            names=query_type_counts.index,
+            values=list(summary['query_types'].values()),
+            names=list(summary['query_types'].keys()),
             title="Query Types Distribution"
         )
         st.plotly_chart(fig_pie, use_container_width=True)
     
     with col2:
-        # Response times over time
-        df['timestamp_str'] = df['timestamp'].dt.strftime('%H:%M:%S')
+        # Mean response time per minute
+        series = pd.DataFrame(summary['series'])
+        series['time'] = pd.to_datetime(series['bucket_start'], unit='s').dt.strftime('%H:%M')
         fig_line = px.line(
-            df,
-            x='timestamp_str',
-            y='response_time',
+            series,
+            x='time',
+            y='mean_response_time',
             title="Response Times Over Time",
-            labels={'response_time': 'Response Time (s)', 'timestamp_str': 'Time'}
+            labels={'mean_response_time': 'Avg Response Time (s)', 'time': 'Time'},
+            markers=True
         )
         st.plotly_chart(fig_line, use_container_width=True)
     
@@ -307,35 +376,153 @@ def display_analytics():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Queries", len(df))
+        st.metric("Total Queries", summary['total'])
     with col2:
-        st.metric("Avg Response Time", f"{df['response_time'].mean():.2f}s")
+        st.metric("Avg Response Time", f"{summary['mean']:.2f}s")
     with col3:
-        st.metric("Fastest Response", f"{df['response_time'].min():.2f}s")
+        st.metric("Fastest Response", f"{summary['min']:.2f}s")
     with col4:
-        st.metric("Slowest Response", f"{df['response_time'].max():.2f}s")
+        st.metric("Slowest Response", f"{summary['max']:.2f}s")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("p50 Response Time", f"{summary['p50']:.2f}s")
+    with col2:
+        st.metric("p95 Response Time", f"{summary['p95']:.2f}s")
+    with col3:
+        st.metric("p99 Response Time", f"{summary['p99']:.2f}s")
+    with col4:
+        st.metric("Failed Queries", summary['failures'])
 
 def display_history():
     """Display conversation history."""
     st.subheader("📋 Conversation History")
     
-    if not st.session_state.conversation_history:
+    history = get_history()
+    total = history.count(st.session_state.session_id)
+    if not total:
         st.info("No conversation history available yet.")
         return
     
-    # Display history in reverse chronological order
-    for i, entry in enumerate(reversed(st.session_state.conversation_history)):
+    # Page through history in reverse chronological order
+    pages = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+    page = min(st.session_state.history_page, pages - 1)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Newer", disabled=page == 0):
+            page -= 1
+    with col3:
+        if st.button("Older ➡️", disabled=page >= pages - 1):
+            page += 1
+    st.session_state.history_page = page
+    with col2:
+        st.markdown(f"Page {page + 1} of {pages} ({total} queries)")
+    
+    for entry in history.page(st.session_state.session_id, page * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE):
         with st.expander(f"🕒 {entry['timestamp'].strftime('%Y-%m-%d %H:%M:%S')} - {entry['query'][:50]}..."):
             st.markdown(f"**Query:** {entry['query']}")
             st.markdown(f"**Type:** {entry['query_type']}")
             st.markdown(f"**Response Time:** {entry['response_time']:.2f}s")
             
-            if entry['query_type'] == "🔄 All Sources":
+            if entry['answers'] is not None:
                 st.markdown("**Responses:**")
-                for source, result in entry['response'].get('responses', {}).items():
-                    st.markdown(f"- **{source.title()}:** {result.get('answer', 'No answer')[:100]}...")
+                for source, answer in entry['answers'].items():
+                    st.markdown(f"- **{source.title()}:** {answer[:100]}...")
             else:
-                st.markdown(f"**Answer:** {entry['response'].get('answer', 'No answer')[:200]}...")
+                st.markdown(f"**Answer:** {entry['answer'][:200]}...")
+
+def metric_rows(snapshot: dict, name: str) -> list:
+    """Flatten one metric's labeled series into table rows."""
+    return [{**row['labels'], **{k: v for k, v in row.items() if k != 'labels'}}
+            for row in snapshot['histograms'].get(name, snapshot['counters'].get(name, []))]
+
+def display_admin():
+    """Display process-wide operational metrics across all sessions."""
+    st.subheader("🛠️ Operational Metrics")
+    
+    scope = st.radio(
+        "Scope:",
+        ["This process", "All exported processes"],
+        horizontal=True
+    )
+    if scope == "This process":
+        snapshot = metrics.snapshot()
+    else:
+        snapshot = load_exported_metrics().snapshot()
+    
+    # Latency percentiles and error rates per source
+    st.markdown("### ⏱️ Latency by Source")
+    latency = pd.DataFrame(metric_rows(snapshot, "mediaide.latency_seconds"))
+    if latency.empty:
+        st.info("No requests recorded yet.")
+    else:
+        errors = {row['labels']['source']: row['value'] for row in snapshot['counters'].get("mediaide.errors", [])}
+        latency['errors'] = latency['source'].map(errors).fillna(0).astype(int)
+        latency['error_rate'] = latency['errors'] / latency['count']
+        st.dataframe(
+            latency[['source', 'count', 'errors', 'error_rate', 'mean', 'p50', 'p95', 'p99', 'max']],
+            use_container_width=True
+        )
+        fig_bar = px.bar(
+            latency.melt(id_vars='source', value_vars=['p50', 'p95', 'p99'], var_name='percentile', value_name='seconds'),
+            x='source',
+            y='seconds',
+            color='percentile',
+            barmode='group',
+            title="Latency Percentiles by Source"
+        )
+        st.plotly_chart(fig_bar, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Cache effectiveness
+        st.markdown("### 🗄️ Cache Hit Rates")
+        hit_rates = pd.DataFrame(cache_hit_rates(snapshot))
+        if hit_rates.empty:
+            st.info("No cache lookups recorded yet.")
+        else:
+            st.dataframe(hit_rates, use_container_width=True)
+    
+    with col2:
+        # LLM token usage
+        st.markdown("### 🔤 LLM Token Usage")
+        tokens = pd.DataFrame(
+            [{"metric": name.split('.', 1)[1], **row} for name in
+             ("llm.prompt_tokens", "llm.completion_tokens", "llm.requests", "llm.cost_usd")
+             for row in metric_rows(snapshot, name)]
+        )
+        if tokens.empty:
+            st.info("No LLM usage recorded yet.")
+        else:
+            st.dataframe(tokens.pivot_table(index='source', columns='metric', values='value', aggfunc='sum'),
+                         use_container_width=True)
+        tokens_saved = sum(row['value'] for row in snapshot['counters'].get("llm_cache.tokens_saved", []))
+        st.metric("Tokens Saved by LLM Cache", f"{int(tokens_saved):,}")
+    
+    # SerpAPI usage
+    st.markdown("### 🌐 SerpAPI")
+    serp_calls = sum(row['value'] for row in snapshot['counters'].get("serpapi.calls", []))
+    serp_errors = sum(row['value'] for row in snapshot['counters'].get("serpapi.errors", []))
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Calls", int(serp_calls))
+    with col2:
+        st.metric("Errors", int(serp_errors))
+    with col3:
+        st.metric("Error Rate", f"{serp_errors / serp_calls:.1%}" if serp_calls else "n/a")
+    
+    # Export
+    st.markdown("### 💾 Export")
+    if st.button("Export Metrics Snapshot", type="secondary"):
+        path = export_metrics()
+        st.success(f"Metrics exported to {path}")
+    st.caption(f"Exports are written to {metrics_dir()} and merged under 'All exported processes'.")
+    
+    with st.expander("Raw snapshot"):
+        st.json(snapshot)
 
 def display_settings():
     """Display settings and configuration."""
@@ -350,10 +537,31 @@ def display_settings():
     # Clear history
     st.markdown("### 🗑️ Data Management")
     if st.button("Clear Conversation History", type="secondary"):
-        st.session_state.conversation_history = []
+        get_history().clear(st.session_state.session_id)
+        st.session_state.history_page = 0
+        st.session_state.analytics = SessionAnalytics()
         st.success("Conversation history cleared!")
         st.experimental_rerun()
     
+    # The session key in the URL is the only thing protecting the history
+    st.warning("🔒 This page's address contains your private session key. Anyone with the link can "
+               "read and clear your query history, so don't share it.")
+    if st.button("Start New Private Session", type="secondary"):
+        st.session_state.session_id = new_session_token()
+        st.session_state.history_page = 0
+        st.session_state.analytics = SessionAnalytics()
+        st.success("Started a new session; links shared earlier no longer show your new queries.")
+        st.experimental_rerun()
+    
+    # Reload one dataset in place; other sessions keep their state
+    st.markdown("### 🔁 Datasets")
+    st.caption("CSV changes are picked up automatically. Reloading rebuilds a dataset without interrupting running queries.")
+    dataset = st.selectbox("Dataset", list(DATASETS))
+    if st.button("🔁 Reload Dataset", type="secondary"):
+        with st.spinner(f"Rebuilding {dataset}..."):
+            reload_dataset(dataset, force=True)
+        st.success(f"Dataset '{dataset}' reloaded.")
+    
     # Re-initialize
     if st.button("🔄 Re-initialize Application", type="secondary"):
         st.session_state.initialized = False
@@ -375,12 +583,11 @@ def main():
     # Main content area
     if selected_section == "🏠 Home":
         st.markdown("### Welcome to MediAide!")
+        st.markdown("MediAide is an AI-powered medical assistant that can help you with:")
+        st.markdown("\n".join(
+            f"- {info['icon']} **{info['label']}**: {info['description']}" for info in DATASETS.values()
+        ))
         st.markdown("""
-        MediAide is an AI-powered medical assistant that can help you with:
-        
-        - 📈 **Diabetes Information**: Query our diabetes database for insights
-        - 🩺 **Cancer Research**: Access cancer-related data and information
-        - ❤️ **Heart Disease**: Get information about cardiovascular health
         - 🌐 **Web Search**: Search the internet for latest medical information
         - 🔄 **Comprehensive Analysis**: Get answers from multiple sources
         
@@ -406,6 +613,9 @@ def main():
     elif selected_section == "📋 History":
         display_history()
     
+    elif selected_section == "🛠️ Admin":
+        display_admin()
+    
     elif selected_section == "⚙️ Settings":
         display_settings()
     